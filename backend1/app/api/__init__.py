@@ -6,5 +6,7 @@ __all__ = [
     "auth",
     "products",
     "rentals",
+    "reservations",
     "audit_logs",
+    "admin",
 ]
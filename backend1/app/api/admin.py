@@ -0,0 +1,74 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.security import require_admin, require_admin_async, user_cache
+from app.db.session import get_db, get_pool_stats
+from app.services import stripe_service
+from app.services.event_hub import event_hub
+from app.services.product_cache import page_cache, product_cache
+
+router = APIRouter()
+
+# served in both sync and async mode
+admin_only = require_admin_async if settings["DB_ASYNC"] else require_admin
+
+
+@router.get("/cache-stats")
+def cache_stats(admin=Depends(admin_only)):
+    return {
+        "users": user_cache.stats(),
+        "products": product_cache.stats(),
+        "productPages": page_cache.stats(),
+    }
+
+
+@router.get("/pool-stats")
+def pool_stats(admin=Depends(admin_only)):
+    return get_pool_stats()
+
+
+@router.get("/realtime-stats")
+def realtime_stats(admin=Depends(admin_only)):
+    return event_hub.stats()
+
+
+# -------------------- Striped stock counters --------------------
+
+class StripesRequest(BaseModel):
+    stripes: int = Field(ge=0, description="Sub-counters to spread the stock over (0 turns striping off)", examples=[8])
+
+
+STRIPE_ERRORS = {
+    "PRODUCT_NOT_FOUND": (404, "Product not found"),
+    "INVALID_STRIPES": (400, f"stripes must be at most {settings['STRIPES_MAX']}"),
+}
+
+
+@router.put(
+    "/products/{product_id}/stripes",
+    summary="Stripe a hot product",
+    description="Spread the product's stock over N sub-counter rows so concurrent take/rent/return requests stop queueing on one row. The stock shown to clients does not change.",
+)
+def set_product_stripes(
+    product_id: str,
+    body: StripesRequest,
+    admin=Depends(admin_only),
+    db: Session = Depends(get_db),
+):
+    try:
+        previous = stripe_service.set_stripes(db, product_id, body.stripes)
+    except ValueError as e:
+        status_code, detail = STRIPE_ERRORS.get(str(e), (400, "Striping failed"))
+        raise HTTPException(status_code=status_code, detail=detail)
+    db.commit()
+    return {"productId": product_id, "stripes": body.stripes, "previous": previous}
+
+
+@router.get("/stripes")
+def stripe_stats(admin=Depends(admin_only), db: Session = Depends(get_db)):
+    return {
+        "products": stripe_service.striped_products(db),
+        "rebalancer": stripe_service.stripe_rebalancer.stats(),
+    }
@@ -0,0 +1,12 @@
+# app/api/aio/__init__.py
+# Async versions of the routers, served instead of app.api.* when DB_ASYNC is on.
+# Handlers run on AsyncSession (asyncpg); where the sync handler body is
+# reused it runs through AsyncSession.run_sync, i.e. on the event loop via
+# greenlets and not on a threadpool thread.
+
+__all__ = [
+    "auth",
+    "products",
+    "rentals",
+    "audit_logs",
+]
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import audit_logs
+from app.core.pagination import MAX_LIMIT
+from app.core.security import require_admin_async
+from app.db.session import get_async_db
+from app.schemas.audit_log import AuditLogOut, AuditRecordOut
+
+router = APIRouter()
+
+
+@router.get("", response_model=list[AuditLogOut])
+async def list_audit_logs(
+    response: Response,
+    actorUserId: UUID | None = None,
+    productId: UUID | None = None,
+    action: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    rentalId: UUID | None = None,
+    reservationId: UUID | None = None,
+    productName: str | None = None,
+    meta: str | None = None,
+    cursor: str | None = None,
+    limit: int = Query(default=200, ge=1, le=MAX_LIMIT),
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: audit_logs.list_audit_logs(
+        response, actorUserId=actorUserId, productId=productId, action=action,
+        since=since, until=until, rentalId=rentalId, reservationId=reservationId,
+        productName=productName, meta=meta, cursor=cursor, limit=limit, admin=admin, db=s,
+    ))
+
+
+@router.get("/pipeline")
+async def audit_pipeline_stats(admin=Depends(require_admin_async)):
+    return audit_logs.audit_pipeline_stats(admin=admin)
+
+
+@router.get("/archive/months")
+async def list_archived_months(admin=Depends(require_admin_async)):
+    return audit_logs.list_archived_months(admin=admin)
+
+
+@router.get("/archive", response_model=list[AuditRecordOut])
+async def search_archive(
+    actorUserId: UUID | None = None,
+    productId: UUID | None = None,
+    action: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    rentalId: UUID | None = None,
+    reservationId: UUID | None = None,
+    productName: str | None = None,
+    meta: str | None = None,
+    limit: int = Query(default=200, ge=1, le=MAX_LIMIT),
+    admin=Depends(require_admin_async),
+):
+    # decompressing archive files is blocking work, keep it off the event loop
+    return await asyncio.to_thread(
+        audit_logs.search_archive,
+        actorUserId=actorUserId, productId=productId, action=action,
+        since=since, until=until, rentalId=rentalId, reservationId=reservationId,
+        productName=productName, meta=meta, limit=limit, admin=admin,
+    )
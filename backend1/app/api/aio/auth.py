@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import auth
+from app.core.security import get_current_user_async
+from app.db.session import get_async_db
+from app.models.user import User
+from app.schemas.auth import LoginRequest, RegisterRequest
+from app.services.auth_service import create_user_async, login_and_get_token_async, token_response
+
+router = APIRouter()
+
+
+@router.post("/register")
+async def register(payload: RegisterRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await create_user_async(db, payload.username, payload.password)
+        return token_response(user)
+    except ValueError as e:
+        if str(e) == "USERNAME_EXISTS":
+            raise HTTPException(status_code=409, detail="Username already exists")
+        raise HTTPException(status_code=400, detail="Registration failed")
+
+
+@router.post("/login")
+async def login(payload: LoginRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        return await login_and_get_token_async(db, payload.username, payload.password)
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+
+@router.get("/me")
+async def me(current_user: User = Depends(get_current_user_async)):
+    return auth.me(current_user)
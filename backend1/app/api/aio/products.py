@@ -0,0 +1,157 @@
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import products
+from app.api.products import BulkActionRequest, QtyRequest, RentRequest, idempotency
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from app.core.security import get_current_user_async, require_admin_async
+from app.db.session import get_async_db
+from app.schemas.product import ProductChangesOut, ProductCreate, ProductOut, ProductUpdate
+from app.services.event_hub import event_hub, sse_stream
+from app.services.idempotency_service import Idempotency
+
+router = APIRouter()
+
+
+# -------------------- Products CRUD --------------------
+
+@router.get("", response_model=list[ProductOut])
+async def list_products(
+    response: Response,
+    category: str | None = None,
+    gender: str | None = None,
+    type: str | None = None,
+    inStock: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    if_none_match: str | None = Header(default=None),
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: products.list_products(
+        response, category=category, gender=gender, type=type, inStock=inStock,
+        cursor=cursor, limit=limit, if_none_match=if_none_match, user=user, db=s,
+    ))
+
+
+@router.get("/changes", response_model=ProductChangesOut, summary="Product changes since a sync token")
+async def product_changes(
+    since: str | None = None,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: products.product_changes(since, user=user, db=s))
+
+
+@router.get("/summary", summary="Inventory summary")
+async def inventory_summary(
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: products.inventory_summary(user=user, db=s))
+
+
+@router.get("/stream", summary="Live inventory events")
+async def stream_products(
+    request: Request,
+    category: str | None = None,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    await db.close()
+    sub = event_hub.subscribe(category)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many live subscribers, poll /products instead")
+    return StreamingResponse(
+        sse_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post("")
+async def create_product(
+    data: ProductCreate,
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.create_product(data, admin=admin, db=s, idem=idem))
+
+
+@router.put("/{product_id}")
+async def update_product(
+    product_id: str,
+    payload: ProductUpdate,
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.update_product(product_id, payload, admin=admin, db=s, idem=idem))
+
+
+@router.delete("/{product_id}")
+async def delete_product(
+    product_id: str,
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.delete_product(product_id, admin=admin, db=s, idem=idem))
+
+
+# -------------------- Inventory Actions --------------------
+
+@router.post("/{product_id}/take")
+async def take_product(
+    product_id: str,
+    body: QtyRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.take_product(product_id, body, user=user, db=s, idem=idem))
+
+
+@router.post("/{product_id}/return-taken")
+async def return_taken_product(
+    product_id: str,
+    body: QtyRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.return_taken_product(product_id, body, user=user, db=s, idem=idem))
+
+
+@router.post("/{product_id}/rent", summary="Rent product")
+async def rent_product(
+    product_id: str,
+    body: RentRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.rent_product(product_id, body, user=user, db=s, idem=idem))
+
+
+@router.post("/{product_id}/return-rented", summary="Return rented product")
+async def return_rented_product(
+    product_id: str,
+    body: QtyRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.return_rented_product(product_id, body, user=user, db=s, idem=idem))
+
+
+@router.post("/bulk-actions", summary="Bulk inventory actions")
+async def bulk_actions(
+    body: BulkActionRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    return await db.run_sync(lambda s: products.bulk_actions(body, user=user, db=s, idem=idem))
@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import rentals
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT
+from app.core.security import get_current_user_async, require_admin_async
+from app.db.session import get_async_db
+from app.schemas.rental import MyRentalOut, RentalOut
+
+router = APIRouter()
+
+
+@router.get("/my", response_model=list[MyRentalOut])
+async def my_rentals(
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: rentals.my_rentals(user=user, db=s))
+
+
+@router.get("", response_model=list[RentalOut])
+async def list_rentals(
+    status: str | None = None,      # ACTIVE / OVERDUE / RETURNED
+    userId: str | None = None,
+    productId: str | None = None,
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: rentals.list_rentals(
+        status=status, userId=userId, productId=productId, admin=admin, db=s,
+    ))
+
+
+@router.get("/overdue", response_model=list[RentalOut])
+async def overdue_rentals(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    admin=Depends(require_admin_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: rentals.overdue_rentals(
+        response, cursor=cursor, limit=limit, admin=admin, db=s,
+    ))
@@ -0,0 +1,59 @@
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import reservations
+from app.api.reservations import ReservationRequest
+from app.core.security import get_current_user_async
+from app.db.session import get_async_db
+
+router = APIRouter()
+
+
+@router.get("/availability")
+async def availability(
+    productIds: list[str] = Query(min_length=1, max_length=500),
+    start: date = Query(),
+    end: date = Query(),
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: reservations.availability(
+        productIds=productIds, start=start, end=end, user=user, db=s,
+    ))
+
+
+@router.get("/my")
+async def my_reservations(
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: reservations.my_reservations(user=user, db=s))
+
+
+@router.post("")
+async def create_reservation(
+    body: ReservationRequest,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: reservations.create_reservation(body, user=user, db=s))
+
+
+@router.delete("/{reservation_id}")
+async def cancel_reservation(
+    reservation_id: str,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: reservations.cancel_reservation(reservation_id, user=user, db=s))
+
+
+@router.post("/{reservation_id}/fulfil")
+async def fulfil_reservation(
+    reservation_id: str,
+    user=Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await db.run_sync(lambda s: reservations.fulfil_reservation(reservation_id, user=user, db=s))
@@ -1,38 +1,137 @@
-from fastapi import APIRouter, Depends
+import json
+from datetime import datetime
+from itertools import islice
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
 
+from app.core.pagination import MAX_LIMIT, NEXT_CURSOR_HEADER, apply_keyset, split_page
+from app.core.query_budget import query_budget
 from app.core.security import require_admin
-from app.db.session import get_db
+from app.db.routing import get_read_db
 from app.models.audit_log import AuditLog
 from app.models.user import User   # ✅ חדש – בשביל שם משתמש
+from app.schemas.audit_log import AuditLogOut, AuditRecordOut
+from app.core.config import settings
+from app.services.audit_archive_service import archived_months, read_archive
+from app.services.audit_service import audit_writer
 
 router = APIRouter()
 
 
-@router.get("")
+def meta_filter(rentalId: UUID | None, reservationId: UUID | None, productName: str | None, meta: str | None) -> dict:
+    """Build one containment document out of the meta filters."""
+    doc = {}
+    if meta:
+        try:
+            doc = json.loads(meta)
+        except ValueError:
+            doc = None
+        if not isinstance(doc, dict):
+            raise HTTPException(status_code=400, detail="meta must be a JSON object")
+    if rentalId:
+        doc["rentalId"] = str(rentalId)
+    if reservationId:
+        doc["reservationId"] = str(reservationId)
+    if productName:
+        doc["name"] = productName
+    return doc
+
+
+@router.get("", response_model=list[AuditLogOut])
+# one query: the usernames come from the JOIN
+@query_budget(1)
 def list_audit_logs(
+    response: Response,
+    actorUserId: UUID | None = None,
+    productId: UUID | None = None,
+    action: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    rentalId: UUID | None = None,
+    reservationId: UUID | None = None,
+    productName: str | None = None,
+    meta: str | None = Query(default=None, description='JSON object the entry meta must contain, e.g. {"days": 3}'),
+    cursor: str | None = None,
+    limit: int = Query(default=200, ge=1, le=MAX_LIMIT),
     admin=Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     # JOIN ל־users כדי להביא שם משתמש
-    rows = (
-        db.query(AuditLog, User.username)
-        .join(User, User.id == AuditLog.actor_user_id)
-        .order_by(AuditLog.created_at.desc())
-        .limit(200)
-        .all()
-    )
+    # column rows (log fields + username), no AuditLog objects to hydrate
+    q = db.query(*AuditLog.__table__.columns, User.username).join(User, User.id == AuditLog.actor_user_id)
+
+    if actorUserId:
+        q = q.filter(AuditLog.actor_user_id == actorUserId)
+    if productId:
+        q = q.filter(AuditLog.product_id == productId)
+    if action:
+        q = q.filter(AuditLog.action == action)
+    if since:
+        q = q.filter(AuditLog.created_at >= since)
+    if until:
+        q = q.filter(AuditLog.created_at < until)
+    doc = meta_filter(rentalId, reservationId, productName, meta)
+    if doc:
+        # meta @> doc, served by the GIN index
+        q = q.filter(AuditLog.meta.contains(doc))
+
+    rows = apply_keyset(q, AuditLog.created_at, AuditLog.id, cursor, limit).all()
+    rows, next_cursor = split_page(rows, limit, lambda log: (log.created_at, log.id))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
 
     return [
         {
             "id": str(log.id),
             "actorUserId": str(log.actor_user_id),
-            "actorUserName": username,   # ✅ זה מה שהפרונט צריך
+            "actorUserName": log.username,   # ✅ זה מה שהפרונט צריך
             "productId": str(log.product_id) if log.product_id else None,
             "action": log.action,
             "qty": log.qty,
             "meta": log.meta,
             "createdAt": log.created_at.isoformat() if log.created_at else None,
         }
-        for (log, username) in rows
+        for log in rows
     ]
+
+
+@router.get("/pipeline")
+def audit_pipeline_stats(admin=Depends(require_admin)):
+    # queue depth and throughput of the write-behind audit writer
+    return audit_writer.stats()
+
+
+@router.get("/archive/months")
+def list_archived_months(admin=Depends(require_admin)):
+    return [m.strftime("%Y-%m") for m in archived_months(settings["AUDIT_ARCHIVE_DIR"])]
+
+
+@router.get("/archive", response_model=list[AuditRecordOut])
+def search_archive(
+    actorUserId: UUID | None = None,
+    productId: UUID | None = None,
+    action: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    rentalId: UUID | None = None,
+    reservationId: UUID | None = None,
+    productName: str | None = None,
+    meta: str | None = None,
+    limit: int = Query(default=200, ge=1, le=MAX_LIMIT),
+    admin=Depends(require_admin),
+):
+    # months moved out of Postgres by the retention job, read straight from the
+    # compressed archive files (oldest first); narrow since/until to open fewer files
+    records = read_archive(
+        settings["AUDIT_ARCHIVE_DIR"],
+        since=since,
+        until=until,
+        actor_user_id=actorUserId,
+        product_id=productId,
+        action=action,
+        meta=meta_filter(rentalId, reservationId, productName, meta),
+    )
+    return list(islice(records, limit))
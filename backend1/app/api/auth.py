@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.db.session import get_db
 from app.schemas.auth import RegisterRequest, LoginRequest, TokenResponse
-from app.services.auth_service import create_user, login_and_get_token
+from app.services.auth_service import create_user, login_and_get_token, token_response
 from app.core.security import get_current_user
 from app.models.user import User
 
@@ -11,12 +11,13 @@ from app.models.user import User
 router = APIRouter()
 
 
+# async routes: hashing is awaited on the password pool (see auth_service)
 @router.post("/register")
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+async def register(payload: RegisterRequest, db: Session = Depends(get_db)):
     try:
-        user = create_user(db, payload.username, payload.password)
-        result = login_and_get_token(db, payload.username, payload.password)
-        return result
+        # the password was just hashed, so the token is issued without verifying it again
+        user = await create_user(db, payload.username, payload.password)
+        return token_response(user)
     except ValueError as e:
         if str(e) == "USERNAME_EXISTS":
             raise HTTPException(status_code=409, detail="Username already exists")
@@ -24,9 +25,9 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login")
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(payload: LoginRequest, db: Session = Depends(get_db)):
     try:
-        return login_and_get_token(db, payload.username, payload.password)
+        return await login_and_get_token(db, payload.username, payload.password)
     except ValueError:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
@@ -1,44 +1,185 @@
-﻿from datetime import datetime, timedelta, timezone
+﻿import logging
 import uuid
-from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Literal
+
 from pydantic import BaseModel, Field
+from sqlalchemy import delete
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER, apply_keyset, split_page
+from app.core.query_budget import query_budget
 from app.core.security import get_current_user, require_admin
+from app.db.routing import get_read_db, note_write
 from app.db.session import get_db
-from app.models.product import Product
-from app.models.rental import Rental
-from app.schemas.product import ProductCreate, ProductUpdate
-from app.services.audit_service import log_action
+from app.models.product import PRODUCT_OUT_COLUMNS, Product
+from app.models.product_stripe import ProductStripe
+from app.models.rental import OPEN_STATUSES, Rental
+from app.models.reservation import ProductDayUsage, Reservation
+from app.schemas.product import ProductChangesOut, ProductCreate, ProductOut, ProductUpdate, to_product_out
+from app.services import inventory_service, stripe_service
+from app.services.catalog_service import catalog_etag, changes_since, current_version, record_deletion, touch
+from app.services.event_hub import deleted_event, event_hub, product_event, publish_events, sse_stream
+from app.services.product_cache import generation, invalidate_products, page_cache, remember_products
+from app.services.reservation_service import today
+from app.services.stripe_service import stripe_columns, stripe_sum, summed
+from app.services.summary_service import add_product, get_summary
+from app.services.audit_service import log_action, log_actions
+from app.services.idempotency_service import Idempotency, fingerprint
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 
-def to_product_out(p: Product) -> dict:
-    return {
-        "id": str(p.id),
-        "name": p.name,
-        "category": p.category,
-        "gender": p.gender,
-        "type": p.type,
-        "quantity": p.quantity,
-        "availableQuantity": p.available_quantity,
-        "rentedQuantity": p.rented_quantity,
-    }
+def after_write(db: Session, user_id, events: list[dict]) -> None:
+    """Run after a product mutation (and its catalog version bump) has been committed."""
+    # other workers drop these ids when the events reach them
+    invalidate_products(e["product"]["id"] if e["type"] == "product" else e["id"] for e in events)
+    try:
+        publish_events(db, events)
+        # delivers the NOTIFYs (nothing to commit without REALTIME_NOTIFY)
+        db.commit()
+    except Exception:
+        # the mutation is already committed, so the request still succeeds; the
+        # lost events leave other workers' caches stale for at most the cache TTL
+        db.rollback()
+        logger.exception("Publishing product events failed")
+    note_write(user_id)
+
+
+async def idempotency(
+    request: Request,
+    idempotency_key: str | None = Header(default=None, max_length=200),
+) -> Idempotency:
+    """The optional Idempotency-Key header of a mutating route (see idempotency_service)."""
+    route = f"{request.method} {request.url.path}"
+    if not idempotency_key:
+        return Idempotency(None, route)
+    # the body was already read (and cached on the request) for the route's model
+    return Idempotency(idempotency_key, route, fingerprint(route, await request.body()))
 
 
 # -------------------- Products CRUD --------------------
 
-@router.get("")
+@router.get("", response_model=list[ProductOut])
+# the catalog version, then one page query (stripes included) at most
+@query_budget(2)
 def list_products(
+    response: Response,
+    category: str | None = None,
+    gender: str | None = None,
+    type: str | None = None,
+    inStock: bool = False,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    if_none_match: str | None = Header(default=None),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    # conditional GET: the version is read before any product row, so an
+    # unchanged catalog costs one tiny query and no serialization
+    version = current_version(db)
+    etag = catalog_etag(version)
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+
+    page_key = (version, category, gender, type, inStock, cursor, limit)
+    cached = page_cache.get(page_key)
+    if cached is not None:
+        page, next_cursor = cached
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return page
+
+    # plain column rows, no ORM objects to hydrate and track
+    since = generation()
+    q = db.query(*PRODUCT_OUT_COLUMNS, *stripe_columns())
+
+    if category:
+        q = q.filter(Product.category == category)
+    if gender:
+        q = q.filter(Product.gender == gender)
+    if type:
+        q = q.filter(Product.type == type)
+    if inStock:
+        # row plus stripes, so no partial index can match it (see Product)
+        q = q.filter(Product.available_quantity + stripe_sum(Product.id, ProductStripe.available_quantity) > 0)
+
+    rows = apply_keyset(q, Product.created_at, Product.id, cursor, limit).all()
+    products, next_cursor = split_page(rows, limit, lambda p: (p.created_at, p.id))
+
+    page = [to_product_out(summed(p)) for p in products]
+    page_cache.set(page_key, (page, next_cursor))
+    remember_products(page, since)
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return page
+
+
+@router.get(
+    "/changes",
+    response_model=ProductChangesOut,
+    summary="Product changes since a sync token",
+    description="Without `since` returns the full catalog. Otherwise returns products changed and ids deleted since the token. Always returns the token for the next call.",
+)
+def product_changes(
+    since: str | None = None,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        products, deleted, next_token = changes_since(db, since)
+    except ValueError as e:
+        if str(e) == "SYNC_TOKEN_EXPIRED":
+            raise HTTPException(status_code=410, detail="Sync token expired, full resync required")
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+    return {
+        "changes": [to_product_out(p) for p in products],
+        "deleted": [str(pid) for pid in deleted],
+        "next": next_token,
+    }
+
+
+@router.get(
+    "/summary",
+    summary="Inventory summary",
+    description="Available / rented / taken-out totals per category, gender and type, served from incrementally maintained aggregates.",
+)
+def inventory_summary(
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    return get_summary(db)
+
+
+@router.get(
+    "/stream",
+    summary="Live inventory events",
+    description="Server-Sent Events stream of product changes, optionally filtered by category. A `resync` event means events were dropped and the client should reload the catalog.",
+)
+async def stream_products(
+    request: Request,
+    category: str | None = None,
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    products = db.query(Product).order_by(Product.created_at.desc()).all()
-    return [to_product_out(p) for p in products]
+    # the stream may stay open for hours: give the DB connection back now
+    db.close()
+    sub = event_hub.subscribe(category)
+    if sub is None:
+        raise HTTPException(status_code=503, detail="Too many live subscribers, poll /products instead")
+    return StreamingResponse(
+        sse_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @router.post("")
@@ -46,7 +187,9 @@ def create_product(
     data: ProductCreate,
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
+    idem.check(db, admin.id)
     if data.availableQuantity + data.rentedQuantity != data.quantity:
         raise HTTPException(status_code=400, detail="Total quantity must equal available + rented")
 
@@ -67,23 +210,28 @@ def create_product(
     )
 
     db.add(product)
+    touch(db)
+    # every field of the response is already known, no reload after the commit
+    out = to_product_out(product)
     try:
+        # the product INSERT is sent by the commit (the session does not autoflush)
+        add_product(db, product)
+        idem.remember(db, admin.id, out)
         db.commit()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=409, detail="Product already exists")
-    db.refresh(product)
 
     log_action(
         db=db,
         actor_user_id=str(admin.id),
         action="PRODUCT_CREATE",
-        product_id=str(product.id),
-        qty=product.quantity,
-        meta={"name": product.name, "category": product.category, "type": product.type},
+        product_id=out["id"],
+        qty=out["quantity"],
+        meta={"name": out["name"], "category": out["category"], "type": out["type"]},
     )
-
-    return to_product_out(product)
+    after_write(db, admin.id, [product_event(out)])
+    return out
 
 
 @router.put("/{product_id}")
@@ -92,18 +240,21 @@ def update_product(
     payload: ProductUpdate,
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
+    idem.check(db, admin.id)
+    # the edit works on the whole stock: stripes are folded into the row first
+    # and laid out again below
+    stripes = stripe_service.unstripe(db, product_id)
+    # row lock: the summary delta below must match what this update replaces
+    product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    add_product(db, product, sign=-1)
+    touch(db)
 
     if payload.name is not None:
-        existing = db.query(Product).filter(
-            Product.name == payload.name,
-            Product.id != product.id
-        ).first()
-        if existing:
-            raise HTTPException(status_code=409, detail="Product name already exists")
+        # the unique index on name decides (see the commit below), no pre-check query
         product.name = payload.name
 
     if payload.category is not None:
@@ -123,10 +274,22 @@ def update_product(
     product.quantity = new_quantity
     product.available_quantity = new_available
     product.rented_quantity = new_rented
+    out = to_product_out(product)
 
-    db.commit()
-    db.refresh(product)
-    return to_product_out(product)
+    try:
+        # the session does not autoflush: send the UPDATE now, so a duplicate
+        # name fails here and the stripes are laid out over the new quantities
+        db.flush()
+        add_product(db, product)
+        if stripes:
+            stripe_service.set_stripes(db, product.id, stripes)
+        idem.remember(db, admin.id, out)
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Product name already exists")
+    after_write(db, admin.id, [product_event(out)])
+    return out
 
 
 @router.delete("/{product_id}")
@@ -134,22 +297,49 @@ def delete_product(
     product_id: str,
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
+    idem.check(db, admin.id)
+    # stripes hold part of the stock: fold them in so the summary loses all of it
+    stripe_service.unstripe(db, product_id)
+    product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
 
     active_rental = (
         db.query(Rental)
-        .filter(Rental.product_id == product.id, Rental.status == "ACTIVE")
+        .filter(Rental.product_id == product.id, Rental.status.in_(OPEN_STATUSES))
         .first()
     )
     if active_rental:
-        raise HTTPException(status_code=409, detail="Cannot delete product with ACTIVE rentals")
+        raise HTTPException(status_code=409, detail="Cannot delete product with open (ACTIVE or OVERDUE) rentals")
 
+    # bookings lock the product row too (reservation_service.reserve), so none
+    # can slip in between this check and the delete
+    booked = (
+        db.query(Reservation.id)
+        .filter(
+            Reservation.product_id == product.id,
+            Reservation.status == "ACTIVE",
+            Reservation.end_date >= today(),
+        )
+        .first()
+    )
+    if booked:
+        raise HTTPException(status_code=409, detail="Cannot delete product with active reservations")
+
+    event = deleted_event(str(product.id), product.category)
+    # no day ahead holds units any more: the buckets go with the product
+    db.execute(delete(ProductDayUsage).where(ProductDayUsage.product_id == product.id))
     db.delete(product)
+    add_product(db, product, sign=-1)
+    record_deletion(db, product.id)
+    touch(db)
+    out = {"message": "deleted"}
+    idem.remember(db, admin.id, out)
     db.commit()
-    return {"message": "deleted"}
+    after_write(db, admin.id, [event])
+    return out
 
 
 # -------------------- Inventory Actions --------------------
@@ -163,24 +353,37 @@ class RentRequest(BaseModel):
     days: int = Field(default=2, ge=1, description="Rental duration in days", examples=[2])
 
 
+INVENTORY_ERRORS = {
+    "PRODUCT_NOT_FOUND": (404, "Product not found"),
+    "NOT_ENOUGH_STOCK": (409, "Not enough stock"),
+    "NOTHING_TAKEN": (409, "Nothing to return (taken)"),
+    "NOT_ENOUGH_RENTED": (409, "Not enough rented items to return"),
+    "NO_ACTIVE_RENTAL": (409, "No active rental found for this product"),
+    "RETURN_EXCEEDS_RENTAL": (409, "Return qty exceeds active rental qty"),
+}
+
+
+def inventory_error(e: ValueError) -> HTTPException:
+    status_code, detail = INVENTORY_ERRORS.get(str(e), (400, "Inventory action failed"))
+    return HTTPException(status_code=status_code, detail=detail)
+
+
 @router.post("/{product_id}/take")
 def take_product(
     product_id: str,
     body: QtyRequest,
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    if product.available_quantity < body.qty:
-        raise HTTPException(status_code=409, detail="Not enough stock")
-
-    product.available_quantity -= body.qty
-
-    db.commit()
-    db.refresh(product)
+    idem.check(db, user.id)
+    try:
+        product = inventory_service.take(db, product_id, body.qty)
+    except ValueError as e:
+        raise inventory_error(e)
+    # serialized before the commit below expires the RETURNING row
+    out = to_product_out(product)
+    idem.remember(db, user.id, out)
 
     log_action(
         db=db,
@@ -191,7 +394,8 @@ def take_product(
         meta={"name": product.name},
     )
 
-    return to_product_out(product)
+    after_write(db, user.id, [product_event(out)])
+    return out
 
 
 @router.post("/{product_id}/return-taken")
@@ -200,19 +404,16 @@ def return_taken_product(
     body: QtyRequest,
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    taken_out = product.quantity - product.available_quantity - product.rented_quantity
-    if taken_out < body.qty:
-        raise HTTPException(status_code=409, detail="Nothing to return (taken)")
-
-    product.available_quantity += body.qty
-
-    db.commit()
-    db.refresh(product)
+    idem.check(db, user.id)
+    try:
+        product = inventory_service.return_taken(db, product_id, body.qty)
+    except ValueError as e:
+        raise inventory_error(e)
+    # serialized before the commit below expires the RETURNING row
+    out = to_product_out(product)
+    idem.remember(db, user.id, out)
 
     log_action(
         db=db,
@@ -223,7 +424,8 @@ def return_taken_product(
         meta={"name": product.name},
     )
 
-    return to_product_out(product)
+    after_write(db, user.id, [product_event(out)])
+    return out
 
 
 @router.post(
@@ -236,32 +438,16 @@ def rent_product(
     body: RentRequest,
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    if product.available_quantity < body.qty:
-        raise HTTPException(status_code=409, detail="Not enough stock")
-
-    product.available_quantity -= body.qty
-    product.rented_quantity += body.qty
-
-    start = datetime.now(timezone.utc)
-    end = start + timedelta(days=body.days)
-
-    rental = Rental(
-        product_id=UUID(str(product.id)),
-        user_id=UUID(str(user.id)),
-        qty=body.qty,
-        start_date=start,
-        end_date=end,
-        status="ACTIVE",
-    )
-    db.add(rental)
-
-    db.commit()
-    db.refresh(product)
+    idem.check(db, user.id)
+    try:
+        product, rental = inventory_service.rent(db, product_id, str(user.id), body.qty, body.days)
+    except ValueError as e:
+        raise inventory_error(e)
+    # serialized before the commit below expires the RETURNING row
+    out = to_product_out(product)
+    idem.remember(db, user.id, out)
 
     log_action(
         db=db,
@@ -272,7 +458,8 @@ def rent_product(
         meta={"name": product.name, "days": body.days, "rentalId": str(rental.id)},
     )
 
-    return to_product_out(product)
+    after_write(db, user.id, [product_event(out)])
+    return out
 
 
 @router.post(
@@ -285,39 +472,16 @@ def return_rented_product(
     body: QtyRequest,
     user=Depends(get_current_user),
     db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
 ):
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-
-    if product.rented_quantity < body.qty:
-        raise HTTPException(status_code=409, detail="Not enough rented items to return")
-
-    rental = (
-        db.query(Rental)
-        .filter(
-            Rental.product_id == UUID(str(product.id)),
-            Rental.user_id == UUID(str(user.id)),
-            Rental.status == "ACTIVE",
-            Rental.returned_at.is_(None),
-        )
-        .order_by(Rental.created_at.desc())
-        .first()
-    )
-    if not rental:
-        raise HTTPException(status_code=409, detail="No active rental found for this product")
-
-    if rental.qty < body.qty:
-        raise HTTPException(status_code=409, detail="Return qty exceeds active rental qty")
-
-    product.rented_quantity -= body.qty
-    product.available_quantity += body.qty
-
-    rental.returned_at = datetime.now(timezone.utc)
-    rental.status = "RETURNED"
-
-    db.commit()
-    db.refresh(product)
+    idem.check(db, user.id)
+    try:
+        product, rental_id = inventory_service.return_rented(db, product_id, str(user.id), body.qty)
+    except ValueError as e:
+        raise inventory_error(e)
+    # serialized before the commit below expires the RETURNING row
+    out = to_product_out(product)
+    idem.remember(db, user.id, out)
 
     log_action(
         db=db,
@@ -325,7 +489,100 @@ def return_rented_product(
         action="RETURN_RENTED",
         product_id=str(product.id),
         qty=body.qty,
-        meta={"name": product.name, "rentalId": str(rental.id)},
+        meta={"name": product.name, "rentalId": str(rental_id)},
     )
 
-    return to_product_out(product)
+    after_write(db, user.id, [product_event(out)])
+    return out
+
+
+# -------------------- Bulk Inventory Actions --------------------
+
+class BulkOperation(BaseModel):
+    productId: str
+    action: Literal["take", "return-taken", "rent", "return-rented"]
+    qty: int = Field(default=1, ge=1, description="How many units", examples=[1])
+    days: int = Field(default=2, ge=1, description="Rental duration in days (rent only)", examples=[2])
+
+
+class BulkActionRequest(BaseModel):
+    # atomic: all operations succeed or none is applied
+    # partial: every operation is applied on its own, failures are reported per item
+    mode: Literal["atomic", "partial"] = "atomic"
+    operations: list[BulkOperation] = Field(min_length=1, max_length=200)
+
+
+@router.post(
+    "/bulk-actions",
+    summary="Bulk inventory actions",
+    description="Apply many take/return-taken/rent/return-rented operations in one transaction and report a result per operation.",
+)
+def bulk_actions(
+    body: BulkActionRequest,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+    idem: Idempotency = Depends(idempotency),
+):
+    idem.check(db, user.id)
+    results = []
+    audit_entries = []
+
+    for index, op in enumerate(body.operations):
+        # in partial mode every item gets a savepoint so a failure only undoes itself
+        savepoint = db.begin_nested() if body.mode == "partial" else None
+        try:
+            product, action, meta = inventory_service.run_action(
+                db, op.action, op.productId, str(user.id), op.qty, op.days
+            )
+        except ValueError as e:
+            err = inventory_error(e)
+            results.append({
+                "index": index,
+                "productId": op.productId,
+                "action": op.action,
+                "ok": False,
+                "status": err.status_code,
+                "detail": err.detail,
+            })
+            if savepoint is not None:
+                savepoint.rollback()
+                continue
+            db.rollback()
+            raise HTTPException(
+                status_code=err.status_code,
+                detail={"message": "Bulk action failed, nothing was applied", "results": results},
+            )
+
+        if savepoint is not None:
+            savepoint.commit()
+        results.append({
+            "index": index,
+            "productId": op.productId,
+            "action": op.action,
+            "ok": True,
+            "status": 200,
+            "product": to_product_out(product),
+        })
+        audit_entries.append({
+            "actor_user_id": str(user.id),
+            "action": action,
+            "product_id": str(product.id),
+            "qty": op.qty,
+            "meta": meta,
+        })
+
+    response = {
+        "mode": body.mode,
+        "succeeded": len(audit_entries),
+        "failed": len(results) - len(audit_entries),
+        "results": results,
+    }
+    idem.remember(db, user.id, response)
+
+    # one multi-row audit INSERT and a single commit for the whole batch
+    log_actions(db, audit_entries)
+    # one event per touched product, with its final state
+    latest = {r["product"]["id"]: r["product"] for r in results if r["ok"]}
+    after_write(db, user.id, [product_event(out) for out in latest.values()])
+
+    return response
@@ -1,25 +1,47 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 from sqlalchemy.orm import Session
 from typing import Optional
 
 
+from app.core.pagination import DEFAULT_LIMIT, MAX_LIMIT, NEXT_CURSOR_HEADER, apply_keyset, split_page
+from app.core.query_budget import query_budget
 from app.core.security import get_current_user
-from app.db.session import get_db
+from app.db.routing import get_read_db
 from app.models.rental import Rental
-from app.models.product import Product
+from app.schemas.rental import MyRentalOut, RentalOut
+from app.services.product_cache import get_products
 from app.core.security import get_current_user, require_admin
 
 
 router = APIRouter()
 
+# listings read plain column rows (same attribute names), not Rental objects
+RENTAL_COLUMNS = tuple(Rental.__table__.columns)
 
-@router.get("/my")
+
+def to_rental_out(r, product_map: dict) -> dict:
+    return {
+        "id": str(r.id),
+        "userId": str(r.user_id),
+        "productId": str(r.product_id),
+        "productName": product_map[r.product_id]["name"] if r.product_id in product_map else None,
+        "qty": r.qty,
+        "status": r.status,
+        "startDate": r.start_date.isoformat(),
+        "endDate": r.end_date.isoformat(),
+        "returnedAt": r.returned_at.isoformat() if r.returned_at else None,
+        "createdAt": r.created_at.isoformat(),
+    }
+
+
+@router.get("/my", response_model=list[MyRentalOut])
+@query_budget(2)  # rentals + one batched product lookup, never one per rental
 def my_rentals(
     user=Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     rentals = (
-        db.query(Rental)
+        db.query(*RENTAL_COLUMNS)
         .filter(Rental.user_id == user.id)
         .order_by(Rental.created_at.desc())
         .limit(200)
@@ -27,21 +49,13 @@ def my_rentals(
     )
 
     # כדי להחזיר גם שם מוצר/סוג בלי JOIN מורכב
-    product_ids = list({r.product_id for r in rentals})
-    products = (
-        db.query(Product)
-        .filter(Product.id.in_(product_ids))
-        .all()
-        if product_ids
-        else []
-    )
-    product_map = {p.id: p for p in products}
+    product_map = get_products(db, {r.product_id for r in rentals})
 
     return [
         {
             "id": str(r.id),
             "productId": str(r.product_id),
-            "productName": product_map.get(r.product_id).name if product_map.get(r.product_id) else None,
+            "productName": product_map[r.product_id]["name"] if r.product_id in product_map else None,
             "qty": r.qty,
             "status": r.status,
             "startDate": r.start_date.isoformat(),
@@ -51,15 +65,16 @@ def my_rentals(
         }
         for r in rentals
     ]
-@router.get("")
+@router.get("", response_model=list[RentalOut])
+@query_budget(2)
 def list_rentals(
-    status: str | None = None,      # ACTIVE / RETURNED
+    status: str | None = None,      # ACTIVE / OVERDUE / RETURNED
     userId: str | None = None,
     productId: str | None = None,
     admin=Depends(require_admin),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(Rental)
+    q = db.query(*RENTAL_COLUMNS)
 
     if status:
         q = q.filter(Rental.status == status)
@@ -71,23 +86,27 @@ def list_rentals(
     rentals = q.order_by(Rental.created_at.desc()).limit(500).all()
 
     # bring product names (optional nice-to-have)
-    product_ids = list({r.product_id for r in rentals})
-    products = db.query(Product).filter(Product.id.in_(product_ids)).all() if product_ids else []
-    product_map = {p.id: p for p in products}
+    product_map = get_products(db, {r.product_id for r in rentals})
 
-    return [
-        {
-            "id": str(r.id),
-            "userId": str(r.user_id),
-            "productId": str(r.product_id),
-            "productName": product_map.get(r.product_id).name if product_map.get(r.product_id) else None,
-            "qty": r.qty,
-            "status": r.status,
-            "startDate": r.start_date.isoformat(),
-            "endDate": r.end_date.isoformat(),
-            "returnedAt": r.returned_at.isoformat() if r.returned_at else None,
-            "createdAt": r.created_at.isoformat(),
-        }
-        for r in rentals
-    ]
+    return [to_rental_out(r, product_map) for r in rentals]
+
+
+@router.get("/overdue", response_model=list[RentalOut])
+def overdue_rentals(
+    response: Response,
+    cursor: str | None = None,
+    limit: int = Query(default=DEFAULT_LIMIT, ge=1, le=MAX_LIMIT),
+    admin=Depends(require_admin),
+    db: Session = Depends(get_read_db),
+):
+    # keyset on (end_date, id) over the partial OVERDUE index, latest due date first
+    q = db.query(*RENTAL_COLUMNS).filter(Rental.status == "OVERDUE")
+    rows = apply_keyset(q, Rental.end_date, Rental.id, cursor, limit).all()
+    rentals, next_cursor = split_page(rows, limit, lambda r: (r.end_date, r.id))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+
+    product_map = get_products(db, {r.product_id for r in rentals})
+    return [to_rental_out(r, product_map) for r in rentals]
 
@@ -0,0 +1,164 @@
+from datetime import date
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from app.api.products import INVENTORY_ERRORS, after_write
+from app.core.security import get_current_user
+from app.db.routing import get_read_db, note_write
+from app.db.session import get_db
+from app.models.reservation import Reservation
+from app.schemas.product import to_product_out
+from app.services import inventory_service, reservation_service
+from app.services.audit_service import log_action
+from app.services.event_hub import product_event
+
+router = APIRouter()
+
+
+class ReservationRequest(BaseModel):
+    productId: str
+    qty: int = Field(default=1, ge=1, description="How many units", examples=[1])
+    startDate: date = Field(description="First reserved day")
+    endDate: date = Field(description="Last reserved day (inclusive)")
+
+
+RESERVATION_ERRORS = {
+    **INVENTORY_ERRORS,
+    "INVALID_RANGE": (400, "endDate must not be before startDate, and startDate must not be in the past"),
+    "RANGE_TOO_LONG": (400, "Reservation range is too long"),
+    "RESERVATION_NOT_FOUND": (404, "Reservation not found"),
+    "RESERVATION_CLOSED": (409, "Reservation is no longer active"),
+    "RESERVATION_NOT_STARTED": (409, "Reservation has not started yet"),
+}
+
+
+def reservation_error(e: ValueError) -> HTTPException:
+    status_code, detail = RESERVATION_ERRORS.get(str(e), (400, "Reservation failed"))
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def to_reservation_out(r: Reservation) -> dict:
+    return {
+        "id": str(r.id),
+        "productId": str(r.product_id),
+        "userId": str(r.user_id),
+        "qty": r.qty,
+        "status": r.status,
+        "startDate": r.start_date.isoformat(),
+        "endDate": r.end_date.isoformat(),
+        "createdAt": r.created_at.isoformat(),
+    }
+
+
+@router.get("/availability")
+def availability(
+    productIds: list[str] = Query(min_length=1, max_length=500),
+    start: date = Query(),
+    end: date = Query(),
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    try:
+        ids = [UUID(pid) for pid in productIds]
+        free = reservation_service.availability(db, ids, start, end)
+    except ValueError as e:
+        raise reservation_error(e)
+    return [{"productId": str(pid), "available": qty} for pid, qty in free.items()]
+
+
+@router.get("/my")
+def my_reservations(
+    user=Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    rows = (
+        db.query(Reservation)
+        .filter(Reservation.user_id == user.id)
+        .order_by(Reservation.start_date.desc())
+        .limit(200)
+        .all()
+    )
+    return [to_reservation_out(r) for r in rows]
+
+
+@router.post("")
+def create_reservation(
+    body: ReservationRequest,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        r = reservation_service.reserve(db, body.productId, str(user.id), body.qty, body.startDate, body.endDate)
+    except ValueError as e:
+        raise reservation_error(e)
+    out = to_reservation_out(r)
+
+    log_action(
+        db=db,
+        actor_user_id=str(user.id),
+        action="RESERVE",
+        product_id=out["productId"],
+        qty=body.qty,
+        meta={"reservationId": out["id"], "startDate": out["startDate"], "endDate": out["endDate"]},
+    )
+    note_write(user.id)
+    return out
+
+
+@router.delete("/{reservation_id}")
+def cancel_reservation(
+    reservation_id: str,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    try:
+        r = reservation_service.close(db, reservation_id, user, "CANCELLED")
+    except ValueError as e:
+        raise reservation_error(e)
+    out = to_reservation_out(r)
+
+    log_action(
+        db=db,
+        actor_user_id=str(user.id),
+        action="CANCEL_RESERVATION",
+        product_id=out["productId"],
+        qty=r.qty,
+        meta={"reservationId": out["id"]},
+    )
+    note_write(user.id)
+    return out
+
+
+@router.post("/{reservation_id}/fulfil")
+def fulfil_reservation(
+    reservation_id: str,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Turn a started reservation into a rental running until its last day."""
+    try:
+        r = reservation_service.close(db, reservation_id, user, "FULFILLED")
+        today = reservation_service.today()
+        if r.start_date > today:
+            raise ValueError("RESERVATION_NOT_STARTED")
+        # the reserved days were released above, so rent's own check sees them free
+        days = max((r.end_date - today).days, 1)
+        product, rental = inventory_service.rent(db, str(r.product_id), str(r.user_id), r.qty, days)
+    except ValueError as e:
+        raise reservation_error(e)
+    out = to_product_out(product)
+
+    log_action(
+        db=db,
+        actor_user_id=str(user.id),
+        action="RENT",
+        product_id=out["id"],
+        qty=r.qty,
+        meta={"name": product.name, "days": days, "rentalId": str(rental.id), "reservationId": str(r.id)},
+    )
+
+    after_write(db, user.id, [product_event(out)])
+    return {"reservationId": str(r.id), "rentalId": str(rental.id), "product": out}
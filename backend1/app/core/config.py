@@ -8,9 +8,83 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), "..", ".env"))
 def get_settings():
     return {
         "DATABASE_URL": os.getenv("DATABASE_URL", ""),
+        # read replicas for read-only endpoints (comma separated URLs)
+        "DATABASE_REPLICA_URLS": [u.strip() for u in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if u.strip()],
+        "REPLICA_SELECTION": os.getenv("REPLICA_SELECTION", "round_robin"),  # round_robin | least_loaded
+        "REPLICA_RETRY_SECONDS": float(os.getenv("REPLICA_RETRY_SECONDS", "30")),
+        # after a user's own write their reads go to the primary for this long (0 = off);
+        # keep it above the replicas' usual lag
+        "READ_YOUR_WRITES_SECONDS": float(os.getenv("READ_YOUR_WRITES_SECONDS", "5")),
+        # connection pool (per worker process) and SQL logging
+        "DB_POOL_SIZE": int(os.getenv("DB_POOL_SIZE", "5")),
+        "DB_MAX_OVERFLOW": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "DB_POOL_TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", "30")),
+        "DB_POOL_RECYCLE": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "DB_POOL_PRE_PING": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "DB_STATEMENT_TIMEOUT_MS": int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0")),
+        "DB_ECHO": os.getenv("DB_ECHO", "false").lower() == "true",
+        # serve the API from the async routers (asyncpg + AsyncSession)
+        "DB_ASYNC": os.getenv("DB_ASYNC", "false").lower() == "true",
+        "ASYNC_DATABASE_URL": os.getenv("ASYNC_DATABASE_URL", ""),
         "JWT_SECRET": os.getenv("JWT_SECRET", "change-me"),
         "JWT_ALGORITHM": os.getenv("JWT_ALGORITHM", "HS256"),
         "JWT_EXPIRE_MINUTES": int(os.getenv("JWT_EXPIRE_MINUTES", "60")),
+        # password hashing: Argon2 parameters (hashes made with other values are
+        # upgraded on the next login) and the dedicated hashing pool
+        "ARGON2_TIME_COST": int(os.getenv("ARGON2_TIME_COST", "2")),
+        "ARGON2_MEMORY_COST": int(os.getenv("ARGON2_MEMORY_COST", "102400")),
+        "ARGON2_PARALLELISM": int(os.getenv("ARGON2_PARALLELISM", "8")),
+        "PASSWORD_HASH_WORKERS": int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+        "PASSWORD_HASH_MAX_PENDING": int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32")),
+        # catalog version (ETag) counter rows: writers bump a random one
+        "CATALOG_VERSION_SLOTS": int(os.getenv("CATALOG_VERSION_SLOTS", "16")),
+        # delta sync (GET /products/changes)
+        "PRODUCT_TOMBSTONE_DAYS": int(os.getenv("PRODUCT_TOMBSTONE_DAYS", "30")),
+        # live inventory stream (GET /products/stream)
+        "REALTIME_NOTIFY": os.getenv("REALTIME_NOTIFY", "false").lower() == "true",  # fan out via LISTEN/NOTIFY
+        "REALTIME_MAX_SUBSCRIBERS": int(os.getenv("REALTIME_MAX_SUBSCRIBERS", "1000")),
+        "REALTIME_CLIENT_QUEUE": int(os.getenv("REALTIME_CLIENT_QUEUE", "100")),
+        # per-worker product caches (served with REALTIME_NOTIFY only; the TTL bounds a lost invalidation)
+        "PRODUCT_CACHE_SIZE": int(os.getenv("PRODUCT_CACHE_SIZE", "10000")),
+        "PRODUCT_PAGE_CACHE_SIZE": int(os.getenv("PRODUCT_PAGE_CACHE_SIZE", "256")),
+        "PRODUCT_CACHE_TTL_SECONDS": float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "30")),
+        # overdue rental scanner (0 disables it in this worker)
+        "OVERDUE_SCAN_INTERVAL_SECONDS": float(os.getenv("OVERDUE_SCAN_INTERVAL_SECONDS", "300")),
+        "OVERDUE_SCAN_BATCH_SIZE": int(os.getenv("OVERDUE_SCAN_BATCH_SIZE", "1000")),
+        # future reservations: longest bookable range, in days
+        "RESERVATION_MAX_DAYS": int(os.getenv("RESERVATION_MAX_DAYS", "60")),
+        # request metrics at GET /metrics, and the slow-request log (0 = off) with
+        # up to SLOW_REQUEST_MAX_STATEMENTS SQL statements of each slow request
+        "METRICS_ENABLED": os.getenv("METRICS_ENABLED", "true").lower() == "true",
+        "SLOW_REQUEST_MS": float(os.getenv("SLOW_REQUEST_MS", "500")),
+        "SLOW_REQUEST_MAX_STATEMENTS": int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50")),
+        # query budgets: off | log | raise, plus an optional budget for every request (0 = none)
+        "QUERY_BUDGET_MODE": os.getenv("QUERY_BUDGET_MODE", "off"),
+        "QUERY_BUDGET_PER_REQUEST": int(os.getenv("QUERY_BUDGET_PER_REQUEST", "0")),
+        # Idempotency-Key on product mutations: how long a key is honoured, and the
+        # sweeper deleting expired keys (interval 0 = off)
+        "IDEMPOTENCY_TTL_HOURS": float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24")),
+        "IDEMPOTENCY_SWEEP_INTERVAL_SECONDS": float(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL_SECONDS", "600")),
+        "IDEMPOTENCY_SWEEP_BATCH_SIZE": int(os.getenv("IDEMPOTENCY_SWEEP_BATCH_SIZE", "1000")),
+        # striped stock counters for hot products: most stripes per product, and how
+        # often drained stripes are refilled (0 = off)
+        "STRIPES_MAX": int(os.getenv("STRIPES_MAX", "64")),
+        "STRIPE_REBALANCE_INTERVAL_SECONDS": float(os.getenv("STRIPE_REBALANCE_INTERVAL_SECONDS", "5")),
+        # resolved-user cache used by get_current_user; the TTL is how long a role /
+        # block change made outside this process can go unnoticed (0 = no cache)
+        "USER_CACHE_SIZE": int(os.getenv("USER_CACHE_SIZE", "4096")),
+        "USER_CACHE_TTL_SECONDS": float(os.getenv("USER_CACHE_TTL_SECONDS", "30")),
+        # audit pipeline: "strict" (same transaction) or "buffered" (write-behind)
+        "AUDIT_MODE": os.getenv("AUDIT_MODE", "strict"),
+        "AUDIT_QUEUE_SIZE": int(os.getenv("AUDIT_QUEUE_SIZE", "10000")),
+        "AUDIT_BATCH_SIZE": int(os.getenv("AUDIT_BATCH_SIZE", "500")),
+        "AUDIT_FLUSH_INTERVAL_MS": int(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200")),
+        # monthly audit partitions: months kept in Postgres (0 = keep all), months
+        # created ahead, where archived months go, and how often the job runs (0 = off)
+        "AUDIT_RETENTION_MONTHS": int(os.getenv("AUDIT_RETENTION_MONTHS", "12")),
+        "AUDIT_PARTITIONS_AHEAD": int(os.getenv("AUDIT_PARTITIONS_AHEAD", "3")),
+        "AUDIT_ARCHIVE_DIR": os.getenv("AUDIT_ARCHIVE_DIR", "audit_archive"),
+        "AUDIT_RETENTION_INTERVAL_SECONDS": float(os.getenv("AUDIT_RETENTION_INTERVAL_SECONDS", "3600")),
     }
 
 
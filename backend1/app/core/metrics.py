@@ -0,0 +1,195 @@
+import bisect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Per-request timing and database instrumentation, exposed at GET /metrics in
+# Prometheus text format.
+#
+# The HTTP middleware puts a RequestStats in a context variable; SQLAlchemy
+# engine events (registered on the Engine class, so the primary, the replicas
+# and the async engine's sync core are all covered) add every statement, its
+# duration and every commit to it. Sync endpoints run in a worker thread with
+# a copy of the request context, and AsyncSession.run_sync stays in the same
+# context, so the stats object is shared in both modes.
+#
+# Numbers are per worker process; Prometheus sums them across targets.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds", "commits", "statements", "keep")
+
+    def __init__(self, keep: int):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.commits = 0
+        # the first `keep` statements, for the slow-request log
+        self.statements: list[tuple[float, str]] = []
+        self.keep = keep
+
+
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_stats() -> RequestStats | None:
+    return _current.get()
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: dict[tuple, int] = {}           # (method, route, status) -> count
+        self.latency: dict[tuple, Histogram] = {}      # (method, route) -> seconds
+        self.queries: dict[tuple, Histogram] = {}      # (method, route) -> statements per request
+        self.db_seconds: dict[tuple, float] = {}       # (method, route) -> total DB time
+        self.commits: dict[tuple, int] = {}            # (method, route) -> commits
+        self.slow_requests = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] = self.requests.get((method, route, status), 0) + 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_BUCKETS)).observe(stats.queries)
+            self.db_seconds[key] = self.db_seconds.get(key, 0.0) + stats.db_seconds
+            self.commits[key] = self.commits.get(key, 0) + stats.commits
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        out: list[str] = []
+        with self._lock:
+            out += [
+                "# HELP http_requests_total Requests by route and status code.",
+                "# TYPE http_requests_total counter",
+            ]
+            for (method, route, status), n in sorted(self.requests.items()):
+                out.append(f'http_requests_total{{method="{method}",route="{_esc(route)}",status="{status}"}} {n}')
+            _histogram(out, "http_request_duration_seconds", "Request latency.", self.latency)
+            _histogram(out, "http_request_db_queries", "SQL statements per request.", self.queries)
+            out += [
+                "# HELP http_request_db_seconds_total Time spent in SQL statements.",
+                "# TYPE http_request_db_seconds_total counter",
+            ]
+            for (method, route), v in sorted(self.db_seconds.items()):
+                out.append(f'http_request_db_seconds_total{{method="{method}",route="{_esc(route)}"}} {v}')
+            out += [
+                "# HELP http_request_db_commits_total Transaction commits.",
+                "# TYPE http_request_db_commits_total counter",
+            ]
+            for (method, route), v in sorted(self.commits.items()):
+                out.append(f'http_request_db_commits_total{{method="{method}",route="{_esc(route)}"}} {v}')
+            out += [
+                "# HELP http_slow_requests_total Requests slower than SLOW_REQUEST_MS.",
+                "# TYPE http_slow_requests_total counter",
+                f"http_slow_requests_total {self.slow_requests}",
+            ]
+        return "\n".join(out) + "\n"
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _histogram(out: list[str], name: str, help_text: str, series: dict):
+    out += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), h in sorted(series.items()):
+        labels = f'method="{method}",route="{_esc(route)}"'
+        cumulative = 0
+        for bound, n in zip(h.buckets, h.counts):
+            cumulative += n
+            out.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        out.append(f'{name}_bucket{{{labels},le="+Inf"}} {h.count}')
+        out.append(f"{name}_sum{{{labels}}} {h.sum}")
+        out.append(f"{name}_count{{{labels}}} {h.count}")
+
+
+metrics = Metrics()
+
+
+# -------------------- SQLAlchemy hooks --------------------
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None or not conn.info.get("query_start"):
+        return
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats.queries += 1
+    stats.db_seconds += elapsed
+    if len(stats.statements) < stats.keep:
+        stats.statements.append((elapsed, statement))
+
+
+@event.listens_for(Engine, "commit")
+def _on_commit(conn):
+    stats = _current.get()
+    if stats is not None:
+        stats.commits += 1
+
+
+# -------------------- middleware --------------------
+
+def metrics_middleware(slow_ms: float, keep_statements: int):
+    """An `@app.middleware("http")` function recording every request."""
+
+    async def middleware(request, call_next):
+        stats = RequestStats(keep_statements)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            elapsed = time.perf_counter() - start
+            _current.reset(token)
+            route = request.scope.get("route")
+            # the route template keeps label cardinality bounded (no ids)
+            path = route.path if route is not None else "<unmatched>"
+            metrics.observe(request.method, path, status, elapsed, stats)
+            if slow_ms and elapsed * 1000 >= slow_ms:
+                _log_slow(request.method, request.url.path, status, elapsed, stats)
+
+    return middleware
+
+
+def _log_slow(method: str, path: str, status: int, elapsed: float, stats: RequestStats):
+    with metrics._lock:
+        metrics.slow_requests += 1
+    lines = [f"  {ms * 1000:8.1f} ms  {' '.join(sql.split())[:500]}" for ms, sql in stats.statements]
+    if stats.queries > len(stats.statements):
+        lines.append(f"  ... {stats.queries - len(stats.statements)} more statement(s)")
+    logger.warning(
+        "Slow request %s %s -> %d in %.0f ms (%d queries, %.0f ms in DB, %d commits)\n%s",
+        method, path, status, elapsed * 1000, stats.queries, stats.db_seconds * 1000, stats.commits,
+        "\n".join(lines),
+    )
@@ -0,0 +1,131 @@
+import functools
+import inspect
+import logging
+import os
+import traceback
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Query budgets: "this block / handler may run at most N SQL statements".
+#
+#   with query_budget(2, mode="raise"):        # in a test
+#       client.get("/rentals/my", headers=...)
+#
+#   @router.get("/my")
+#   @query_budget(2)                           # on a handler
+#   def my_rentals(...): ...
+#
+# The mode comes from QUERY_BUDGET_MODE unless given:
+#   off   - budgets are not even tracked (production default)
+#   log   - a violation is logged with every statement and the app frames that
+#           issued it (staging)
+#   raise - a violation raises QueryBudgetExceeded (tests / CI)
+# QUERY_BUDGET_PER_REQUEST > 0 also puts every request under that budget.
+#
+# Statements are seen through a before_cursor_execute listener on the Engine
+# class, so every engine counts, and budgets nest: a statement counts against
+# every enclosing budget.
+
+_active: ContextVar[tuple] = ContextVar("query_budgets", default=())
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryBudget:
+    def __init__(self, max_queries: int, label: str | None = None, mode: str | None = None):
+        self.max_queries = max_queries
+        self.label = label
+        self.mode = mode
+        self.statements: list[tuple[str, list[str]]] = []
+        self._token = None
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        if (self.mode or settings["QUERY_BUDGET_MODE"]) != "off":
+            self._token = _active.set(_active.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._token is None:
+            return False
+        _active.reset(self._token)
+        self._token = None
+        if exc_type is None and self.count > self.max_queries:
+            self._violated()
+        return False
+
+    def __call__(self, fn):
+        """Use as a decorator: every call gets a fresh budget."""
+        label = self.label or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with QueryBudget(self.max_queries, label, self.mode):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with QueryBudget(self.max_queries, label, self.mode):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def report(self) -> str:
+        lines = [f"{self.label or 'query budget'}: {self.count} statements, budget {self.max_queries}"]
+        for i, (sql, stack) in enumerate(self.statements, 1):
+            lines.append(f"  {i}. {' '.join(sql.split())[:300]}")
+            lines += [f"       at {frame}" for frame in stack]
+        return "\n".join(lines)
+
+    def _violated(self):
+        if (self.mode or settings["QUERY_BUDGET_MODE"]) == "raise":
+            raise QueryBudgetExceeded(self.report())
+        logger.warning("Query budget exceeded: %s", self.report())
+
+
+def query_budget(max_queries: int, label: str | None = None, mode: str | None = None) -> QueryBudget:
+    """Context manager / decorator limiting the SQL statements of a block."""
+    return QueryBudget(max_queries, label, mode)
+
+
+def _app_stack() -> list[str]:
+    # only our own frames: the SQLAlchemy / Starlette part of the stack is the
+    # same for every statement
+    return [
+        f"{os.path.relpath(f.filename, os.path.dirname(_APP_DIR))}:{f.lineno} in {f.name}"
+        for f in traceback.extract_stack()
+        if f.filename.startswith(_APP_DIR) and f.filename != __file__
+    ]
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    budgets = _active.get()
+    if budgets:
+        entry = (statement, _app_stack())
+        for budget in budgets:
+            budget.statements.append(entry)
+
+
+def query_budget_middleware(max_queries: int):
+    """An `@app.middleware("http")` function putting every request under a budget."""
+
+    async def middleware(request, call_next):
+        with QueryBudget(max_queries, f"{request.method} {request.url.path}"):
+            return await call_next(request)
+
+    return middleware
@@ -5,7 +5,13 @@ from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__time_cost=settings["ARGON2_TIME_COST"],
+    argon2__memory_cost=settings["ARGON2_MEMORY_COST"],
+    argon2__parallelism=settings["ARGON2_PARALLELISM"],
+)
 
 
 def hash_password(password: str) -> str:
@@ -28,34 +34,101 @@ def create_access_token(subject: str, role: str) -> str:
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.db.session import get_db
+from app.core.cache import TTLCache
+from app.db.session import get_async_db, get_db
 from app.models.user import User
 from uuid import UUID
 
 
 auth_scheme = HTTPBearer()
 
+# token subject -> resolved user fields, so authenticated requests do not hit
+# `users` every time. The cache is per worker process, and the only
+# invalidation is the mapper events below: a role / block change or deletion
+# made through the ORM drops the entry in the process that made it. Every other
+# change (another worker, another service, plain SQL) takes effect after at
+# most USER_CACHE_TTL_SECONDS, which is the staleness bound for revoking access.
+# USER_CACHE_TTL_SECONDS=0 turns the cache off.
+user_cache = TTLCache(
+    max_size=settings["USER_CACHE_SIZE"],
+    ttl=settings["USER_CACHE_TTL_SECONDS"],
+)
 
-def get_current_user(
-    creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    token = creds.credentials
+
+def invalidate_user(user_id) -> None:
+    user_cache.invalidate(str(user_id))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    invalidate_user(target.id)
+
+
+def _cached_user(fields: dict) -> User:
+    # a transient User: never attached to a session, only read by the routes
+    return User(**fields)
+
+
+def token_subject(token: str) -> str:
     try:
         payload = jwt.decode(token, settings["JWT_SECRET"], algorithms=[settings["JWT_ALGORITHM"]])
         user_id = payload.get("sub")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
+        return user_id
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == UUID(user_id)).first()
+
+def _remember(user_id: str, user: User | None) -> User:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+    user_cache.set(user_id, {
+        "id": user.id,
+        "username": user.username,
+        "role": user.role,
+        "is_blocked_until": user.is_blocked_until,
+    })
     return user
+
+
+def get_current_user(
+    creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    user_id = token_subject(creds.credentials)
+
+    fields = user_cache.get(user_id)
+    if fields is not None:
+        return _cached_user(fields)
+
+    user = db.query(User).filter(User.id == UUID(user_id)).first()
+    return _remember(user_id, user)
+
+
+async def get_current_user_async(
+    creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    user_id = token_subject(creds.credentials)
+
+    fields = user_cache.get(user_id)
+    if fields is not None:
+        return _cached_user(fields)
+
+    user = (await db.execute(select(User).where(User.id == UUID(user_id)))).scalar_one_or_none()
+    return _remember(user_id, user)
 def require_admin(current_user: User = Depends(get_current_user)) -> User:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
     return current_user
 
+
+async def require_admin_async(current_user: User = Depends(get_current_user_async)) -> User:
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin only")
+    return current_user
@@ -0,0 +1,75 @@
+import json
+import sys
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.audit_log import AuditLog
+from app.services.audit_archive_service import archive_expired, ensure_partitions, is_partitioned, month_start
+
+
+# Monthly partitions of audit_logs.
+#   python -m app.db.audit_partitions migrate  -> convert an existing plain audit_logs table (one transaction,
+#                                                 so a failure leaves the old table untouched)
+#   python -m app.db.audit_partitions ensure   -> create upcoming monthly partitions (moving their rows
+#                                                 out of the default partition)
+#   python -m app.db.audit_partitions archive  -> export + drop months past AUDIT_RETENTION_MONTHS (and
+#                                                 export + delete the default partition's rows that old)
+#   python -m app.db.audit_partitions indexes  -> create audit_logs indexes added since the table was made
+def migrate(db) -> int:
+    if is_partitioned(db):
+        print("✅ audit_logs is already partitioned")
+        return 0
+    # the old table keeps its data until the copy below; its index and primary
+    # key names are freed so the partitioned table can reuse them
+    db.execute(text("ALTER TABLE audit_logs RENAME TO audit_logs_legacy"))
+    db.execute(text("ALTER TABLE audit_logs_legacy RENAME CONSTRAINT audit_logs_pkey TO audit_logs_legacy_pkey"))
+    for index in AuditLog.__table__.indexes:
+        db.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+    AuditLog.__table__.create(db.connection())
+
+    oldest = db.execute(text("SELECT min(created_at) FROM audit_logs_legacy")).scalar()
+    ensure_partitions(db, settings["AUDIT_PARTITIONS_AHEAD"], since=month_start(oldest) if oldest else None)
+
+    columns = ", ".join(c.name for c in AuditLog.__table__.columns)
+    copied = db.execute(text(
+        f"INSERT INTO audit_logs ({columns}) "
+        f"SELECT {columns.replace('created_at', 'coalesce(created_at, now())')} FROM audit_logs_legacy"
+    )).rowcount
+    db.execute(text("DROP TABLE audit_logs_legacy"))
+    db.commit()
+    print(f"✅ moved {copied} audit rows into the partitioned table")
+    return 0
+
+
+def main(argv: list[str]) -> int:
+    command = argv[0] if argv else "ensure"
+    db = SessionLocal()
+    try:
+        if command == "migrate":
+            return migrate(db)
+        if command == "ensure":
+            created = ensure_partitions(db, settings["AUDIT_PARTITIONS_AHEAD"])
+            db.commit()
+            print(f"✅ created {len(created)} partition(s): {', '.join(created) or '-'}")
+            return 0
+        if command == "indexes":
+            # an index on the partitioned parent is created on every partition too
+            for index in AuditLog.__table__.indexes:
+                index.create(db.connection(), checkfirst=True)
+            db.commit()
+            print("✅ audit_logs indexes are in place")
+            return 0
+        if command == "archive":
+            for entry in archive_expired(db, settings["AUDIT_RETENTION_MONTHS"], settings["AUDIT_ARCHIVE_DIR"]):
+                print(json.dumps(entry))
+            return 0
+    finally:
+        db.close()
+    print(f"unknown command: {command} (use migrate | ensure | archive | indexes)")
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
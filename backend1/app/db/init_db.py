@@ -1,9 +1,19 @@
-from app.db.session import engine
+from sqlalchemy import text
+
+from app.db.session import SessionLocal, engine
+from app.core.config import settings
 from app.db.base import Base
 from app.models.user import User  # noqa: F401
 from app.models.product import Product  # noqa: F401
 from app.models.audit_log import AuditLog  # noqa: F401
 from app.models.rental import Rental  # noqa: F401
+from app.models.catalog_state import CatalogState  # noqa: F401
+from app.models.product_tombstone import ProductTombstone  # noqa: F401
+from app.models.inventory_summary import InventorySummary  # noqa: F401
+from app.models.reservation import ProductDayUsage, Reservation  # noqa: F401
+from app.models.idempotency_key import IdempotencyKey  # noqa: F401
+from app.models.product_stripe import ProductStripe  # noqa: F401
+from app.services.audit_archive_service import ensure_partitions
 
 
 # חשוב: לייבא מודלים כדי ש-Base יכיר אותם
@@ -12,6 +22,20 @@ from app.models.user import User  # noqa: F401
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    if engine.dialect.name == "postgresql":
+        # audit_logs is partitioned by month; create the current and upcoming months
+        db = SessionLocal()
+        try:
+            ensure_partitions(db, settings["AUDIT_PARTITIONS_AHEAD"])
+            # create_all neither adds columns to existing tables nor drops indexes
+            db.execute(text("ALTER TABLE idempotency_keys ADD COLUMN IF NOT EXISTS fingerprint varchar(64)"))
+            db.execute(text("DROP INDEX IF EXISTS ix_products_in_stock_created_at_id"))
+            for table in ("products", "product_stripes", "product_tombstones"):
+                db.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS change_xid xid8"))
+                db.execute(text(f"CREATE INDEX IF NOT EXISTS ix_{table}_change_xid ON {table} (change_xid)"))
+            db.commit()
+        finally:
+            db.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,88 @@
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# Pool instrumentation for GET /admin/pool-stats.
+# Wait time is measured around Pool._do_get, i.e. the time a request spends
+# getting a connection from the pool (including opening a new one when the
+# pool may still grow).
+
+RATE_WINDOW_SECONDS = 60
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = 0
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._created_at: deque = deque()
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def record_connect(self):
+        now = time.monotonic()
+        with self._lock:
+            self.created += 1
+            self._created_at.append(now)
+            self._trim(now)
+
+    def _trim(self, now: float):
+        while self._created_at and self._created_at[0] < now - RATE_WINDOW_SECONDS:
+            self._created_at.popleft()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._trim(time.monotonic())
+            return {
+                "connectionsCreated": self.created,
+                "connectionsCreatedPerSecond": len(self._created_at) / RATE_WINDOW_SECONDS,
+                "checkouts": self.checkouts,
+                "waitAvgMs": (self.wait_total / self.checkouts * 1000) if self.checkouts else 0.0,
+                "waitMaxMs": self.wait_max * 1000,
+            }
+
+
+class _TimedGet:
+    _metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self._metrics.record_wait(time.perf_counter() - start)
+
+
+def instrumented_pool_class(base, metrics: PoolMetrics):
+    """A subclass of `base` (QueuePool / AsyncAdaptedQueuePool) that reports
+    checkout wait times into `metrics`."""
+    return type(f"Instrumented{base.__name__}", (_TimedGet, base), {"_metrics": metrics})
+
+
+def instrument(engine, metrics: PoolMetrics):
+    """Count new DBAPI connections. `engine` is a sync Engine (for an
+    AsyncEngine pass its .sync_engine)."""
+    event.listen(engine, "connect", lambda dbapi_conn, record: metrics.record_connect())
+
+
+def pool_stats(engine, metrics: PoolMetrics) -> dict:
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checkedOut": pool.checkedout(),
+            "checkedIn": pool.checkedin(),
+            "overflow": pool.overflow(),
+        })
+    stats.update(metrics.snapshot())
+    return stats
@@ -0,0 +1,29 @@
+import json
+import sys
+
+from app.db.session import SessionLocal
+from app.services.summary_service import reconcile
+
+
+# Rebuild inventory_summary from products and report drift.
+#   python -m app.db.reconcile_summary            -> fix
+#   python -m app.db.reconcile_summary --check    -> report only (exit code 1 on drift)
+def main(argv: list[str]) -> int:
+    check_only = "--check" in argv
+    db = SessionLocal()
+    try:
+        drift = reconcile(db, fix=not check_only)
+    finally:
+        db.close()
+
+    for entry in drift:
+        print(json.dumps(entry))
+    if not drift:
+        print("✅ inventory_summary matches products")
+        return 0
+    print(f"{'⚠️ found' if check_only else '✅ fixed'} drift in {len(drift)} group(s)")
+    return 1 if check_only else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,116 @@
+import logging
+import threading
+import time
+
+from fastapi import HTTPException, Request
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.pool import QueuePool
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.security import token_subject
+from app.db.session import ReadSessionLocal, SessionLocal, replica_engines
+
+logger = logging.getLogger(__name__)
+
+# Session routing for read-only endpoints: they depend on get_read_db instead
+# of get_db and are served by a replica when one is configured and healthy.
+# A replica that fails to connect is skipped for REPLICA_RETRY_SECONDS and
+# the request falls back to the primary. Only the connect is covered: a replica
+# that drops the connection mid-request fails that request.
+#
+# Replicas lag the primary. A user who just wrote is pinned to the primary for
+# READ_YOUR_WRITES_SECONDS (write routes call note_write), so they see their own
+# change; that window has to cover the replicas' lag. Nothing else waits for
+# replication: other users' reads may trail the primary by the current lag.
+
+
+class ReplicaRouter:
+    def __init__(self, engines: list, strategy: str, retry_after: float):
+        self.engines = engines
+        self.strategy = strategy
+        self.retry_after = retry_after
+        self._down_until: dict[int, float] = {}
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _healthy(self) -> list:
+        now = time.monotonic()
+        return [e for i, e in enumerate(self.engines) if self._down_until.get(i, 0) <= now]
+
+    def pick(self):
+        with self._lock:
+            healthy = self._healthy()
+            if not healthy:
+                return None
+            if self.strategy == "least_loaded":
+                return min(healthy, key=_checked_out)
+            engine = healthy[self._next % len(healthy)]
+            self._next += 1
+            return engine
+
+    def mark_down(self, engine):
+        with self._lock:
+            self._down_until[self.engines.index(engine)] = time.monotonic() + self.retry_after
+
+
+def _checked_out(engine) -> int:
+    pool = engine.pool
+    return pool.checkedout() if isinstance(pool, QueuePool) else 0
+
+
+replica_router = ReplicaRouter(
+    replica_engines,
+    strategy=settings["REPLICA_SELECTION"],
+    retry_after=settings["REPLICA_RETRY_SECONDS"],
+)
+
+# user id -> marker, kept for READ_YOUR_WRITES_SECONDS after the user's last write
+recent_writers = TTLCache(max_size=100_000, ttl=settings["READ_YOUR_WRITES_SECONDS"])
+
+
+def note_write(user_id) -> None:
+    """Pin the user's reads to the primary for the read-your-writes window."""
+    if replica_engines and settings["READ_YOUR_WRITES_SECONDS"] > 0:
+        recent_writers.set(str(user_id), True)
+
+
+def _wrote_recently(request: Request) -> bool:
+    if settings["READ_YOUR_WRITES_SECONDS"] <= 0:
+        return False
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return recent_writers.get(token_subject(token)) is not None
+    except HTTPException:
+        # invalid token: the auth dependency rejects the request anyway
+        return False
+
+
+def _open_replica_session():
+    for _ in replica_engines:
+        engine = replica_router.pick()
+        if engine is None:
+            return None
+        db = ReadSessionLocal(bind=engine)
+        try:
+            db.connection()
+            return db
+        except OperationalError:
+            db.close()
+            replica_router.mark_down(engine)
+            logger.warning("Read replica %s unavailable, trying the next one", engine.url.render_as_string())
+    return None
+
+
+def get_read_db(request: Request):
+    db = None
+    if replica_engines and not _wrote_recently(request):
+        db = _open_replica_session()
+    if db is None:
+        db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -1,14 +1,40 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
 from app.core.config import settings
-print("Database URL:", settings["DATABASE_URL"])  
+from app.db.pool import PoolMetrics, instrument, instrumented_pool_class, pool_stats
+
+
+def _engine_options(url: str, pool_class, is_async: bool = False) -> dict:
+    options = {"echo": settings["DB_ECHO"], "future": True}
+    if url.startswith("sqlite"):
+        # sqlite (local runs) keeps SQLAlchemy's default pool
+        return options
+    options.update(
+        poolclass=pool_class,
+        pool_size=settings["DB_POOL_SIZE"],
+        max_overflow=settings["DB_MAX_OVERFLOW"],
+        pool_timeout=settings["DB_POOL_TIMEOUT"],
+        pool_recycle=settings["DB_POOL_RECYCLE"],
+        pool_pre_ping=settings["DB_POOL_PRE_PING"],
+    )
+    timeout_ms = settings["DB_STATEMENT_TIMEOUT_MS"]
+    if timeout_ms:
+        if is_async:
+            options["connect_args"] = {"server_settings": {"statement_timeout": str(timeout_ms)}}
+        else:
+            options["connect_args"] = {"options": f"-c statement_timeout={timeout_ms}"}
+    return options
+
+
+pool_metrics = PoolMetrics()
 
 engine = create_engine(
     settings["DATABASE_URL"],
-    echo=True,         
-    future=True
+    **_engine_options(settings["DATABASE_URL"], instrumented_pool_class(QueuePool, pool_metrics)),
 )
+instrument(engine, pool_metrics)
 
 
 SessionLocal = sessionmaker(
@@ -17,6 +43,24 @@ SessionLocal = sessionmaker(
     autocommit=False,
 )
 
+# read replicas (DATABASE_REPLICA_URLS); app.db.routing picks one per read-only request
+replica_engines = []
+replica_pool_metrics = []
+for _replica_url in settings["DATABASE_REPLICA_URLS"]:
+    _metrics = PoolMetrics()
+    _replica = create_engine(
+        _replica_url,
+        **_engine_options(_replica_url, instrumented_pool_class(QueuePool, _metrics)),
+    )
+    instrument(_replica, _metrics)
+    replica_engines.append(_replica)
+    replica_pool_metrics.append(_metrics)
+
+ReadSessionLocal = sessionmaker(
+    autoflush=False,
+    autocommit=False,
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -24,3 +68,49 @@ def get_db():
     finally:
         db.close()
 
+
+
+def _async_url(url: str) -> str:
+    for prefix in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
+# async data path (asyncpg), used by the app.api.aio routers when DB_ASYNC is on
+async_engine = None
+AsyncSessionLocal = None
+
+async_pool_metrics = PoolMetrics()
+
+if settings["DB_ASYNC"]:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _url = settings["ASYNC_DATABASE_URL"] or _async_url(settings["DATABASE_URL"])
+    async_engine = create_async_engine(
+        _url,
+        **_engine_options(_url, instrumented_pool_class(AsyncAdaptedQueuePool, async_pool_metrics), is_async=True),
+    )
+    instrument(async_engine.sync_engine, async_pool_metrics)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> dict:
+    stats = {"sync": pool_stats(engine, pool_metrics)}
+    if replica_engines:
+        stats["replicas"] = [
+            pool_stats(replica, metrics)
+            for replica, metrics in zip(replica_engines, replica_pool_metrics)
+        ]
+    if async_engine is not None:
+        stats["async"] = pool_stats(async_engine.sync_engine, async_pool_metrics)
+    return stats
@@ -1,13 +1,93 @@
-﻿from fastapi import FastAPI
+﻿from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse
+
+from app.core.config import settings
+from app.core.metrics import metrics, metrics_middleware
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.query_budget import query_budget_middleware
+from app.db.session import async_engine
+from app.services.audit_archive_service import audit_retention
+from app.services.audit_service import audit_writer
+from app.services.event_hub import notify_listener
+from app.services.overdue_service import overdue_scanner
+from app.services.idempotency_service import IdempotencyConflict, IdempotencyMismatch, Replay, idempotency_sweeper
+from app.services.password_service import HashingBusy, password_hasher
+from app.services.stripe_service import stripe_rebalancer
 
 # routers (התאימי אם השמות אצלך שונים)
-from app.api.auth import router as auth_router
-from app.api.products import router as products_router
-from app.api.rentals import router as rentals_router
-from app.api.audit_logs import router as audit_logs_router
+if settings["DB_ASYNC"]:
+    from app.api.aio.auth import router as auth_router
+    from app.api.aio.products import router as products_router
+    from app.api.aio.rentals import router as rentals_router
+    from app.api.aio.audit_logs import router as audit_logs_router
+    from app.api.aio.reservations import router as reservations_router
+else:
+    from app.api.auth import router as auth_router
+    from app.api.products import router as products_router
+    from app.api.rentals import router as rentals_router
+    from app.api.audit_logs import router as audit_logs_router
+    from app.api.reservations import router as reservations_router
+from app.api.admin import router as admin_router
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # background workers start with the app and are flushed on shutdown
+    if settings["AUDIT_MODE"] == "buffered":
+        audit_writer.start()
+    if settings["REALTIME_NOTIFY"]:
+        notify_listener.start()
+    if settings["OVERDUE_SCAN_INTERVAL_SECONDS"] > 0:
+        overdue_scanner.start()
+    if settings["AUDIT_RETENTION_INTERVAL_SECONDS"] > 0:
+        audit_retention.start()
+    if settings["IDEMPOTENCY_SWEEP_INTERVAL_SECONDS"] > 0:
+        idempotency_sweeper.start()
+    if settings["STRIPE_REBALANCE_INTERVAL_SECONDS"] > 0:
+        stripe_rebalancer.start()
+    yield
+    stripe_rebalancer.stop()
+    idempotency_sweeper.stop()
+    audit_retention.stop()
+    overdue_scanner.stop()
+    notify_listener.stop()
+    audit_writer.stop()
+    password_hasher.shutdown()
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+# orjson renders responses several times faster than the stdlib encoder
+app = FastAPI(title="SkiRent API", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+
+@app.exception_handler(HashingBusy)
+def hashing_busy_handler(request: Request, exc: HashingBusy):
+    # password hashing pool is full: ask the client to retry instead of queueing
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 
-app = FastAPI(title="SkiRent API")
+@app.exception_handler(Replay)
+def idempotent_replay_handler(request: Request, exc: Replay):
+    # a retry with a known Idempotency-Key: the stored response, nothing re-run
+    return ORJSONResponse(status_code=exc.status_code, content=exc.body, headers={"Idempotent-Replayed": "true"})
+
+
+@app.exception_handler(IdempotencyConflict)
+def idempotency_conflict_handler(request: Request, exc: IdempotencyConflict):
+    return JSONResponse(status_code=409, content={"detail": str(exc)})
+
+
+@app.exception_handler(IdempotencyMismatch)
+def idempotency_mismatch_handler(request: Request, exc: IdempotencyMismatch):
+    return JSONResponse(status_code=422, content={"detail": str(exc)})
 
 # ✅ CORS — חובה כדי שהפרונט (5173) יוכל לדבר עם הבאקנד (8000)
 # שימי לב: אנחנו מאפשרים גם localhost וגם 127.0.0.1 כדי שלא יהיה בלבול
@@ -22,13 +102,28 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag", "Idempotent-Replayed"],
 )
 
 # ✅ Routers
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(products_router, prefix="/products", tags=["products"])
 app.include_router(rentals_router, prefix="/rentals", tags=["rentals"])
+app.include_router(reservations_router, prefix="/reservations", tags=["reservations"])
 app.include_router(audit_logs_router, prefix="/audit-logs", tags=["audit-logs"])
+app.include_router(admin_router, prefix="/admin", tags=["admin"])
+
+
+if settings["QUERY_BUDGET_MODE"] != "off" and settings["QUERY_BUDGET_PER_REQUEST"] > 0:
+    app.middleware("http")(query_budget_middleware(settings["QUERY_BUDGET_PER_REQUEST"]))
+
+if settings["METRICS_ENABLED"]:
+    # per-route latency, SQL statements / DB time / commits per request, slow-request log
+    app.middleware("http")(metrics_middleware(settings["SLOW_REQUEST_MS"], settings["SLOW_REQUEST_MAX_STATEMENTS"]))
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/health")
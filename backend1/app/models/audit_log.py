@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, DateTime, Integer
+from sqlalchemy import String, DateTime, Integer, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -9,16 +9,31 @@ from app.db.base import Base
 
 
 class AuditLog(Base):
+    """Range partitioned by month on created_at (see audit_archive_service).
+    Postgres requires the partition key in the primary key, hence (id, created_at)."""
+
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        # keyset pagination of GET /audit-logs on (created_at, id), newest first;
+        # the per-filter variants also serve plain lookups by actor / product
+        Index("ix_audit_logs_created_at_id", "created_at", "id"),
+        Index("ix_audit_logs_actor_created_at_id", "actor_user_id", "created_at", "id"),
+        Index("ix_audit_logs_product_created_at_id", "product_id", "created_at", "id"),
+        Index("ix_audit_logs_action_created_at_id", "action", "created_at", "id"),
+        # containment (meta @> '{"rentalId": ...}') for the meta filters of GET /audit-logs;
+        # jsonb_path_ops only supports @>, which is all we need, and is much smaller
+        Index("ix_audit_logs_meta", "meta", postgresql_using="gin", postgresql_ops={"meta": "jsonb_path_ops"}),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
-    actor_user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
-    product_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True, index=True)
+    actor_user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    product_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
 
     action: Mapped[str] = mapped_column(String(50), nullable=False)
     qty: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     meta: Mapped[dict | None] = mapped_column(JSONB, nullable=True)
 
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), primary_key=True, default=datetime.utcnow)
@@ -0,0 +1,29 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class IdempotencyKey(Base):
+    """The stored response of a mutating request sent with an Idempotency-Key
+    header. Keys are scoped per user, so clients only need them to be unique
+    for themselves."""
+
+    __tablename__ = "idempotency_keys"
+
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)
+
+    # "POST /products/<id>/rent": a key cannot be replayed against another route
+    route: Mapped[str] = mapped_column(String(200), nullable=False)
+    # sha256 of the route and the request body: a key reused with another body
+    # is refused rather than answered with the first request's response
+    fingerprint: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    status_code: Mapped[int] = mapped_column(Integer, nullable=False, default=200)
+    response: Mapped[dict | list | None] = mapped_column(JSONB, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), index=True)
@@ -0,0 +1,20 @@
+from sqlalchemy import Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class InventorySummary(Base):
+    """Stock totals per (category, gender, type), kept up to date in the same
+    transaction as every product change. gender is "" for products without one."""
+
+    __tablename__ = "inventory_summary"
+
+    category: Mapped[str] = mapped_column(String(20), primary_key=True)
+    gender: Mapped[str] = mapped_column(String(10), primary_key=True, default="")
+    type: Mapped[str] = mapped_column(String(60), primary_key=True)
+
+    products: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    available_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rented_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
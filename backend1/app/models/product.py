@@ -1,15 +1,52 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Integer, DateTime
+from sqlalchemy import String, Integer, DateTime, Index, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.types import UserDefinedType
 
 from app.db.base import Base
 
 
+class XID8(UserDefinedType):
+    """Postgres xid8: a 64-bit transaction id, compared against pg_snapshot values."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "xid8"
+
+
+class PgSnapshot(UserDefinedType):
+    """Postgres pg_snapshot (pg_current_snapshot()), for casting sync tokens."""
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw):
+        return "pg_snapshot"
+
+
+# the id of the last transaction that wrote the row, maintained on every insert /
+# update like updated_at; GET /products/changes compares it with a snapshot
+def change_xid_column():
+    return mapped_column(
+        XID8, default=func.pg_current_xact_id(), onupdate=func.pg_current_xact_id(), index=True, deferred=True,
+    )
+
+
 class Product(Base):
     __tablename__ = "products"
+    __table_args__ = (
+        # keyset pagination of GET /products: (created_at, id) newest first,
+        # optionally narrowed by category / gender / type. "In stock only" has
+        # no partial index: a striped product's stock is the row plus its
+        # stripes, which no index predicate on products can express, so that
+        # filter is applied while walking these indexes.
+        Index("ix_products_created_at_id", "created_at", "id"),
+        Index("ix_products_category_created_at_id", "category", "created_at", "id"),
+        Index("ix_products_category_gender_type_created_at_id", "category", "gender", "type", "created_at", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -23,4 +60,24 @@ class Product(Base):
     rented_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
-    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    # maintained by the database on every insert/update (ORM flushes and the
+    # UPDATE statements in inventory_service alike); orders GET /products/changes
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True
+    )
+    change_xid: Mapped[str | None] = change_xid_column()
+
+
+# what to_product_out reads, plus the keyset column: listings select these
+# instead of hydrating Product objects
+PRODUCT_OUT_COLUMNS = (
+    Product.id,
+    Product.name,
+    Product.category,
+    Product.gender,
+    Product.type,
+    Product.quantity,
+    Product.available_quantity,
+    Product.rented_quantity,
+    Product.created_at,
+)
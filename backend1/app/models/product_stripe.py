@@ -0,0 +1,28 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, Integer, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.product import change_xid_column
+
+
+class ProductStripe(Base):
+    """One sub-counter of a striped (hot) product, see stripe_service.
+    The product's stock is its products row plus the sum of its stripes."""
+
+    __tablename__ = "product_stripes"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    stripe: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    available_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    rented_quantity: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # like Product.change_xid: lets GET /products/changes see stripe-only writes
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=func.now(), onupdate=func.now(), index=True
+    )
+    change_xid: Mapped[str | None] = change_xid_column()
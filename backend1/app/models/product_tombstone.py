@@ -0,0 +1,19 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, func
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.product import change_xid_column
+
+
+class ProductTombstone(Base):
+    """Marks a deleted product so delta-syncing clients can drop it."""
+
+    __tablename__ = "product_tombstones"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now(), index=True)
+    change_xid: Mapped[str | None] = change_xid_column()
@@ -1,15 +1,26 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Integer, String, DateTime
+from sqlalchemy import Integer, String, DateTime, Index, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
 from app.db.base import Base
 
 
+# rentals still out with the customer; OVERDUE is set by the overdue scanner
+OPEN_STATUSES = ("ACTIVE", "OVERDUE")
+
+
 class Rental(Base):
     __tablename__ = "rentals"
+    __table_args__ = (
+        # overdue scanner: only ACTIVE rentals are indexed, so a scan stays
+        # cheap however many historic rentals there are
+        Index("ix_rentals_active_end_date", "end_date", postgresql_where=text("status = 'ACTIVE'")),
+        # GET /rentals/overdue keyset pagination
+        Index("ix_rentals_overdue_end_date_id", "end_date", "id", postgresql_where=text("status = 'OVERDUE'")),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -0,0 +1,41 @@
+import uuid
+from datetime import date, datetime
+
+from sqlalchemy import Date, DateTime, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class Reservation(Base):
+    """A booking of `qty` units for the days start_date..end_date (inclusive)."""
+
+    __tablename__ = "reservations"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False, index=True)
+
+    qty: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+
+    start_date: Mapped[date] = mapped_column(Date, nullable=False)
+    end_date: Mapped[date] = mapped_column(Date, nullable=False)
+
+    # ACTIVE / CANCELLED / FULFILLED
+    status: Mapped[str] = mapped_column(String(20), nullable=False, default="ACTIVE")
+
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+class ProductDayUsage(Base):
+    """Units of a product held by ACTIVE reservations on one day.
+    The primary key doubles as the (product_id, day) range index used by every
+    availability lookup."""
+
+    __tablename__ = "product_day_usage"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    reserved: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+
+class AuditRecordOut(BaseModel):
+    id: str
+    actorUserId: str
+    productId: str | None
+    action: str
+    qty: int | None
+    meta: dict | None
+    createdAt: str | None
+
+
+class AuditLogOut(AuditRecordOut):
+    actorUserName: str
@@ -28,11 +28,22 @@ class ProductUpdate(BaseModel):
 class ProductOut(ProductBase):
     id: str
 
-class ProductCreate(BaseModel):
-    name: str
-    category: str
-    gender: str | None = None
-    type: str
-    quantity: int = Field(ge=0)
-    availableQuantity: int = Field(ge=0)
-    rentedQuantity: int = Field(ge=0)
\ No newline at end of file
+
+class ProductChangesOut(BaseModel):
+    changes: list[ProductOut]
+    deleted: list[str]
+    next: str
+
+
+def to_product_out(p) -> dict:
+    # p is a Product or a row of PRODUCT_OUT_COLUMNS
+    return {
+        "id": str(p.id),
+        "name": p.name,
+        "category": p.category,
+        "gender": p.gender,
+        "type": p.type,
+        "quantity": p.quantity,
+        "availableQuantity": p.available_quantity,
+        "rentedQuantity": p.rented_quantity,
+    }
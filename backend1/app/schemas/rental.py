@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+
+class MyRentalOut(BaseModel):
+    id: str
+    productId: str
+    productName: str | None
+    qty: int
+    status: str
+    startDate: str
+    endDate: str
+    returnedAt: str | None
+    createdAt: str
+
+
+class RentalOut(MyRentalOut):
+    userId: str
@@ -0,0 +1,345 @@
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from datetime import date, datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.models.audit_log import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# audit_logs is range partitioned by month on created_at:
+#   audit_logs_y2026m01, audit_logs_y2026m02, ... plus audit_logs_default,
+#   which only catches rows outside every monthly range (clock skew, imports).
+#
+# Partitions are created AUDIT_PARTITIONS_AHEAD months in advance so inserts
+# never land in the default partition. Rows that do land there block creating
+# their month's partition (Postgres refuses a partition whose range the default
+# partition already holds rows for), so a new partition is built as a plain
+# table, the month's rows are moved into it from the default partition, and it
+# is attached afterwards. Months older than AUDIT_RETENTION_MONTHS are streamed
+# to <AUDIT_ARCHIVE_DIR>/audit_logs_YYYY_MM.ndjson.gz, and then the partition is
+# detached and dropped. Dropping a whole partition leaves no dead tuples behind,
+# unlike a DELETE, so vacuum and backups stay proportional to the retained
+# months. Expired rows left in the default partition (months that never had a
+# partition, or late rows for a month already archived) are appended to the
+# same files and deleted.
+#
+# Archived months can still be queried with read_archive(); the files are read
+# as a stream and are never loaded back into Postgres.
+
+DEFAULT_PARTITION = "audit_logs_default"
+_PARTITION_RE = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+_ARCHIVE_RE = re.compile(r"^audit_logs_(\d{4})_(\d{2})\.ndjson\.gz$")
+# pg_advisory_lock key, so only one worker runs the retention job at a time
+_RETENTION_LOCK = 0x61756469  # "audi"
+_EXPORT_BATCH = 5000
+
+
+def month_start(d: date | datetime) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(month: date, n: int) -> date:
+    total = month.year * 12 + month.month - 1 + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"audit_logs_y{month.year:04d}m{month.month:02d}"
+
+
+def archive_path(directory: str, month: date) -> str:
+    return os.path.join(directory, f"audit_logs_{month.year:04d}_{month.month:02d}.ndjson.gz")
+
+
+def month_bounds(month: date) -> tuple[str, str]:
+    """The timestamptz literals of a month's partition range (UTC)."""
+    return f"{month.isoformat()} 00:00:00+00", f"{add_months(month, 1).isoformat()} 00:00:00+00"
+
+
+def is_partitioned(db: Session) -> bool:
+    return bool(db.execute(text(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('audit_logs')"
+    )).first())
+
+
+def list_partitions(db: Session) -> list[date]:
+    """Months that currently have a partition, oldest first."""
+    names = db.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass('audit_logs')"
+    )).scalars()
+    months = []
+    for name in names:
+        m = _PARTITION_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def ensure_partitions(db: Session, ahead: int, since: date | None = None) -> list[str]:
+    """Create the monthly partitions from `since` (default: this month) through
+    `ahead` months from now, plus the default partition. Does not commit."""
+    if not is_partitioned(db):
+        logger.warning("audit_logs is not partitioned; run python -m app.db.audit_partitions migrate")
+        return []
+    current = month_start(datetime.now(timezone.utc))
+    month = month_start(since) if since else current
+    last = add_months(current, ahead)
+    created = []
+    existing = set(list_partitions(db))
+    has_default = _has_default(db)
+    while month <= last:
+        if month not in existing:
+            created.append(_create_partition(db, month, has_default))
+        month = add_months(month, 1)
+    db.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT"))
+    return created
+
+
+def _has_default(db: Session) -> bool:
+    return db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION}).scalar()
+
+
+def _create_partition(db: Session, month: date, has_default: bool) -> str:
+    name = partition_name(month)
+    start, end = month_bounds(month)
+    db.execute(text(f"CREATE TABLE {name} (LIKE audit_logs INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    if has_default:
+        columns = ", ".join(c.name for c in AuditLog.__table__.columns)
+        moved = db.execute(text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at >= '{start}' AND created_at < '{end}' RETURNING {columns}) "
+            f"INSERT INTO {name} ({columns}) SELECT {columns} FROM moved"
+        )).rowcount
+        if moved:
+            logger.warning("Moved %d audit rows of %s out of %s", moved, month.strftime("%Y-%m"), DEFAULT_PARTITION)
+    # attaching builds the parent's indexes on the table and checks that the
+    # default partition holds no rows of the range any more
+    db.execute(text(f"ALTER TABLE audit_logs ATTACH PARTITION {name} FOR VALUES FROM ('{start}') TO ('{end}')"))
+    return name
+
+
+def _to_record(row) -> dict:
+    # same shape as GET /audit-logs (without the joined actor name)
+    return {
+        "id": str(row.id),
+        "actorUserId": str(row.actor_user_id),
+        "productId": str(row.product_id) if row.product_id else None,
+        "action": row.action,
+        "qty": row.qty,
+        "meta": row.meta,
+        "createdAt": row.created_at.isoformat() if row.created_at else None,
+    }
+
+
+def export_partition(db: Session, month: date, directory: str) -> int:
+    """Stream one month's partition to its gzip NDJSON archive file.
+    The file is written under a temporary name and renamed once complete, so
+    a crash never leaves a truncated archive behind. Returns the row count."""
+    columns = ", ".join(c.name for c in AuditLog.__table__.columns)
+    return _export(db, f"SELECT {columns} FROM {partition_name(month)} ORDER BY created_at, id", month, directory)
+
+
+def _export(db: Session, query: str, month: date, directory: str, append: bool = False) -> int:
+    os.makedirs(directory, exist_ok=True)
+    path = archive_path(directory, month)
+    tmp = path + ".tmp"
+    if append and os.path.exists(path):
+        # gzip members concatenate: the new rows follow the archived ones
+        shutil.copyfile(path, tmp)
+    else:
+        append = False
+    result = (
+        db.connection()
+        .execution_options(stream_results=True, max_row_buffer=_EXPORT_BATCH)
+        .execute(text(query))
+    )
+    rows = 0
+    with gzip.open(tmp, "at" if append else "wt", encoding="utf-8") as f:
+        for row in result:
+            f.write(json.dumps(_to_record(row)) + "\n")
+            rows += 1
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    return rows
+
+
+def archive_month(db: Session, month: date, directory: str) -> int:
+    """Export a month and then detach and drop its partition. Commits."""
+    rows = export_partition(db, month, directory)
+    name = partition_name(month)
+    db.execute(text(f"ALTER TABLE audit_logs DETACH PARTITION {name}"))
+    db.execute(text(f"DROP TABLE {name}"))
+    db.commit()
+    logger.info("Archived %d audit rows of %s to %s", rows, month.strftime("%Y-%m"), directory)
+    return rows
+
+
+def archive_default(db: Session, month: date, directory: str) -> int:
+    """Append a month's rows in the default partition to its archive file and
+    delete them. Commits. A crash between the two can repeat rows in the
+    file on the next run, but never loses any."""
+    start, end = month_bounds(month)
+    columns = ", ".join(c.name for c in AuditLog.__table__.columns)
+    where = f"WHERE created_at >= '{start}' AND created_at < '{end}'"
+    rows = _export(
+        db, f"SELECT {columns} FROM {DEFAULT_PARTITION} {where} ORDER BY created_at, id", month, directory, append=True,
+    )
+    db.execute(text(f"DELETE FROM {DEFAULT_PARTITION} {where}"))
+    db.commit()
+    logger.info("Archived %d audit rows of %s from %s to %s", rows, month.strftime("%Y-%m"), DEFAULT_PARTITION, directory)
+    return rows
+
+
+def archive_expired(db: Session, retention_months: int, directory: str) -> list[dict]:
+    """Archive every monthly partition older than the retention window, then
+    the default partition's rows older than it."""
+    if retention_months <= 0 or not is_partitioned(db):
+        return []
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -retention_months)
+    done = []
+    for month in list_partitions(db):
+        if month >= cutoff:
+            break
+        done.append({"month": month.strftime("%Y-%m"), "rows": archive_month(db, month, directory)})
+    if _has_default(db):
+        stray = db.execute(text(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE 'UTC')::date FROM {DEFAULT_PARTITION} "
+            f"WHERE created_at < '{month_bounds(cutoff)[0]}' ORDER BY 1"
+        )).scalars().all()
+        for month in stray:
+            done.append({
+                "month": month.strftime("%Y-%m"),
+                "rows": archive_default(db, month, directory),
+                "partition": DEFAULT_PARTITION,
+            })
+    return done
+
+
+def archived_months(directory: str) -> list[date]:
+    if not os.path.isdir(directory):
+        return []
+    months = []
+    for name in os.listdir(directory):
+        m = _ARCHIVE_RE.match(name)
+        if m:
+            months.append(date(int(m.group(1)), int(m.group(2)), 1))
+    return sorted(months)
+
+
+def read_archive(
+    directory: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    actor_user_id: UUID | None = None,
+    product_id: UUID | None = None,
+    action: str | None = None,
+    meta: dict | None = None,
+):
+    """Yield archived audit records (oldest first) matching the filters.
+    `meta` matches like meta @> in Postgres, on top-level keys.
+    Only the files of the months overlapping since..until are opened."""
+    since = _aware(since) if since else None
+    until = _aware(until) if until else None
+    first = month_start(since) if since else None
+    last = month_start(until) if until else None
+    for month in archived_months(directory):
+        if (first and month < first) or (last and month > last):
+            continue
+        with gzip.open(archive_path(directory, month), "rt", encoding="utf-8") as f:
+            for line in f:
+                rec = json.loads(line)
+                if actor_user_id and rec["actorUserId"] != str(actor_user_id):
+                    continue
+                if product_id and rec["productId"] != str(product_id):
+                    continue
+                if action and rec["action"] != action:
+                    continue
+                if meta and not all((rec["meta"] or {}).get(k) == v for k, v in meta.items()):
+                    continue
+                if since or until:
+                    created = _aware(datetime.fromisoformat(rec["createdAt"]))
+                    if (since and created < since) or (until and created >= until):
+                        continue
+                yield rec
+
+
+def _aware(dt: datetime) -> datetime:
+    # naive timestamps are UTC, as everywhere else in the app
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+class AuditRetention:
+    """Background thread that keeps partitions created ahead and archives
+    expired months. Workers race for an advisory lock; the losers skip the run."""
+
+    def __init__(self, interval: float, retention_months: int, ahead: int, directory: str):
+        self.interval = interval
+        self.retention_months = retention_months
+        self.ahead = ahead
+        self.directory = directory
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.runs = 0
+        self.archived = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def run_once(self) -> list[dict]:
+        # the lock lives on its own connection: the session below commits (and
+        # returns its connection to the pool) several times during a run
+        try:
+            with engine.connect() as lock_conn:
+                if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:k)"), {"k": _RETENTION_LOCK}).scalar():
+                    return []
+                db = SessionLocal()
+                try:
+                    ensure_partitions(db, self.ahead)
+                    db.commit()
+                    done = archive_expired(db, self.retention_months, self.directory)
+                finally:
+                    db.rollback()
+                    db.close()
+                    lock_conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": _RETENTION_LOCK})
+        except Exception:
+            logger.exception("Audit retention run failed")
+            return []
+        self.runs += 1
+        self.archived += len(done)
+        return done
+
+    def _run(self):
+        # first run right away so this month's partitions exist before traffic
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                return
+
+
+audit_retention = AuditRetention(
+    interval=settings["AUDIT_RETENTION_INTERVAL_SECONDS"],
+    retention_months=settings["AUDIT_RETENTION_MONTHS"],
+    ahead=settings["AUDIT_PARTITIONS_AHEAD"],
+    directory=settings["AUDIT_ARCHIVE_DIR"],
+)
@@ -1,8 +1,155 @@
+import logging
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
 from uuid import UUID
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
+from app.core.config import settings
+from app.db.session import SessionLocal
 from app.models.audit_log import AuditLog
 
+logger = logging.getLogger(__name__)
+
+# AUDIT_MODE:
+#   strict   - the audit row is inserted in the caller's transaction (one commit
+#              covers the inventory change and its audit entry)
+#   buffered - the caller's transaction is committed without the audit row; the
+#              row goes to a bounded in-process queue and AuditWriter inserts it
+#              later in batches. Entries still queued when the process is killed
+#              (not shut down) are lost.
+
+
+def _row(actor_user_id: str, action: str, product_id: str | None, qty: int | None, meta: dict | None) -> dict:
+    return {
+        # id / created_at are fixed at enqueue time so buffering does not reorder history
+        "id": uuid.uuid4(),
+        "actor_user_id": UUID(actor_user_id),
+        "product_id": UUID(product_id) if product_id else None,
+        "action": action,
+        "qty": qty,
+        "meta": meta,
+        "created_at": datetime.utcnow(),
+    }
+
+
+class AuditWriter:
+    """Background thread that drains queued audit rows with multi-row INSERTs.
+    A batch is written when it reaches `batch_size` rows or when the oldest
+    queued row is `flush_interval` seconds old, whichever comes first."""
+
+    def __init__(self, max_queue: int, batch_size: int, flush_interval: float):
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.enqueued = 0
+        self.written = 0
+        self.batches = 0
+        self.failed = 0
+        self.inline_fallbacks = 0
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 10.0):
+        """Stop the worker and flush everything still queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._drain()
+
+    def offer(self, row: dict) -> bool:
+        """Queue a row for the worker. Returns False when the row must be written
+        inline instead (queue full, or the worker is not running)."""
+        if self._thread is None:
+            return False
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.inline_fallbacks += 1
+            return False
+        with self._lock:
+            self.enqueued += 1
+        return True
+
+    def stats(self) -> dict:
+        return {
+            "mode": settings["AUDIT_MODE"],
+            "running": self._thread is not None and self._thread.is_alive(),
+            "queueDepth": self.queue.qsize(),
+            "queueCapacity": self.queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "batches": self.batches,
+            "failed": self.failed,
+            "inlineFallbacks": self.inline_fallbacks,
+        }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                first = self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _drain(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._write(batch)
+                batch = []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: list[dict]):
+        db = SessionLocal()
+        try:
+            db.execute(insert(AuditLog), batch)
+            db.commit()
+            with self._lock:
+                self.written += len(batch)
+                self.batches += 1
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self.failed += len(batch)
+            logger.exception("Failed to write %d audit rows", len(batch))
+        finally:
+            db.close()
+
+
+audit_writer = AuditWriter(
+    max_queue=settings["AUDIT_QUEUE_SIZE"],
+    batch_size=settings["AUDIT_BATCH_SIZE"],
+    flush_interval=settings["AUDIT_FLUSH_INTERVAL_MS"] / 1000,
+)
+
 
 def log_action(
     db: Session,
@@ -12,12 +159,26 @@ def log_action(
     qty: int | None = None,
     meta: dict | None = None,
 ):
-    log = AuditLog(
-        actor_user_id=UUID(actor_user_id),
-        product_id=UUID(product_id) if product_id else None,
-        action=action,
-        qty=qty,
-        meta=meta,
-    )
-    db.add(log)
+    row = _row(actor_user_id, action, product_id, qty, meta)
+    if settings["AUDIT_MODE"] == "buffered":
+        db.commit()
+        if audit_writer.offer(row):
+            return
+        # queue full or worker not running: write inline rather than drop it
+    db.execute(insert(AuditLog), [row])
+    db.commit()
+
+
+def log_actions(db: Session, entries: list[dict]):
+    """Write many audit rows with one multi-row INSERT.
+    Each entry has the same keys as the log_action arguments."""
+    rows = [
+        _row(e["actor_user_id"], e["action"], e.get("product_id"), e.get("qty"), e.get("meta"))
+        for e in entries
+    ]
+    if settings["AUDIT_MODE"] == "buffered":
+        db.commit()
+        rows = [row for row in rows if not audit_writer.offer(row)]
+    if rows:
+        db.execute(insert(AuditLog), rows)
     db.commit()
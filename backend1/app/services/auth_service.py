@@ -1,17 +1,34 @@
+from sqlalchemy import select
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import hash_password, verify_password, create_access_token
+from app.core.security import create_access_token
 from app.models.user import User
+from app.services.password_service import password_hasher
 
 
-def create_user(db: Session, username: str, password: str) -> User:
-    existing = db.query(User).filter(User.username == username).first()
-    if existing:
-        raise ValueError("USERNAME_EXISTS")
+def token_response(user: User) -> dict:
+    token = create_access_token(subject=str(user.id), role=user.role)
+    return {
+        "token": token,
+        "user": {"id": str(user.id), "username": user.username, "role": user.role},
+    }
+
+
+# The sync data path still awaits the hashing pool: the routes are async,
+# the short DB calls run in the request threadpool and no thread is held
+# while Argon2 works.
+
+def _find_user(db: Session, username: str) -> User | None:
+    return db.query(User).filter(User.username == username).first()
+
+
+def _add_user(db: Session, username: str, password_hash: str) -> User:
     try:
         user = User(
             username=username,
-            password_hash=hash_password(password),
+            password_hash=password_hash,
             role="employee",
         )
     except Exception as e:
@@ -22,21 +39,76 @@ def create_user(db: Session, username: str, password: str) -> User:
     return user
 
 
-def authenticate_user(db: Session, username: str, password: str) -> User:
-    user = db.query(User).filter(User.username == username).first()
+def _store_hash(db: Session, user: User, password_hash: str) -> None:
+    user.password_hash = password_hash
+    db.commit()
+
+
+async def create_user(db: Session, username: str, password: str) -> User:
+    if await run_in_threadpool(_find_user, db, username):
+        raise ValueError("USERNAME_EXISTS")
+    password_hash = await password_hasher.hash_async(password)
+    return await run_in_threadpool(_add_user, db, username, password_hash)
+
+
+async def authenticate_user(db: Session, username: str, password: str) -> User:
+    user = await run_in_threadpool(_find_user, db, username)
     if not user:
         raise ValueError("INVALID_CREDENTIALS")
 
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await password_hasher.verify_and_update_async(password, user.password_hash)
+    if not valid:
         raise ValueError("INVALID_CREDENTIALS")
 
+    if new_hash:
+        # stored hash used old Argon2 parameters: upgrade it now that we know the password
+        await run_in_threadpool(_store_hash, db, user, new_hash)
+
     return user
 
 
-def login_and_get_token(db: Session, username: str, password: str) -> dict:
-    user = authenticate_user(db, username, password)
-    token = create_access_token(subject=str(user.id), role=user.role)
-    return {
-        "token": token,
-        "user": {"id": str(user.id), "username": user.username, "role": user.role},
-    }
+async def login_and_get_token(db: Session, username: str, password: str) -> dict:
+    user = await authenticate_user(db, username, password)
+    return token_response(user)
+
+
+# -------------------- async variants (DB_ASYNC) --------------------
+
+async def create_user_async(db: AsyncSession, username: str, password: str) -> User:
+    existing = (await db.execute(select(User.id).where(User.username == username))).first()
+    if existing:
+        raise ValueError("USERNAME_EXISTS")
+    password_hash = await password_hasher.hash_async(password)
+    try:
+        user = User(
+            username=username,
+            password_hash=password_hash,
+            role="employee",
+        )
+    except Exception as e:
+        raise ValueError("INVALID_USER_DATA") from e
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def authenticate_user_async(db: AsyncSession, username: str, password: str) -> User:
+    user = (await db.execute(select(User).where(User.username == username))).scalar_one_or_none()
+    if not user:
+        raise ValueError("INVALID_CREDENTIALS")
+
+    valid, new_hash = await password_hasher.verify_and_update_async(password, user.password_hash)
+    if not valid:
+        raise ValueError("INVALID_CREDENTIALS")
+
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
+    return user
+
+
+async def login_and_get_token_async(db: AsyncSession, username: str, password: str) -> dict:
+    user = await authenticate_user_async(db, username, password)
+    return token_response(user)
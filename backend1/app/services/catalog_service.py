@@ -0,0 +1,165 @@
+import base64
+import json
+import random
+import re
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import Text, and_, cast, delete, event, func, not_, or_, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.catalog_state import CatalogState
+from app.models.product import PRODUCT_OUT_COLUMNS, PgSnapshot, Product
+from app.models.product_stripe import ProductStripe
+from app.models.product_tombstone import ProductTombstone
+from app.services.stripe_service import stripe_columns, summed
+
+# Catalog version: a counter bumped by every product mutation, in the
+# mutation's own transaction. A route marks its transaction with touch() and
+# the bump is the last statement before that transaction commits, so the new
+# version and the changed rows become visible together. It is read *before*
+# the products are loaded: a reader can get newer rows with an older version
+# (costs one extra full response on the next poll), but never old rows with a
+# newer version, even on a lagging replica.
+#
+# The counter is spread over CATALOG_VERSION_SLOTS rows and the version is
+# their sum. Each bump adds 1 to a random slot, so concurrent writers rarely
+# wait on the same row lock while their commits go through.
+
+
+def touch(db: Session) -> None:
+    """Mark the session's transaction as changing the catalog."""
+    db.info["catalog_changed"] = True
+
+
+def bump_version(db: Session) -> None:
+    """Count one catalog change, in the caller's transaction."""
+    stmt = insert(CatalogState).values(id=random.randrange(settings["CATALOG_VERSION_SLOTS"]), version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[CatalogState.id],
+        set_={"version": CatalogState.version + 1},
+    ))
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_on_commit(session: Session) -> None:
+    if session.info.pop("catalog_changed", False):
+        bump_version(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_change(session: Session) -> None:
+    session.info.pop("catalog_changed", None)
+
+
+def current_version(db: Session) -> int:
+    return db.execute(select(func.coalesce(func.sum(CatalogState.version), 0))).scalar_one()
+
+
+def catalog_etag(version: int) -> str:
+    return f'"catalog-{version}"'
+
+
+# -------------------- delta sync --------------------
+# A sync token holds the database snapshot (pg_current_snapshot()) taken just
+# before the previous changes query, plus its time. Every products, stripe and
+# tombstone row carries change_xid, the id of the transaction that last wrote
+# it. The next query returns the rows whose change_xid is not visible in that
+# snapshot: everything committed after it, including transactions that were
+# still running when it was taken, however long they ran. Rows committed
+# between the snapshot and the query are sent twice; clients upsert by id, so
+# that is harmless. A change_xid below the snapshot's xmin is always visible,
+# which turns the filter into a range scan on the change_xid index.
+
+_SNAPSHOT = re.compile(r"\d+:\d+:(\d+(,\d+)*)?")
+
+
+def encode_sync_token(ts: datetime, snapshot: str) -> str:
+    doc = json.dumps({"at": ts.isoformat(), "snapshot": snapshot}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(doc.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> tuple[datetime, str]:
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded).decode()
+    except Exception:
+        raise ValueError("INVALID_SYNC_TOKEN") from None
+    try:
+        doc = json.loads(raw)
+    except ValueError:
+        doc = None
+    if not isinstance(doc, dict):
+        try:
+            datetime.fromisoformat(raw)
+        except ValueError:
+            raise ValueError("INVALID_SYNC_TOKEN") from None
+        # a timestamp token from before snapshots: it cannot say which
+        # in-flight writes it missed, so the client resyncs in full
+        raise ValueError("SYNC_TOKEN_EXPIRED")
+    try:
+        ts = datetime.fromisoformat(doc["at"])
+        snapshot = doc["snapshot"]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("INVALID_SYNC_TOKEN") from None
+    if not isinstance(snapshot, str) or not _SNAPSHOT.fullmatch(snapshot):
+        raise ValueError("INVALID_SYNC_TOKEN")
+    # issued tokens always carry an offset; a hand-made one without is taken as
+    # UTC instead of failing the comparison with timestamptz values
+    return (ts if ts.tzinfo is not None else ts.replace(tzinfo=timezone.utc)), snapshot
+
+
+def _changed_after(column, snapshot):
+    """SQL condition: `column` (a change_xid) was written after `snapshot`."""
+    return and_(
+        column >= func.pg_snapshot_xmin(snapshot),
+        not_(func.pg_visible_in_snapshot(column, snapshot)),
+    )
+
+
+def record_deletion(db: Session, product_id) -> None:
+    """Add a tombstone for a deleted product (in the caller's transaction) and
+    prune the ones older than the retention window."""
+    db.execute(
+        insert(ProductTombstone)
+        .values(product_id=product_id)
+        .on_conflict_do_update(
+            index_elements=[ProductTombstone.product_id],
+            set_={"deleted_at": func.now(), "change_xid": func.pg_current_xact_id()},
+        )
+    )
+    horizon = func.now() - timedelta(days=settings["PRODUCT_TOMBSTONE_DAYS"])
+    db.execute(delete(ProductTombstone).where(ProductTombstone.deleted_at < horizon))
+
+
+def changes_since(db: Session, token: str | None) -> tuple[list, list, str]:
+    """Products changed (rows of PRODUCT_OUT_COLUMNS, stripes summed in) and
+    ids deleted since `token` (everything when token is None), plus the token
+    for the next call."""
+    read_at, snapshot = db.execute(select(func.now(), cast(func.pg_current_snapshot(), Text))).one()
+    q = db.query(*PRODUCT_OUT_COLUMNS, *stripe_columns())
+
+    if token is None:
+        products = q.order_by(Product.updated_at, Product.id).all()
+        return [summed(p) for p in products], [], encode_sync_token(read_at, snapshot)
+
+    since, since_snapshot = decode_sync_token(token)
+    if since < read_at - timedelta(days=settings["PRODUCT_TOMBSTONE_DAYS"]):
+        # tombstones that old are gone: deletions could be missed
+        raise ValueError("SYNC_TOKEN_EXPIRED")
+
+    after = cast(since_snapshot, PgSnapshot())
+    products = (
+        q.filter(or_(
+            _changed_after(Product.change_xid, after),
+            # stripe writes leave the products row alone
+            Product.id.in_(select(ProductStripe.product_id).where(_changed_after(ProductStripe.change_xid, after))),
+        ))
+        .order_by(Product.updated_at, Product.id)
+        .all()
+    )
+    deleted = db.execute(
+        select(ProductTombstone.product_id).where(_changed_after(ProductTombstone.change_xid, after))
+    ).scalars().all()
+    return [summed(p) for p in products], deleted, encode_sync_token(read_at, snapshot)
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+
+import psycopg2
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import engine
+
+logger = logging.getLogger(__name__)
+
+# Live inventory events for GET /products/stream.
+#
+# Product routes call publish_events() after committing. Without
+# REALTIME_NOTIFY the events go straight to this worker's hub. With it they are
+# sent with pg_notify in a committed transaction, and every worker (this one
+# included) receives them on its LISTEN connection and feeds its own hub, so
+# subscribers see changes made by any worker.
+#
+# Each subscriber has a bounded queue. A slow client does not hold back the
+# others: when its queue is full the pending events are dropped and it gets a
+# single "resync" event telling it to reload the catalog.
+
+NOTIFY_CHANNEL = "inventory_events"
+RESYNC = {"type": "resync"}
+HEARTBEAT_SECONDS = 15
+
+
+class Subscription:
+    def __init__(self, hub: "EventHub", loop: asyncio.AbstractEventLoop, category: str | None, max_queue: int):
+        self.hub = hub
+        self.loop = loop
+        self.category = category
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+
+    def wants(self, event: dict) -> bool:
+        return self.category is None or event.get("category") in (None, self.category)
+
+    def push(self, event: dict):
+        # runs on the subscriber's event loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            self.hub.resyncs += 1
+
+    async def next_event(self, timeout: float) -> dict | None:
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class EventHub:
+    def __init__(self, max_subscribers: int, client_queue: int):
+        self.max_subscribers = max_subscribers
+        self.client_queue = client_queue
+        self._subscribers: set[Subscription] = set()
+        self._listeners: list = []
+        self._lock = threading.Lock()
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self, category: str | None = None) -> Subscription | None:
+        """Returns None when this worker already holds max_subscribers streams."""
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            sub = Subscription(self, asyncio.get_running_loop(), category, self.client_queue)
+            self._subscribers.add(sub)
+            return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def add_listener(self, fn):
+        """Call fn(event) for every event, in the dispatching thread (used for
+        cache invalidation)."""
+        self._listeners.append(fn)
+
+    def dispatch(self, event: dict):
+        """Hand an event to every interested subscriber. Safe to call from any thread."""
+        for fn in self._listeners:
+            fn(event)
+        with self._lock:
+            targets = [s for s in self._subscribers if s.wants(event)]
+            self.published += 1
+        for sub in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.push, event)
+            except RuntimeError:
+                # the subscriber's loop is gone (shutdown)
+                self.unsubscribe(sub)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "maxSubscribers": self.max_subscribers,
+                "published": self.published,
+                "resyncs": self.resyncs,
+                "notify": settings["REALTIME_NOTIFY"],
+            }
+
+
+event_hub = EventHub(
+    max_subscribers=settings["REALTIME_MAX_SUBSCRIBERS"],
+    client_queue=settings["REALTIME_CLIENT_QUEUE"],
+)
+
+
+def product_event(product_out: dict) -> dict:
+    return {"type": "product", "category": product_out.get("category"), "product": product_out}
+
+
+def deleted_event(product_id: str, category: str | None) -> dict:
+    return {"type": "deleted", "category": category, "id": product_id}
+
+
+def publish_events(db: Session, events: list[dict]) -> None:
+    """Publish events for a committed change. With REALTIME_NOTIFY the
+    pg_notify calls join the caller's open transaction and are delivered when
+    it commits."""
+    if not events:
+        return
+    if not settings["REALTIME_NOTIFY"]:
+        for event in events:
+            event_hub.dispatch(event)
+        return
+    for event in events:
+        db.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": json.dumps(event)})
+
+
+async def sse_stream(request, sub: Subscription):
+    """Server-Sent Events body for one subscriber; unsubscribes when the client leaves."""
+    try:
+        yield "retry: 3000\n\n"
+        while not await request.is_disconnected():
+            event = await sub.next_event(HEARTBEAT_SECONDS)
+            if event is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        sub.close()
+
+
+class NotifyListener:
+    """Background thread holding a LISTEN connection and feeding the local hub."""
+
+    def __init__(self, hub: EventHub):
+        self.hub = hub
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="notify-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(5)
+            self._thread = None
+
+    def _connect(self):
+        dsn = engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+        conn = psycopg2.connect(dsn)
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        conn.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+        return conn
+
+    def _run(self):
+        conn = None
+        while not self._stop.is_set():
+            try:
+                if conn is None:
+                    conn = self._connect()
+                    # events may have been missed while disconnected
+                    self.hub.dispatch(RESYNC)
+                if select.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    note = conn.notifies.pop(0)
+                    self.hub.dispatch(json.loads(note.payload))
+            except Exception:
+                logger.exception("LISTEN connection failed, reconnecting")
+                if conn is not None:
+                    conn.close()
+                conn = None
+                self._stop.wait(1.0)
+        if conn is not None:
+            conn.close()
+
+
+notify_listener = NotifyListener(event_hub)
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import logging
+import threading
+from datetime import timedelta
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.idempotency_key import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Idempotency-Key support for the mutating product routes.
+#
+# A route first calls check(): when the key already has a stored response it
+# raises Replay and the app answers with that response (see main.py) without
+# running the action again. Otherwise the route runs the action and calls
+# remember() before its commit, so the key and the mutation commit together:
+# a crash can never leave one without the other.
+#
+# Two requests with the same key racing each other both pass check(). The
+# second INSERT waits for the first transaction; if that commits, the second
+# one rolls back its own mutation and replays the stored response.
+#
+# Each key also stores a fingerprint of its request (route and body). A key
+# sent again with a different body is a client bug, not a retry: it gets a 422
+# instead of the stored response of another request.
+#
+# Keys older than IDEMPOTENCY_TTL_HOURS are ignored and deleted in batches by
+# IdempotencySweeper.
+
+
+class Replay(Exception):
+    """Answer the request with this stored response."""
+
+    def __init__(self, status_code: int, body):
+        self.status_code = status_code
+        self.body = body
+
+
+class IdempotencyConflict(Exception):
+    """The key was used for another route, or its first request is still running."""
+
+
+class IdempotencyMismatch(Exception):
+    """The key was used for the same route with a different request body."""
+
+
+def _horizon():
+    return func.now() - timedelta(hours=settings["IDEMPOTENCY_TTL_HOURS"])
+
+
+def fingerprint(route: str, body: bytes) -> str:
+    """sha256 of the route and the body; JSON bodies are compared by content,
+    so key order and whitespace do not matter."""
+    try:
+        body = json.dumps(json.loads(body), sort_keys=True, separators=(",", ":")).encode()
+    except ValueError:
+        pass
+    return hashlib.sha256(route.encode() + b"\n" + body).hexdigest()
+
+
+class Idempotency:
+    """The Idempotency-Key of one request (key is None when none was sent)."""
+
+    def __init__(self, key: str | None, route: str, fingerprint: str | None = None):
+        self.key = key
+        self.route = route
+        self.fingerprint = fingerprint
+
+    def check(self, db: Session, user_id) -> None:
+        if not self.key:
+            return
+        stored = db.execute(
+            select(
+                IdempotencyKey.route, IdempotencyKey.fingerprint, IdempotencyKey.status_code, IdempotencyKey.response,
+            ).where(
+                IdempotencyKey.user_id == user_id,
+                IdempotencyKey.key == self.key,
+                IdempotencyKey.created_at >= _horizon(),
+            )
+        ).first()
+        if stored is None:
+            return
+        if stored.route != self.route:
+            raise IdempotencyConflict("Idempotency-Key was already used for a different request")
+        if stored.fingerprint and self.fingerprint and stored.fingerprint != self.fingerprint:
+            raise IdempotencyMismatch("Idempotency-Key was already used with a different request body")
+        raise Replay(stored.status_code, stored.response)
+
+    def remember(self, db: Session, user_id, body, status_code: int = 200) -> None:
+        """Store the response in the caller's open transaction."""
+        if not self.key:
+            return
+        # an expired row with the same key is taken over
+        stmt = insert(IdempotencyKey).values(
+            user_id=user_id, key=self.key, route=self.route, fingerprint=self.fingerprint,
+            status_code=status_code, response=body,
+        )
+        stored = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[IdempotencyKey.user_id, IdempotencyKey.key],
+                set_={
+                    "route": stmt.excluded.route,
+                    "fingerprint": stmt.excluded.fingerprint,
+                    "status_code": stmt.excluded.status_code,
+                    "response": stmt.excluded.response,
+                    "created_at": func.now(),
+                },
+                where=IdempotencyKey.created_at < _horizon(),
+            ).returning(IdempotencyKey.key)
+        ).first()
+        if stored is None:
+            # a concurrent request with this key committed first
+            db.rollback()
+            self.check(db, user_id)
+            raise IdempotencyConflict("A request with this Idempotency-Key is still in progress")
+
+
+def purge_expired(db: Session, batch_size: int) -> int:
+    """Delete expired keys, one batch per transaction. Returns how many."""
+    purged = 0
+    while True:
+        batch = (
+            select(IdempotencyKey.user_id, IdempotencyKey.key)
+            .where(IdempotencyKey.created_at < _horizon())
+            .limit(batch_size)
+        )
+        deleted = db.execute(
+            delete(IdempotencyKey)
+            .where(tuple_(IdempotencyKey.user_id, IdempotencyKey.key).in_(batch))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.commit()
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+
+class IdempotencySweeper:
+    """Background thread running purge_expired every `interval` seconds."""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.purged = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="idempotency-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def sweep_once(self) -> int:
+        db = SessionLocal()
+        try:
+            purged = purge_expired(db, self.batch_size)
+        except Exception:
+            db.rollback()
+            logger.exception("Idempotency key sweep failed")
+            return 0
+        finally:
+            db.close()
+        self.purged += purged
+        return purged
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sweep_once()
+
+
+idempotency_sweeper = IdempotencySweeper(
+    interval=settings["IDEMPOTENCY_SWEEP_INTERVAL_SECONDS"],
+    batch_size=settings["IDEMPOTENCY_SWEEP_BATCH_SIZE"],
+)
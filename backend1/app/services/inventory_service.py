@@ -0,0 +1,252 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import and_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.models.product_stripe import ProductStripe
+from app.models.rental import OPEN_STATUSES, Rental
+from app.services import stripe_service
+from app.services.catalog_service import touch
+from app.services.reservation_service import reserved_units, today
+from app.services.stripe_service import stripe_sum
+from app.services.summary_service import apply_delta
+
+# Every inventory action is a conditional UPDATE ... RETURNING.
+# The stock check lives in the WHERE clause, so two concurrent requests can
+# never both pass it: the second one simply matches zero rows.
+# On failure we look the product up once more only to pick the right error.
+# On success the inventory_summary delta is applied in the same transaction,
+# which is also marked to bump the catalog version when it commits.
+# Nothing here commits or rolls back: the caller owns the transaction (a
+# failed single action is never committed, a bulk item runs in a savepoint).
+# Take and rent also leave alone the units reserved for the days they cover
+# (see reservation_service); they lock the row first, see _lock_row.
+# Striped products first try one of their stripes, then the row, then the row
+# again after collecting the stripes into it (see stripe_service). The
+# returned product always carries the stripe totals.
+
+
+def _parse_id(product_id: str) -> UUID:
+    try:
+        return UUID(str(product_id))
+    except ValueError:
+        raise ValueError("PRODUCT_NOT_FOUND") from None
+
+
+def _lock_row(db: Session, pid: UUID) -> None:
+    """Lock the products row ahead of a stock check that reads reservations.
+    An UPDATE that waits for the row lock re-checks its WHERE on the new row
+    version, but its reserved_units() subquery keeps the statement's old
+    snapshot and would miss the days booked by the transaction it waited for.
+    Taking the lock first makes the UPDATE a new statement with a fresh one."""
+    if db.execute(select(Product.id).where(Product.id == pid).with_for_update()).first() is None:
+        raise ValueError("PRODUCT_NOT_FOUND")
+
+
+def _apply(db: Session, product_id: str, condition, values: dict, conflict: str) -> Product:
+    pid = _parse_id(product_id)
+    stmt = (
+        update(Product)
+        .where(Product.id == pid, condition)
+        .values(**values)
+        .returning(
+            Product,
+            stripe_sum(Product.id, ProductStripe.available_quantity),
+            stripe_sum(Product.id, ProductStripe.rented_quantity),
+        )
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    row = db.execute(stmt).first()
+    if row is None:
+        exists = db.execute(select(Product.id).where(Product.id == pid)).first()
+        if not exists:
+            raise ValueError("PRODUCT_NOT_FOUND")
+        raise ValueError(conflict)
+    return stripe_service.with_totals(*row)
+
+
+def _apply_collecting(db: Session, product_id: str, condition, values: dict, conflict: str) -> Product:
+    """_apply, retried once after folding the product's stripes into its row."""
+    try:
+        return _apply(db, product_id, condition, values, conflict)
+    except ValueError as e:
+        if str(e) != conflict or not stripe_service.collect(db, _parse_id(product_id)):
+            raise
+    return _apply(db, product_id, condition, values, conflict)
+
+
+def _on_stripe(db: Session, product_id: str, condition, values: dict):
+    """Serve the action from one stripe. Returns the product, or None when the
+    row has to do it."""
+    pid = _parse_id(product_id)
+    if stripe_service.is_striped(pid) and stripe_service.apply(db, pid, condition, values):
+        return stripe_service.product_view(db, pid)
+    return None
+
+
+def _summarize(db: Session, p: Product, available: int = 0, rented: int = 0) -> None:
+    apply_delta(db, p.category, p.gender, p.type, available=available, rented=rented)
+
+
+def _withdraw(db: Session, product_id: str, qty: int, start, end, rented: int = 0) -> Product:
+    """Take qty units out of stock, leaving alone those reserved on any day of
+    start..end (end None: from start on)."""
+    values = {"available_quantity": ProductStripe.available_quantity - qty}
+    if rented:
+        values["rented_quantity"] = ProductStripe.rented_quantity + rented
+    product = _on_stripe(db, product_id, ProductStripe.available_quantity >= qty, values)
+    if product is not None:
+        return product
+
+    _lock_row(db, _parse_id(product_id))
+    values = {"available_quantity": Product.available_quantity - qty}
+    if rented:
+        values["rented_quantity"] = Product.rented_quantity + rented
+    available = Product.available_quantity + stripe_sum(Product.id, ProductStripe.available_quantity)
+    product = _apply_collecting(
+        db,
+        product_id,
+        and_(
+            Product.available_quantity >= qty,
+            available - reserved_units(Product.id, start, end) >= qty,
+        ),
+        values,
+        conflict="NOT_ENOUGH_STOCK",
+    )
+    _summarize(db, product, available=-qty, rented=rented)
+    return product
+
+
+def take(db: Session, product_id: str, qty: int) -> Product:
+    touch(db)
+    # taken units may never come back: keep clear of every booking ahead
+    return _withdraw(db, product_id, qty, today(), None)
+
+
+def return_taken(db: Session, product_id: str, qty: int) -> Product:
+    touch(db)
+    taken_out = (
+        Product.quantity
+        - Product.available_quantity - stripe_sum(Product.id, ProductStripe.available_quantity)
+        - Product.rented_quantity - stripe_sum(Product.id, ProductStripe.rented_quantity)
+    )
+    product = _apply(
+        db,
+        product_id,
+        taken_out >= qty,
+        {"available_quantity": Product.available_quantity + qty},
+        conflict="NOTHING_TAKEN",
+    )
+    _summarize(db, product, available=qty)
+    return product
+
+
+def rent(db: Session, product_id: str, user_id: str, qty: int, days: int) -> tuple[Product, Rental]:
+    touch(db)
+    start = datetime.now(timezone.utc)
+    end = start + timedelta(days=days)
+    product = _withdraw(db, product_id, qty, start.date(), end.date(), rented=qty)
+
+    rental = Rental(
+        id=uuid.uuid4(),
+        product_id=product.id,
+        user_id=UUID(str(user_id)),
+        qty=qty,
+        start_date=start,
+        end_date=end,
+        status="ACTIVE",
+    )
+    db.add(rental)
+    return product, rental
+
+
+def return_rented(db: Session, product_id: str, user_id: str, qty: int) -> tuple[Product, UUID]:
+    touch(db)
+    pid = _parse_id(product_id)
+    uid = UUID(str(user_id))
+
+    # Close the latest open (ACTIVE or OVERDUE) rental of this user+product. The
+    # status check in the outer WHERE makes sure a rental can only be closed once.
+    latest = (
+        select(Rental.id)
+        .where(
+            Rental.product_id == pid,
+            Rental.user_id == uid,
+            Rental.status.in_(OPEN_STATUSES),
+            Rental.returned_at.is_(None),
+        )
+        .order_by(Rental.created_at.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    close = (
+        update(Rental)
+        .where(Rental.id == latest, Rental.status.in_(OPEN_STATUSES), Rental.qty >= qty)
+        .values(status="RETURNED", returned_at=datetime.now(timezone.utc))
+        .returning(Rental.id)
+        .execution_options(synchronize_session=False)
+    )
+    while True:
+        closed = db.execute(close).first()
+        if closed is not None:
+            break
+        # The error comes from the rental this return would close now. If that
+        # one could be closed, the one the statement aimed at was closed by a
+        # concurrent return in the meantime: aim again (each retry means
+        # another rental got closed, so this ends).
+        active = db.execute(select(Rental.qty).where(Rental.id == latest)).first()
+        if not active:
+            if not db.execute(select(Product.id).where(Product.id == pid)).first():
+                raise ValueError("PRODUCT_NOT_FOUND")
+            raise ValueError("NO_ACTIVE_RENTAL")
+        if active.qty < qty:
+            raise ValueError("RETURN_EXCEEDS_RENTAL")
+
+    product = _on_stripe(
+        db,
+        product_id,
+        ProductStripe.rented_quantity >= qty,
+        {
+            "rented_quantity": ProductStripe.rented_quantity - qty,
+            "available_quantity": ProductStripe.available_quantity + qty,
+        },
+    )
+    if product is not None:
+        return product, closed.id
+
+    product = _apply_collecting(
+        db,
+        product_id,
+        Product.rented_quantity >= qty,
+        {
+            "rented_quantity": Product.rented_quantity - qty,
+            "available_quantity": Product.available_quantity + qty,
+        },
+        conflict="NOT_ENOUGH_RENTED",
+    )
+    _summarize(db, product, available=qty, rented=-qty)
+    return product, closed.id
+
+
+ACTIONS = ("take", "return-taken", "rent", "return-rented")
+
+
+def run_action(db: Session, action: str, product_id: str, user_id: str, qty: int, days: int) -> tuple[Product, str, dict]:
+    """Dispatch one inventory action by its route name.
+    Returns the updated product, the audit action and the audit meta."""
+    if action == "take":
+        product = take(db, product_id, qty)
+        return product, "TAKE", {"name": product.name}
+    if action == "return-taken":
+        product = return_taken(db, product_id, qty)
+        return product, "RETURN_TAKEN", {"name": product.name}
+    if action == "rent":
+        product, rental = rent(db, product_id, user_id, qty, days)
+        return product, "RENT", {"name": product.name, "days": days, "rentalId": str(rental.id)}
+    if action == "return-rented":
+        product, rental_id = return_rented(db, product_id, user_id, qty)
+        return product, "RETURN_RENTED", {"name": product.name, "rentalId": str(rental_id)}
+    raise ValueError("UNKNOWN_ACTION")
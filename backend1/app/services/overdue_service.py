@@ -0,0 +1,108 @@
+import logging
+import threading
+
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.rental import Rental
+from app.services.audit_service import log_actions
+
+logger = logging.getLogger(__name__)
+
+# Periodically flags ACTIVE rentals past their end_date as OVERDUE.
+# Each batch picks rows through the partial index on (end_date) WHERE
+# status = 'ACTIVE' with FOR UPDATE SKIP LOCKED, so several workers can scan at
+# once without marking (or auditing) a rental twice.
+
+
+def mark_overdue(db: Session, batch_size: int) -> int:
+    """Mark all currently overdue rentals, one batch per transaction.
+    Returns how many rentals were marked."""
+    marked = 0
+    while True:
+        # WITH batch AS MATERIALIZED (... LIMIT n FOR UPDATE SKIP LOCKED)
+        # UPDATE ... FROM batch: the CTE runs exactly once, so the rows it
+        # locked are the rows updated. Under `id IN (subquery)` the planner may
+        # turn the locking subquery into a join input it re-scans.
+        batch = (
+            select(Rental.id)
+            .where(Rental.status == "ACTIVE", Rental.end_date < func.now())
+            .order_by(Rental.end_date)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .cte("batch")
+            .prefix_with("MATERIALIZED")
+        )
+        rows = db.execute(
+            update(Rental)
+            .where(Rental.id == batch.c.id)
+            .values(status="OVERDUE")
+            .returning(Rental.id, Rental.user_id, Rental.product_id, Rental.qty, Rental.end_date)
+            .execution_options(synchronize_session=False)
+        ).all()
+
+        # audit rows go in with the status change, in one multi-row INSERT
+        log_actions(db, [
+            {
+                "actor_user_id": str(r.user_id),
+                "action": "RENTAL_OVERDUE",
+                "product_id": str(r.product_id),
+                "qty": r.qty,
+                "meta": {"rentalId": str(r.id), "endDate": r.end_date.isoformat()},
+            }
+            for r in rows
+        ])
+        marked += len(rows)
+        if len(rows) < batch_size:
+            return marked
+
+
+class OverdueScanner:
+    """Background thread running mark_overdue every `interval` seconds."""
+
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.scans = 0
+        self.marked = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="overdue-scanner", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def scan_once(self) -> int:
+        db = SessionLocal()
+        try:
+            marked = mark_overdue(db, self.batch_size)
+        except Exception:
+            db.rollback()
+            logger.exception("Overdue scan failed")
+            return 0
+        finally:
+            db.close()
+        self.scans += 1
+        self.marked += marked
+        if marked:
+            logger.info("Marked %d rentals OVERDUE", marked)
+        return marked
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.scan_once()
+
+
+overdue_scanner = OverdueScanner(
+    interval=settings["OVERDUE_SCAN_INTERVAL_SECONDS"],
+    batch_size=settings["OVERDUE_SCAN_BATCH_SIZE"],
+)
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.security import hash_password, pwd_context
+
+# Argon2 hashing runs on a small dedicated pool instead of the request
+# threadpool. argon2-cffi releases the GIL while hashing, so threads give real
+# parallelism here. At most workers + max_pending jobs are accepted; beyond
+# that callers get HashingBusy (served as 503) instead of piling up and
+# starving the inventory endpoints. Callers await the result (hash_async /
+# verify_and_update_async) from async routes, so a waiting login holds no
+# request-threadpool thread.
+
+
+class HashingBusy(Exception):
+    pass
+
+
+class PasswordHasher:
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self.capacity = workers + max_pending
+        self.rejected = 0
+
+    def _submit(self, fn, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingBusy()
+        future = self._executor.submit(fn, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+
+    async def verify_and_update_async(self, password: str, password_hash: str) -> tuple[bool, str | None]:
+        """Returns (valid, new_hash); new_hash is set when the stored hash was made
+        with other Argon2 parameters than the configured ones."""
+        return await asyncio.wrap_future(self._submit(pwd_context.verify_and_update, password, password_hash))
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+password_hasher = PasswordHasher(
+    workers=settings["PASSWORD_HASH_WORKERS"],
+    max_pending=settings["PASSWORD_HASH_MAX_PENDING"],
+)
@@ -0,0 +1,103 @@
+import threading
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.models.product import PRODUCT_OUT_COLUMNS, Product
+from app.schemas.product import to_product_out
+from app.services.event_hub import event_hub
+from app.services.stripe_service import stripe_columns, summed
+
+# Per-worker product caches, holding serialized products only (never ORM rows).
+#
+# product_cache: product id -> to_product_out dict, read through by
+#   get_products(). Entries are dropped one id at a time: the writing worker
+#   drops its ids in after_write, and with REALTIME_NOTIFY the product/deleted
+#   events reach every other worker's hub and drop exactly those ids there.
+#   Without NOTIFY the other workers never hear about a write, so entries are
+#   not served at all (misses still load in one batch). An event that gets lost
+#   (a failed publish) leaves an entry stale for at most
+#   PRODUCT_CACHE_TTL_SECONDS; a LISTEN reconnect clears the whole cache.
+# page_cache: (catalog version, listing params) -> serialized page. The key
+#   includes the version, so a page can never be served after a later write.
+
+product_cache = TTLCache(
+    max_size=settings["PRODUCT_CACHE_SIZE"],
+    ttl=settings["PRODUCT_CACHE_TTL_SECONDS"],
+)
+page_cache = TTLCache(
+    max_size=settings["PRODUCT_PAGE_CACHE_SIZE"],
+    ttl=settings["PRODUCT_CACHE_TTL_SECONDS"],
+)
+
+# Bumped by every invalidation. Rows loaded while one came in may predate that
+# write, and caching them after the invalidation would undo it: such loads are
+# returned but not cached.
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def cache_enabled() -> bool:
+    return settings["REALTIME_NOTIFY"]
+
+
+def generation() -> int:
+    return _generation
+
+
+def remember_products(outs, since: int) -> None:
+    """Cache serialized products read after generation() returned `since`."""
+    if not cache_enabled():
+        return
+    with _generation_lock:
+        if _generation != since:
+            return
+        for out in outs:
+            product_cache.set(out["id"], out)
+
+
+def get_products(db: Session, product_ids) -> dict[UUID, dict]:
+    """Serialized products by id; misses are loaded with one IN query."""
+    found = {}
+    missing = []
+    for pid in set(product_ids):
+        out = product_cache.get(str(pid)) if cache_enabled() else None
+        if out is None:
+            missing.append(pid)
+        else:
+            found[pid] = out
+    if missing:
+        since = generation()
+        loaded = [
+            to_product_out(summed(p))
+            for p in db.query(*PRODUCT_OUT_COLUMNS, *stripe_columns()).filter(Product.id.in_(missing)).all()
+        ]
+        remember_products(loaded, since)
+        for out in loaded:
+            found[UUID(out["id"])] = out
+    return found
+
+
+def invalidate_products(product_ids) -> None:
+    global _generation
+    with _generation_lock:
+        _generation += 1
+        for pid in product_ids:
+            product_cache.invalidate(str(pid))
+
+
+def _on_event(event: dict) -> None:
+    if event["type"] == "product":
+        invalidate_products([event["product"]["id"]])
+    elif event["type"] == "deleted":
+        invalidate_products([event["id"]])
+    elif event["type"] == "resync":
+        global _generation
+        with _generation_lock:
+            _generation += 1
+            product_cache.clear()
+
+
+event_hub.add_listener(_on_event)
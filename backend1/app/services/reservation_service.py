@@ -0,0 +1,150 @@
+from datetime import date, datetime, timedelta, timezone
+from uuid import UUID
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.product import Product
+from app.models.product_stripe import ProductStripe
+from app.models.reservation import ProductDayUsage, Reservation
+from app.services import stripe_service
+
+# Future reservations over a per-product, per-day bucket table.
+#
+# Reservations do not touch available_quantity. Instead, the free units of a
+# product for a date range are
+#     available_quantity - max(reserved units on any day of the range)
+# i.e. units that are in stock now and not promised to anyone on those days.
+# Units currently rented or taken are assumed to stay out, which keeps the
+# answer safe. Take and rent use the same rule (see inventory_service), so
+# walk-in business cannot eat stock that was booked for the weekend. A take
+# has no return date, so it checks every booked day from today on.
+# A lookup is one range scan on the (product_id, day) primary key: it costs the
+# length of the range, not the number of reservations.
+
+
+def today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def reserved_units(product_id, start: date, end: date | None):
+    """Scalar SQL expression: the most units reserved on any day in start..end
+    (end None: any day from start on)."""
+    q = select(func.coalesce(func.max(ProductDayUsage.reserved), 0)).where(
+        ProductDayUsage.product_id == product_id,
+        ProductDayUsage.day >= start,
+    )
+    if end is not None:
+        q = q.where(ProductDayUsage.day <= end)
+    return q.scalar_subquery()
+
+
+def _check_range(start: date, end: date) -> None:
+    if end < start or start < today():
+        raise ValueError("INVALID_RANGE")
+    if (end - start).days + 1 > settings["RESERVATION_MAX_DAYS"]:
+        raise ValueError("RANGE_TOO_LONG")
+
+
+def availability(db: Session, product_ids: list[UUID], start: date, end: date) -> dict[UUID, int]:
+    """Free units per product for start..end, for many products in one query."""
+    _check_range(start, end)
+    peak = (
+        select(ProductDayUsage.product_id, func.max(ProductDayUsage.reserved).label("reserved"))
+        .where(
+            ProductDayUsage.product_id.in_(product_ids),
+            ProductDayUsage.day >= start,
+            ProductDayUsage.day <= end,
+        )
+        .group_by(ProductDayUsage.product_id)
+        .subquery()
+    )
+    rows = db.execute(
+        select(
+            Product.id,
+            Product.available_quantity
+            + stripe_service.stripe_sum(Product.id, ProductStripe.available_quantity)
+            - func.coalesce(peak.c.reserved, 0),
+        )
+        .outerjoin(peak, peak.c.product_id == Product.id)
+        .where(Product.id.in_(product_ids))
+    ).all()
+    return {pid: max(free, 0) for pid, free in rows}
+
+
+def _book_days(db: Session, product_id: UUID, start: date, end: date, qty: int) -> None:
+    days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    stmt = insert(ProductDayUsage).values([
+        {"product_id": product_id, "day": d, "reserved": qty} for d in days
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[ProductDayUsage.product_id, ProductDayUsage.day],
+        set_={"reserved": ProductDayUsage.reserved + stmt.excluded.reserved},
+    ))
+
+
+def _release_days(db: Session, r: Reservation) -> None:
+    db.execute(
+        update(ProductDayUsage)
+        .where(
+            ProductDayUsage.product_id == r.product_id,
+            ProductDayUsage.day >= max(r.start_date, today()),
+            ProductDayUsage.day <= r.end_date,
+        )
+        .values(reserved=ProductDayUsage.reserved - r.qty)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reserve(db: Session, product_id: str, user_id: str, qty: int, start: date, end: date) -> Reservation:
+    _check_range(start, end)
+    try:
+        pid = UUID(str(product_id))
+    except ValueError:
+        raise ValueError("PRODUCT_NOT_FOUND") from None
+
+    # the product row lock serializes bookings per product, and take/rent lock
+    # the row before their own check (inventory_service._lock_row): every
+    # check, here and there, is a statement started after the previous booking
+    # or withdrawal committed. A striped product first folds its stripes into
+    # the row, where they stay while it is booked ahead
+    stripe_service.collect(db, pid)
+    available = db.execute(
+        select(Product.available_quantity).where(Product.id == pid).with_for_update()
+    ).scalar_one_or_none()
+    if available is None:
+        raise ValueError("PRODUCT_NOT_FOUND")
+    peak = db.execute(select(reserved_units(pid, start, end))).scalar_one()
+    if available - peak < qty:
+        raise ValueError("NOT_ENOUGH_STOCK")
+
+    _book_days(db, pid, start, end, qty)
+    reservation = Reservation(
+        product_id=pid,
+        user_id=UUID(str(user_id)),
+        qty=qty,
+        start_date=start,
+        end_date=end,
+        status="ACTIVE",
+    )
+    db.add(reservation)
+    db.flush()
+    return reservation
+
+
+def close(db: Session, reservation_id: str, user, status: str) -> Reservation:
+    """Cancel or fulfil an ACTIVE reservation and give its days back."""
+    try:
+        rid = UUID(str(reservation_id))
+    except ValueError:
+        raise ValueError("RESERVATION_NOT_FOUND") from None
+    r = db.query(Reservation).filter(Reservation.id == rid).with_for_update().first()
+    if r is None or (r.user_id != user.id and user.role != "admin"):
+        raise ValueError("RESERVATION_NOT_FOUND")
+    if r.status != "ACTIVE":
+        raise ValueError("RESERVATION_CLOSED")
+    _release_days(db, r)
+    r.status = status
+    return r
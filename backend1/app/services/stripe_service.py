@@ -0,0 +1,333 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import UUID
+
+from sqlalchemy import delete, exists, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+from app.models.product import PRODUCT_OUT_COLUMNS, Product
+from app.models.product_stripe import ProductStripe
+from app.models.reservation import ProductDayUsage
+from app.services.summary_service import apply_delta
+
+logger = logging.getLogger(__name__)
+
+# Striped stock counters for hot products.
+#
+# Every take / rent / return of a product updates its products row, so all
+# requests for one popular product queue up on that row's lock. A striped
+# product also has N product_stripes rows. Its stock is
+#     products row + sum of its stripes   (for available and rented alike)
+# and writers update one stripe picked at random among the ones that can
+# serve the request, skipping stripes locked by other transactions
+# (FOR UPDATE SKIP LOCKED). Up to N writers then run in parallel, and the
+# products row is left alone.
+#
+# The products row is the fallback pool. When no stripe can serve a request,
+# the row is tried, and then collect() folds every stripe back into the row
+# before one last try. So a request only fails when the product as a whole
+# lacks the units.
+#
+# While a product has units reserved for today or later, the reservation
+# check needs one exact total, so reserve() collects the stripes into the row
+# and neither writers nor the rebalancer put units back into them until the
+# bookings are over.
+#
+# Writers only try the stripes of products in the striped hint: the ids this
+# process striped itself or saw in the rebalancer's last pass. A product
+# missing from it is still served correctly, through the row.
+#
+# inventory_summary only counts the products-row part of a striped product.
+# Stripe writes do not touch it (the summary row would become the new hot
+# spot), and get_summary() adds the stripes at read time. reconcile() keeps
+# working unchanged on the rows.
+#
+# StripeRebalancer periodically spreads the available units evenly again:
+# each stripe and the row get pool // (N + 1), and the row keeps the remainder.
+
+def stripe_sum(product_id, column):
+    """Scalar SQL expression: the sum of `column` over a product's stripes (0 when unstriped)."""
+    return (
+        select(func.coalesce(func.sum(column), 0))
+        .where(ProductStripe.product_id == product_id)
+        .scalar_subquery()
+    )
+
+
+_striped: frozenset[UUID] = frozenset()
+
+
+def is_striped(product_id: UUID) -> bool:
+    return product_id in _striped
+
+
+def _hint(product_id: UUID, striped: bool) -> None:
+    global _striped
+    _striped = _striped | {product_id} if striped else _striped - {product_id}
+
+
+def _reset_hint(product_ids) -> None:
+    global _striped
+    _striped = frozenset(product_ids)
+
+
+def booked_ahead(product_id):
+    """SQL condition: the product has units reserved for today or later."""
+    return exists().where(
+        ProductDayUsage.product_id == product_id,
+        ProductDayUsage.day >= datetime.now(timezone.utc).date(),
+        ProductDayUsage.reserved > 0,
+    )
+
+
+def apply(db: Session, product_id: UUID, condition, values: dict) -> bool:
+    """Apply `values` to one unlocked stripe matching `condition`.
+    Returns False when none qualifies (or the product is booked ahead)."""
+    pick = (
+        select(ProductStripe.stripe)
+        .where(ProductStripe.product_id == product_id, condition, ~booked_ahead(product_id))
+        .order_by(func.random())
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    )
+    updated = db.execute(
+        update(ProductStripe)
+        .where(ProductStripe.product_id == product_id, ProductStripe.stripe == pick.scalar_subquery())
+        .values(**values)
+        .returning(ProductStripe.stripe)
+        .execution_options(synchronize_session=False)
+    ).first()
+    return updated is not None
+
+
+def with_totals(product, available: int, rented: int):
+    """`product` with its stripe totals added. Striped products become a plain
+    object shaped like a Product (for to_product_out / audit meta), so the
+    session never flushes the summed quantities back into the row."""
+    if not available and not rented:
+        return product
+    p = SimpleNamespace(**{c.key: getattr(product, c.key) for c in PRODUCT_OUT_COLUMNS})
+    p.available_quantity += available
+    p.rented_quantity += rented
+    return p
+
+
+def stripe_columns() -> tuple:
+    """A product's stripe totals as two extra columns for a products query
+    (0 and 0 when unstriped; read back with summed())."""
+    return (
+        stripe_sum(Product.id, ProductStripe.available_quantity).label("striped_available"),
+        stripe_sum(Product.id, ProductStripe.rented_quantity).label("striped_rented"),
+    )
+
+
+def summed(row):
+    """A row queried with stripe_columns(), with the stripe totals added."""
+    return with_totals(row, row.striped_available, row.striped_rented)
+
+
+def product_view(db: Session, product_id: UUID):
+    """The product with its stripes summed in (see with_totals)."""
+    product, available, rented = db.execute(
+        select(Product, *stripe_columns()).where(Product.id == product_id)
+    ).one()
+    return with_totals(product, available, rented)
+
+
+def _lock(db: Session, product_id: UUID):
+    """Lock the products row, then the stripes (always in this order)."""
+    product = db.execute(
+        select(Product.category, Product.gender, Product.type, Product.available_quantity)
+        .where(Product.id == product_id)
+        .with_for_update()
+    ).first()
+    if product is None:
+        return None, []
+    stripes = db.execute(
+        select(ProductStripe.stripe, ProductStripe.available_quantity, ProductStripe.rented_quantity)
+        .where(ProductStripe.product_id == product_id)
+        .order_by(ProductStripe.stripe)
+        .with_for_update()
+    ).all()
+    return product, stripes
+
+
+def _move_to_row(db: Session, product, product_id: UUID, available: int, rented: int) -> None:
+    db.execute(
+        update(Product)
+        .where(Product.id == product_id)
+        .values(
+            available_quantity=Product.available_quantity + available,
+            rented_quantity=Product.rented_quantity + rented,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    apply_delta(db, product.category, product.gender, product.type, available=available, rented=rented)
+
+
+def collect(db: Session, product_id: UUID) -> bool:
+    """Fold every stripe into the products row (stripes stay, at zero).
+    Returns whether anything was moved."""
+    product, stripes = _lock(db, product_id)
+    available = sum(s.available_quantity for s in stripes)
+    rented = sum(s.rented_quantity for s in stripes)
+    if not available and not rented:
+        return False
+    db.execute(
+        update(ProductStripe)
+        .where(ProductStripe.product_id == product_id)
+        .values(available_quantity=0, rented_quantity=0)
+        .execution_options(synchronize_session=False)
+    )
+    _move_to_row(db, product, product_id, available, rented)
+    return True
+
+
+def spread(db: Session, product_id: UUID) -> bool:
+    """Share the product's available units evenly between its stripes and row
+    (not while it is booked ahead)."""
+    product, stripes = _lock(db, product_id)
+    if not stripes or db.execute(select(booked_ahead(product_id))).scalar():
+        return False
+    pool = product.available_quantity + sum(s.available_quantity for s in stripes)
+    share = pool // (len(stripes) + 1)
+    db.execute(
+        update(ProductStripe)
+        .where(ProductStripe.product_id == product_id)
+        .values(available_quantity=share)
+        .execution_options(synchronize_session=False)
+    )
+    row_available = pool - share * len(stripes)
+    _move_to_row(db, product, product_id, row_available - product.available_quantity, 0)
+    return True
+
+
+def _parse(product_id) -> UUID | None:
+    try:
+        return UUID(str(product_id))
+    except ValueError:
+        return None
+
+
+def stripe_count(db: Session, product_id) -> int:
+    pid = _parse(product_id)
+    if pid is None:
+        return 0
+    return db.execute(
+        select(func.count()).select_from(ProductStripe).where(ProductStripe.product_id == pid)
+    ).scalar_one()
+
+
+def set_stripes(db: Session, product_id, stripes: int) -> int:
+    """Stripe a product over `stripes` sub-counters (0 turns striping off).
+    Runs in the caller's transaction. Returns the previous stripe count."""
+    pid = _parse(product_id)
+    if pid is None:
+        raise ValueError("PRODUCT_NOT_FOUND")
+    product, existing = _lock(db, pid)
+    if product is None:
+        raise ValueError("PRODUCT_NOT_FOUND")
+    if stripes < 0 or stripes > settings["STRIPES_MAX"]:
+        raise ValueError("INVALID_STRIPES")
+    if existing:
+        collect(db, pid)
+        db.execute(delete(ProductStripe).where(ProductStripe.product_id == pid))
+    if stripes:
+        db.execute(insert(ProductStripe), [
+            {"product_id": pid, "stripe": i, "available_quantity": 0, "rented_quantity": 0}
+            for i in range(stripes)
+        ])
+        spread(db, pid)
+    _hint(pid, bool(stripes))
+    return len(existing)
+
+
+def unstripe(db: Session, product_id) -> int:
+    """Fold and drop a product's stripes (before it is edited or deleted).
+    Returns how many it had, so the caller can restore them."""
+    if not stripe_count(db, product_id):
+        return 0
+    return set_stripes(db, product_id, 0)
+
+
+def striped_products(db: Session) -> list[dict]:
+    rows = db.execute(
+        select(
+            ProductStripe.product_id,
+            Product.available_quantity,
+            func.count().label("stripes"),
+            func.sum(ProductStripe.available_quantity).label("striped_available"),
+            func.min(ProductStripe.available_quantity).label("min_available"),
+        )
+        .join(Product, Product.id == ProductStripe.product_id)
+        .group_by(ProductStripe.product_id, Product.available_quantity)
+    ).all()
+    return [
+        {
+            "productId": str(r.product_id),
+            "stripes": r.stripes,
+            "rowAvailable": r.available_quantity,
+            "stripedAvailable": r.striped_available,
+            "minAvailable": r.min_available,
+            # what every stripe would hold right after a rebalance
+            "share": (r.available_quantity + r.striped_available) // (r.stripes + 1),
+        }
+        for r in rows
+    ]
+
+
+class StripeRebalancer:
+    """Background thread re-spreading striped products whose emptiest stripe
+    holds less than half of its even share."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.rebalanced = 0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stripe-rebalancer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(10)
+            self._thread = None
+
+    def rebalance_once(self) -> int:
+        db = SessionLocal()
+        done = 0
+        try:
+            products = striped_products(db)
+            _reset_hint(UUID(p["productId"]) for p in products)
+            for p in products:
+                if p["minAvailable"] * 2 >= p["share"]:
+                    continue
+                # one short transaction per product keeps its row lock brief
+                if spread(db, UUID(p["productId"])):
+                    done += 1
+                db.commit()
+        except Exception:
+            db.rollback()
+            logger.exception("Stripe rebalance failed")
+        finally:
+            db.close()
+        self.rebalanced += done
+        return done
+
+    def stats(self) -> dict:
+        return {"running": self._thread is not None and self._thread.is_alive(), "rebalanced": self.rebalanced}
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.rebalance_once()
+
+
+stripe_rebalancer = StripeRebalancer(interval=settings["STRIPE_REBALANCE_INTERVAL_SECONDS"])
@@ -0,0 +1,171 @@
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.models.inventory_summary import InventorySummary
+from app.models.product import Product
+from app.models.product_stripe import ProductStripe
+
+# Incremental inventory rollups for GET /products/summary.
+# Every product change applies its delta to the group's row in the caller's
+# transaction, so the summary commits (or rolls back) together with the change.
+# reconcile() rebuilds the table from `products` and reports any drift.
+# Units held in product stripes are not in the table (their writes would all
+# hit one summary row); get_summary() adds them per group when it reads.
+
+FIELDS = ("products", "quantity", "available_quantity", "rented_quantity")
+
+
+def apply_delta(
+    db: Session,
+    category: str,
+    gender: str | None,
+    type: str,
+    products: int = 0,
+    quantity: int = 0,
+    available: int = 0,
+    rented: int = 0,
+) -> None:
+    values = {
+        "products": products,
+        "quantity": quantity,
+        "available_quantity": available,
+        "rented_quantity": rented,
+    }
+    stmt = insert(InventorySummary).values(category=category, gender=gender or "", type=type, **values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[InventorySummary.category, InventorySummary.gender, InventorySummary.type],
+        set_={k: getattr(InventorySummary, k) + stmt.excluded[k] for k in values},
+    )
+    db.execute(stmt)
+
+
+def add_product(db: Session, p, sign: int = 1) -> None:
+    """Count a whole product in (sign=1) or out (sign=-1) of its group."""
+    apply_delta(
+        db, p.category, p.gender, p.type,
+        products=sign,
+        quantity=sign * p.quantity,
+        available=sign * p.available_quantity,
+        rented=sign * p.rented_quantity,
+    )
+
+
+def _totals(rows) -> dict:
+    quantity = sum(r["quantity"] for r in rows)
+    available = sum(r["availableQuantity"] for r in rows)
+    rented = sum(r["rentedQuantity"] for r in rows)
+    return {
+        "products": sum(r["products"] for r in rows),
+        "quantity": quantity,
+        "availableQuantity": available,
+        "rentedQuantity": rented,
+        "takenOutQuantity": quantity - available - rented,
+    }
+
+
+def _rollup(groups: list[dict], key: str) -> list[dict]:
+    buckets: dict = {}
+    for g in groups:
+        buckets.setdefault(g[key], []).append(g)
+    return [{key: k, **_totals(rows)} for k, rows in buckets.items()]
+
+
+def _striped(db: Session) -> dict:
+    """(available, rented) held in stripes, per summary group."""
+    gender = func.coalesce(Product.gender, "")
+    return {
+        (r.category, r.gender, r.type): (r.available_quantity, r.rented_quantity)
+        for r in db.execute(
+            select(
+                Product.category,
+                gender.label("gender"),
+                Product.type,
+                func.sum(ProductStripe.available_quantity).label("available_quantity"),
+                func.sum(ProductStripe.rented_quantity).label("rented_quantity"),
+            )
+            .join(Product, Product.id == ProductStripe.product_id)
+            .group_by(Product.category, gender, Product.type)
+        )
+    }
+
+
+def get_summary(db: Session) -> dict:
+    striped = _striped(db)
+    groups = []
+    for s in db.query(InventorySummary).filter(InventorySummary.products > 0).all():
+        available, rented = striped.get((s.category, s.gender, s.type), (0, 0))
+        groups.append({
+            "category": s.category,
+            "gender": s.gender or None,
+            "type": s.type,
+            **_totals([{
+                "products": s.products,
+                "quantity": s.quantity,
+                "availableQuantity": s.available_quantity + available,
+                "rentedQuantity": s.rented_quantity + rented,
+            }]),
+        })
+    return {
+        "total": _totals(groups),
+        "byCategory": _rollup(groups, "category"),
+        "byGender": _rollup(groups, "gender"),
+        "byType": _rollup(groups, "type"),
+        "groups": groups,
+    }
+
+
+def reconcile(db: Session, fix: bool = True) -> list[dict]:
+    """Compare the summary with a fresh GROUP BY over products.
+    Returns one entry per drifting group; with fix=True the table is rebuilt."""
+    # Block apply_delta for the whole run. Taking the lock waits for every
+    # transaction that already applied a delta; a transaction blocked at its
+    # apply_delta has not committed its product change either, so the GROUP BY
+    # below (a new statement, hence a new snapshot) and the summary agree, and
+    # its delta lands on the rebuilt rows. Writes pause for one scan.
+    db.execute(text("LOCK TABLE inventory_summary IN SHARE ROW EXCLUSIVE MODE"))
+    gender = func.coalesce(Product.gender, "")
+    actual = {
+        (r.category, r.gender, r.type): (r.products, r.quantity, r.available_quantity, r.rented_quantity)
+        for r in db.execute(
+            select(
+                Product.category,
+                gender.label("gender"),
+                Product.type,
+                func.count().label("products"),
+                func.sum(Product.quantity).label("quantity"),
+                func.sum(Product.available_quantity).label("available_quantity"),
+                func.sum(Product.rented_quantity).label("rented_quantity"),
+            ).group_by(Product.category, gender, Product.type)
+        )
+    }
+    stored = {
+        (s.category, s.gender, s.type): tuple(getattr(s, f) for f in FIELDS)
+        for s in db.query(InventorySummary).all()
+    }
+
+    drift = []
+    for key in actual.keys() | stored.keys():
+        want = actual.get(key, (0, 0, 0, 0))
+        have = stored.get(key, (0, 0, 0, 0))
+        if want != have:
+            drift.append({
+                "group": {"category": key[0], "gender": key[1] or None, "type": key[2]},
+                "expected": dict(zip(FIELDS, want)),
+                "stored": dict(zip(FIELDS, have)),
+            })
+
+    if fix and drift:
+        db.execute(delete(InventorySummary))
+        if actual:
+            db.execute(
+                insert(InventorySummary),
+                [
+                    dict(zip(("category", "gender", "type"), key), **dict(zip(FIELDS, values)))
+                    for key, values in actual.items()
+                ],
+            )
+        db.commit()
+    else:
+        db.rollback()
+    return drift
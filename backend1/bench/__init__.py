@@ -0,0 +1,4 @@
+# Endpoint benchmarks: python -m bench.run --help
+# Hot-product row contention: python -m bench.contention --help
+# Reservation lookups at 100k bookings: python -m bench.reservations --help
+# SSE fan-out latency to many subscribers: python -m bench.fanout --help
@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+# every worker thread needs its own connection, and the rebalancer would
+# add its own lock traffic to the measurement
+os.environ.setdefault("DB_POOL_SIZE", "64")
+os.environ.setdefault("STRIPE_REBALANCE_INTERVAL_SECONDS", "0")
+
+from app.db.init_db import init_db  # noqa: E402
+from app.db.session import SessionLocal  # noqa: E402
+from app.models.product import Product  # noqa: E402
+from app.services import inventory_service, stripe_service  # noqa: E402
+from app.services.summary_service import add_product  # noqa: E402
+from bench.seed import PREFIX  # noqa: E402
+
+# Row contention on one hot product, with and without striped counters:
+#   python -m bench.contention --threads 32 --seconds 5 --stripes 0,1,2,4,8,16
+#
+# For every stripe count the hot product is re-striped, then --threads workers
+# run take(qty=1) + commit in a loop for --seconds, each holding the
+# transaction open --hold-ms longer (the audit row, idempotency record etc. of
+# a real request). Everything taken is returned between rounds. Prints
+# commits/s per stripe count as JSON: with 0 stripes every writer queues on the
+# products row, with N they spread over N rows.
+
+HOT_NAME = f"{PREFIX}hot"
+HOT_STOCK = 10_000_000
+
+
+def hot_product() -> str:
+    db = SessionLocal()
+    try:
+        product = db.query(Product).filter(Product.name == HOT_NAME).first()
+        if product is None:
+            product = Product(
+                id=uuid.uuid4(),
+                name=HOT_NAME,
+                category="equipment",
+                gender=None,
+                type="skis",
+                quantity=HOT_STOCK,
+                available_quantity=HOT_STOCK,
+                rented_quantity=0,
+            )
+            db.add(product)
+            add_product(db, product)
+            db.commit()
+        return str(product.id)
+    finally:
+        db.close()
+
+
+def run_round(product_id: str, threads: int, seconds: float, hold_ms: float) -> dict:
+    done = [0] * threads
+    errors = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def worker(i: int):
+        while time.perf_counter() < deadline:
+            db = SessionLocal()
+            try:
+                inventory_service.take(db, product_id, 1)
+                if hold_ms:
+                    time.sleep(hold_ms / 1000)
+                db.commit()
+                done[i] += 1
+            except Exception:
+                db.rollback()
+                errors[i] += 1
+            finally:
+                db.close()
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    wall = time.perf_counter() - started
+    return {"commits": sum(done), "errors": sum(errors), "throughput": sum(done) / wall}
+
+
+def give_back(product_id: str, qty: int) -> None:
+    if not qty:
+        return
+    db = SessionLocal()
+    try:
+        inventory_service.return_taken(db, product_id, qty)
+        db.commit()
+    finally:
+        db.close()
+
+
+def set_stripes(product_id: str, stripes: int) -> None:
+    db = SessionLocal()
+    try:
+        stripe_service.set_stripes(db, product_id, stripes)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.contention", description="Hot-product write contention")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--hold-ms", type=float, default=2, help="extra time each transaction keeps its locks")
+    parser.add_argument("--stripes", default="0,1,2,4,8,16", help="comma separated stripe counts")
+    args = parser.parse_args(argv)
+
+    init_db()
+    product_id = hot_product()
+    results = {
+        "config": {"threads": args.threads, "seconds": args.seconds, "holdMs": args.hold_ms},
+        "rounds": {},
+    }
+    try:
+        for n in (int(s) for s in args.stripes.split(",")):
+            set_stripes(product_id, n)
+            result = run_round(product_id, args.threads, args.seconds, args.hold_ms)
+            give_back(product_id, result["commits"])
+            results["rounds"][str(n)] = result
+    finally:
+        set_stripes(product_id, 0)
+
+    base = results["rounds"].get("0")
+    if base and base["throughput"]:
+        for r in results["rounds"].values():
+            r["speedup"] = r["throughput"] / base["throughput"]
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
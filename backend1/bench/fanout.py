@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# room for every subscriber, and no background jobs writing in between
+os.environ.setdefault("REALTIME_MAX_SUBSCRIBERS", "100000")
+os.environ.setdefault("OVERDUE_SCAN_INTERVAL_SECONDS", "0")
+os.environ.setdefault("AUDIT_RETENTION_INTERVAL_SECONDS", "0")
+os.environ.setdefault("STRIPE_REBALANCE_INTERVAL_SECONDS", "0")
+
+from bench.run import Client, percentile, start_server  # noqa: E402
+from bench.seed import seed  # noqa: E402
+
+# Live-event fan-out to many SSE subscribers:
+#   python -m bench.fanout --subscribers 1000 --events 50
+#
+# Opens --subscribers GET /products/stream connections against the real app
+# (uvicorn in a background thread, same process), then makes --events product
+# writes one after another, alternating take and return-taken on one product
+# so stock stays put. After each write it waits until every subscriber has
+# received the event. Latency runs from just before the write request is sent
+# to the moment a subscriber has parsed the event, so it includes the write
+# itself (its median is reported as writeP50Ms). Prints p50/p95/p99/max latency
+# over all deliveries, plus lost events and resyncs, as JSON. Set
+# REALTIME_NOTIFY to measure the LISTEN/NOTIFY path instead of in-process
+# dispatch.
+
+
+class Subscriber:
+    def __init__(self):
+        self.received: list[float] = []
+        self.resyncs = 0
+        self.ready = asyncio.Event()
+        self.changed = asyncio.Event()
+
+    async def run(self, port: int, token: str):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write((
+            "GET /products/stream HTTP/1.1\r\n"
+            f"Host: 127.0.0.1:{port}\r\n"
+            f"Authorization: Bearer {token}\r\n"
+            "Accept: text/event-stream\r\n\r\n"
+        ).encode())
+        await writer.drain()
+        try:
+            # the chunked-encoding size lines never start with "data: " or "retry:"
+            while line := await reader.readline():
+                if line.startswith(b"retry:"):
+                    self.ready.set()
+                elif line.startswith(b"data: "):
+                    event = json.loads(line[6:])
+                    if event["type"] == "resync":
+                        self.resyncs += 1
+                    else:
+                        self.received.append(time.perf_counter())
+                    self.changed.set()
+        finally:
+            writer.close()
+
+
+class Fleet:
+    """All subscribers, on one event loop in a background thread."""
+
+    def __init__(self, n: int, port: int, token: str):
+        self.loop = asyncio.new_event_loop()
+        self.subs = [Subscriber() for _ in range(n)]
+        self.port = port
+        self.token = token
+        threading.Thread(target=self.loop.run_forever, name="bench-subscribers", daemon=True).start()
+
+    def _wait(self, coro, timeout: float):
+        return asyncio.run_coroutine_threadsafe(asyncio.wait_for(coro, timeout), self.loop).result()
+
+    def connect(self, timeout: float):
+        async def go():
+            for sub in self.subs:
+                self.loop.create_task(sub.run(self.port, self.token))
+            await asyncio.gather(*(sub.ready.wait() for sub in self.subs))
+        self._wait(go(), timeout)
+
+    def wait_for(self, count: int, timeout: float) -> bool:
+        """Wait until every subscriber has `count` events (or gave up after a resync)."""
+        async def all_there():
+            for sub in self.subs:
+                while len(sub.received) < count and not sub.resyncs:
+                    sub.changed.clear()
+                    await sub.changed.wait()
+        try:
+            self._wait(all_there(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def close(self):
+        for task in asyncio.all_tasks(self.loop):
+            self.loop.call_soon_threadsafe(task.cancel)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.fanout", description="SSE fan-out latency")
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--events", type=int, default=50)
+    parser.add_argument("--timeout", type=float, default=10, help="seconds to wait for one event to reach everyone")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args(argv)
+
+    data = seed(10, 1, random.Random(1))
+    server = start_server(args.port)
+    client = Client(f"http://127.0.0.1:{args.port}")
+    fleet = Fleet(args.subscribers, args.port, client.login(data["users"][0]))
+    admin = client.login(data["admin"])
+    product_id = data["productIds"][0]
+
+    latencies: list[float] = []
+    write_ms: list[float] = []
+    timeouts = 0
+    try:
+        fleet.connect(args.timeout)
+        for i in range(args.events):
+            action = "take" if i % 2 == 0 else "return-taken"
+            sent = time.perf_counter()
+            status = client.call("POST", f"/products/{product_id}/{action}", admin, {"qty": 1})[0]
+            write_ms.append((time.perf_counter() - sent) * 1000)
+            if status >= 400:
+                raise RuntimeError(f"{action} failed: {status}")
+            if not fleet.wait_for(i + 1, args.timeout):
+                timeouts += 1
+            # after a resync a subscriber's events no longer line up with the writes
+            latencies.extend((sub.received[i] - sent) * 1000 for sub in fleet.subs
+                             if len(sub.received) > i and not sub.resyncs)
+        if args.events % 2:
+            client.call("POST", f"/products/{product_id}/return-taken", admin, {"qty": 1})
+    finally:
+        fleet.close()
+        server.should_exit = True
+
+    latencies.sort()
+    write_ms.sort()
+    expected = args.subscribers * args.events
+    print(json.dumps({
+        "config": {"subscribers": args.subscribers, "events": args.events,
+                   "notify": os.getenv("REALTIME_NOTIFY", "false").lower() == "true"},
+        "deliveries": len(latencies),
+        "lost": expected - len(latencies),
+        "resyncs": sum(sub.resyncs for sub in fleet.subs),
+        "timeouts": timeouts,
+        "p50Ms": percentile(latencies, 50),
+        "p95Ms": percentile(latencies, 95),
+        "p99Ms": percentile(latencies, 99),
+        "maxMs": latencies[-1] if latencies else 0.0,
+        "writeP50Ms": percentile(write_ms, 50),
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,135 @@
+import argparse
+import json
+import random
+import sys
+import time
+from collections import Counter
+from datetime import timedelta
+from uuid import UUID
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from app.db.session import SessionLocal
+from app.models.reservation import ProductDayUsage, Reservation
+from app.models.user import User
+from app.services import reservation_service
+from bench.seed import seed
+
+# Reservation lookups with a large booking history:
+#   python -m bench.reservations --reservations 100000 --products 500
+#
+# Seeds the bench products (see bench.seed) and tops their reservations up to
+# --reservations, spread over the next --horizon days, then times:
+#   availability  - free units of --batch products for a random week (booking page)
+#   reservedUnits - the peak reserved units of one product over a random week
+#   reserve       - a full booking (row lock, check, day upserts), rolled back
+# Prints p50/p95 latency and operations per second for each as JSON. With the
+# day-bucket table every lookup is a primary-key range scan, so the numbers
+# should not move as --reservations grows.
+
+
+def seed_reservations(product_ids: list[UUID], user_id: UUID, wanted: int, horizon: int, rng: random.Random) -> int:
+    db = SessionLocal()
+    try:
+        have = db.execute(
+            select(func.count()).select_from(Reservation).where(Reservation.product_id.in_(product_ids))
+        ).scalar_one()
+        today = reservation_service.today()
+        for chunk_start in range(have, wanted, 5000):
+            rows, days = [], Counter()
+            for _ in range(min(5000, wanted - chunk_start)):
+                pid = rng.choice(product_ids)
+                start = today + timedelta(days=rng.randint(1, horizon))
+                end = start + timedelta(days=rng.randint(0, 6))
+                rows.append({
+                    "product_id": pid, "user_id": user_id, "qty": 1,
+                    "start_date": start, "end_date": end, "status": "ACTIVE",
+                })
+                for i in range((end - start).days + 1):
+                    days[(pid, start + timedelta(days=i))] += 1
+            db.execute(insert(Reservation), rows)
+            stmt = pg_insert(ProductDayUsage).values([
+                {"product_id": pid, "day": day, "reserved": n} for (pid, day), n in days.items()
+            ])
+            db.execute(stmt.on_conflict_do_update(
+                index_elements=[ProductDayUsage.product_id, ProductDayUsage.day],
+                set_={"reserved": ProductDayUsage.reserved + stmt.excluded.reserved},
+            ))
+            db.commit()
+        return max(have, wanted)
+    finally:
+        db.close()
+
+
+def timed(fn, repeat: int) -> dict:
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    total = sum(latencies) / 1000
+    return {
+        "p50Ms": latencies[len(latencies) // 2],
+        "p95Ms": latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)],
+        "opsPerSecond": repeat / total if total else 0.0,
+    }
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.reservations", description="Reservation lookup benchmarks")
+    parser.add_argument("--reservations", type=int, default=100_000)
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--horizon", type=int, default=90, help="days ahead the bookings are spread over")
+    parser.add_argument("--batch", type=int, default=100, help="products per availability query")
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    data = seed(args.products, 1, rng)
+    product_ids = [UUID(pid) for pid in data["productIds"]]
+    db = SessionLocal()
+    try:
+        user_id = db.execute(select(User.id).where(User.username == data["users"][0])).scalar_one()
+    finally:
+        db.close()
+    total = seed_reservations(product_ids, user_id, args.reservations, args.horizon, rng)
+
+    today = reservation_service.today()
+
+    def week():
+        start = today + timedelta(days=rng.randint(1, args.horizon))
+        return start, start + timedelta(days=6)
+
+    db = SessionLocal()
+    try:
+        def availability():
+            reservation_service.availability(db, rng.sample(product_ids, min(args.batch, len(product_ids))), *week())
+
+        def reserved_units():
+            db.execute(select(reservation_service.reserved_units(rng.choice(product_ids), *week()))).scalar_one()
+
+        def reserve():
+            try:
+                reservation_service.reserve(db, rng.choice(product_ids), user_id, 1, *week())
+            except ValueError:
+                pass
+            db.rollback()
+
+        results = {
+            "config": {"reservations": total, "products": len(product_ids), "batch": args.batch},
+            "availability": timed(availability, args.repeat),
+            "reservedUnits": timed(reserved_units, args.repeat),
+            "reserve": timed(reserve, args.repeat),
+        }
+    finally:
+        db.rollback()
+        db.close()
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,281 @@
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# background jobs would add their own queries to the per-request counts
+os.environ.setdefault("OVERDUE_SCAN_INTERVAL_SECONDS", "0")
+os.environ.setdefault("AUDIT_RETENTION_INTERVAL_SECONDS", "0")
+os.environ.setdefault("STRIPE_REBALANCE_INTERVAL_SECONDS", "0")
+
+import uvicorn  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app.main import app  # noqa: E402
+from bench.seed import PASSWORD, seed  # noqa: E402
+
+# Drives the real FastAPI app (uvicorn in a background thread, same process)
+# against the database in DATABASE_URL and reports, per scenario:
+#   throughput (req/s), p50/p95/p99 latency (ms), error count, and
+#   queries per request (statements seen by every SQLAlchemy engine in this
+#   process while the scenario ran, divided by its request count)
+#
+#   python -m bench.run --requests 500 --concurrency 16 --out bench.json
+#   python -m bench.run --baseline bench.json    -> exit code 1 on regression
+#   python -m bench.run --compare-async          -> sync vs DB_ASYNC routers
+#
+# DB_ASYNC picks the routers when app.main is imported, so --compare-async runs
+# the same scenarios in two child processes (DB_ASYNC=false, then true) and
+# reports both plus the async/sync throughput and p95 ratios per scenario.
+#
+# "me" is the bare authenticated lookup (GET /auth/me): with the resolved-user
+# cache it averages well under one query per request; run it again with
+# USER_CACHE_TTL_SECONDS=0 to see the uncached cost (one SELECT on users each).
+#
+# Scenarios run one after another and in an order that keeps stock stable:
+# take is undone by return-taken and rent by return-rented.
+
+SCENARIOS = ("login", "me", "list", "take", "return-taken", "rent", "return-rented", "audit-list")
+
+
+class QueryCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        event.listen(Engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        with self._lock:
+            self.count += 1
+
+
+class Client:
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def call(self, method: str, path: str, token: str | None = None, body: dict | None = None) -> tuple[int, object]:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header("Content-Type", "application/json")
+        if token:
+            req.add_header("Authorization", f"Bearer {token}")
+        try:
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                return resp.status, json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def login(self, username: str) -> str:
+        status, body = self.call("POST", "/auth/login", body={"username": username, "password": PASSWORD})
+        if status != 200:
+            raise RuntimeError(f"login failed for {username}: {status}")
+        return body["token"]
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(p / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+def run_scenario(calls: list, concurrency: int, counter: QueryCounter) -> dict:
+    """Run every call (a zero-argument function returning an HTTP status) and
+    summarize the latencies."""
+    latencies: list[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def timed(fn):
+        nonlocal errors
+        start = time.perf_counter()
+        status = fn()
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed * 1000)
+            if status >= 400:
+                errors += 1
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(timed, calls))
+    wall = time.perf_counter() - started
+    queries = counter.count - queries_before
+
+    latencies.sort()
+    return {
+        "requests": len(calls),
+        "errors": errors,
+        "throughput": len(calls) / wall if wall else 0.0,
+        "p50Ms": percentile(latencies, 50),
+        "p95Ms": percentile(latencies, 95),
+        "p99Ms": percentile(latencies, 99),
+        "queriesPerRequest": queries / len(calls) if calls else 0.0,
+    }
+
+
+def build_calls(name: str, n: int, client: Client, ctx: dict, rng: random.Random) -> list:
+    tokens, admin_token, products = ctx["tokens"], ctx["adminToken"], ctx["productIds"]
+
+    if name == "login":
+        return [lambda u=rng.choice(ctx["users"]): client.call(
+            "POST", "/auth/login", body={"username": u, "password": PASSWORD})[0] for _ in range(n)]
+    if name == "me":
+        return [lambda t=rng.choice(tokens): client.call("GET", "/auth/me", t)[0] for _ in range(n)]
+    if name == "list":
+        return [lambda t=rng.choice(tokens): client.call("GET", "/products?limit=100", t)[0] for _ in range(n)]
+    if name == "audit-list":
+        return [lambda: client.call("GET", "/audit-logs?limit=100", admin_token)[0] for _ in range(n)]
+
+    # take / rent record what they did so the matching return can undo it
+    if name in ("take", "rent"):
+        done = ctx.setdefault(name, [])
+        path = "take" if name == "take" else "rent"
+        body = {"qty": 1} if name == "take" else {"qty": 1, "days": 2}
+
+        def call(t, pid):
+            status = client.call("POST", f"/products/{pid}/{path}", t, body)[0]
+            if status < 400:
+                done.append((t, pid))
+            return status
+        return [lambda t=rng.choice(tokens), pid=rng.choice(products): call(t, pid) for _ in range(n)]
+    if name in ("return-taken", "return-rented"):
+        source = ctx.get("take" if name == "return-taken" else "rent", [])
+        return [lambda t=t, pid=pid: client.call("POST", f"/products/{pid}/{name}", t, {"qty": 1})[0]
+                for t, pid in source]
+    raise ValueError(f"unknown scenario {name}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Regressions of `results` against `baseline`, as readable lines."""
+    problems = []
+    for name, cur in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if cur["p95Ms"] > base["p95Ms"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {cur['p95Ms']:.1f}ms vs baseline {base['p95Ms']:.1f}ms")
+        if cur["throughput"] < base["throughput"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {cur['throughput']:.1f}/s vs baseline {base['throughput']:.1f}/s")
+        # query counts are deterministic: any increase is a regression
+        if cur["queriesPerRequest"] > base["queriesPerRequest"] + 0.01:
+            problems.append(
+                f"{name}: {cur['queriesPerRequest']:.2f} queries/request vs baseline {base['queriesPerRequest']:.2f}"
+            )
+    return problems
+
+
+def compare_async(argv: list[str]) -> dict:
+    """Run this benchmark once per data path and put the reports side by side."""
+    # the children get the same options, minus this flag and the report path
+    child_argv, skip = [], False
+    for a in argv:
+        if skip:
+            skip = False
+        elif a == "--out":
+            skip = True
+        elif a != "--compare-async" and not a.startswith("--out="):
+            child_argv.append(a)
+    results = {"sync": None, "async": None, "asyncVsSync": {}}
+    for mode in ("sync", "async"):
+        with tempfile.NamedTemporaryFile(suffix=".json") as out:
+            env = {**os.environ, "DB_ASYNC": "true" if mode == "async" else "false"}
+            subprocess.run([sys.executable, "-m", "bench.run", *child_argv, "--out", out.name], env=env, check=True)
+            with open(out.name) as f:
+                results[mode] = json.load(f)
+    for name, a in results["async"]["scenarios"].items():
+        s = results["sync"]["scenarios"].get(name)
+        if not s:
+            continue
+        results["asyncVsSync"][name] = {
+            "throughputRatio": a["throughput"] / s["throughput"] if s["throughput"] else 0.0,
+            "p95Ratio": a["p95Ms"] / s["p95Ms"] if s["p95Ms"] else 0.0,
+        }
+    return results
+
+
+def start_server(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="bench-server", daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.run", description="Endpoint latency benchmarks")
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="comma separated subset")
+    parser.add_argument("--products", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=1, help="random seed for data and request mix")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/throughput drift (0.2 = 20%%)")
+    parser.add_argument("--compare-async", action="store_true", help="run with DB_ASYNC off and on and compare")
+    args = parser.parse_args(argv)
+
+    if args.compare_async:
+        if args.baseline:
+            parser.error("--baseline does not apply to --compare-async")
+        report = json.dumps(compare_async(argv), indent=2)
+        if args.out:
+            with open(args.out, "w") as f:
+                f.write(report + "\n")
+        else:
+            print(report)
+        return 0
+
+    rng = random.Random(args.seed)
+    data = seed(args.products, args.users, rng)
+    server = start_server(args.port)
+    client = Client(f"http://127.0.0.1:{args.port}")
+    counter = QueryCounter()
+    try:
+        ctx = {
+            **data,
+            "adminToken": client.login(data["admin"]),
+            "tokens": [client.login(u) for u in data["users"]],
+        }
+        results = {
+            "config": {k: getattr(args, k) for k in ("requests", "concurrency", "products", "users", "seed")},
+            "scenarios": {},
+        }
+        for name in args.scenarios.split(","):
+            calls = build_calls(name, args.requests, client, ctx, rng)
+            results["scenarios"][name] = run_scenario(calls, args.concurrency, counter)
+    finally:
+        server.should_exit = True
+
+    report = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            problems = compare(results, json.load(f), args.tolerance)
+        for line in problems:
+            print(f"⚠️ {line}", file=sys.stderr)
+        if problems:
+            return 1
+        print("✅ no regressions against the baseline", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
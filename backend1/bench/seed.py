@@ -0,0 +1,65 @@
+import random
+import uuid
+
+from app.core.security import hash_password
+from app.db.init_db import init_db
+from app.db.session import SessionLocal
+from app.models.product import Product
+from app.models.user import User
+from app.services.catalog_service import touch
+from app.services.summary_service import add_product
+
+# Benchmark data lives next to real data under a "bench-" prefix, so seeding is
+# idempotent and never touches existing rows. Use a throwaway database anyway:
+# the take/rent scenarios write audit rows and rentals.
+
+PREFIX = "bench-"
+PASSWORD = "bench-password"
+
+CATALOG = {
+    "equipment": ["skis", "snowboard", "boots", "poles", "helmet", "goggles"],
+    "clothing": ["jacket", "pants", "gloves", "base-layer", "socks"],
+}
+GENDERS = {"equipment": [None], "clothing": ["male", "female"]}
+
+
+def seed(products: int, users: int, rng: random.Random) -> dict:
+    """Create (or reuse) the bench admin, `users` employees and `products`
+    products. Returns what the scenarios need: product ids and usernames."""
+    init_db()
+    db = SessionLocal()
+    try:
+        # one hash for everyone: argon2 is deliberately slow
+        password_hash = hash_password(PASSWORD)
+        existing_users = {u for (u,) in db.query(User.username).filter(User.username.like(f"{PREFIX}%"))}
+        wanted = [f"{PREFIX}admin"] + [f"{PREFIX}user{i}" for i in range(users)]
+        for name in wanted:
+            if name not in existing_users:
+                db.add(User(id=uuid.uuid4(), username=name, password_hash=password_hash,
+                            role="admin" if name.endswith("admin") else "employee"))
+
+        have = db.query(Product).filter(Product.name.like(f"{PREFIX}%")).count()
+        for i in range(have, products):
+            category = rng.choice(list(CATALOG))
+            qty = rng.randint(20, 200)
+            p = Product(
+                id=uuid.uuid4(),
+                name=f"{PREFIX}{category}-{i}",
+                category=category,
+                gender=rng.choice(GENDERS[category]),
+                type=rng.choice(CATALOG[category]),
+                quantity=qty,
+                available_quantity=qty,
+                rented_quantity=0,
+            )
+            db.add(p)
+            add_product(db, p)
+        touch(db)
+        db.commit()
+
+        ids = [str(pid) for (pid,) in db.query(Product.id).filter(
+            Product.name.like(f"{PREFIX}%"), Product.available_quantity >= 10,
+        ).limit(products)]
+        return {"productIds": ids, "admin": f"{PREFIX}admin", "users": wanted[1:]}
+    finally:
+        db.close()
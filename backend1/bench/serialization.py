@@ -0,0 +1,70 @@
+import argparse
+import json
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.product import ProductOut, to_product_out
+
+# Serialization cost of a large product listing, without a database:
+#   python -m bench.serialization --rows 10000 --repeat 20
+#
+# Compares the pre-orjson path (jsonable_encoder + stdlib JSONResponse) with
+# what list endpoints do now (response model dump + ORJSONResponse), starting
+# from the same to_product_out dicts. Prints rows/s for each as JSON.
+
+
+def fake_rows(n: int) -> list:
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(),
+            name=f"product-{i}",
+            category="equipment" if i % 2 else "clothing",
+            gender=None if i % 2 else "female",
+            type="skis",
+            quantity=40,
+            available_quantity=30,
+            rented_quantity=10,
+        )
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str]) -> int:
+    parser = argparse.ArgumentParser(prog="python -m bench.serialization")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    page = [to_product_out(p) for p in fake_rows(args.rows)]
+    adapter = TypeAdapter(list[ProductOut])
+
+    paths = {
+        "stdlib": lambda: JSONResponse(jsonable_encoder(page)).body,
+        "responseModel+orjson": lambda: ORJSONResponse(adapter.dump_python(adapter.validate_python(page), mode="json")).body,
+        "orjson": lambda: ORJSONResponse(page).body,
+    }
+    results = {"rows": args.rows}
+    for name, fn in paths.items():
+        seconds = timed(fn, args.repeat)
+        results[name] = {"bestMs": seconds * 1000, "rowsPerSecond": args.rows / seconds}
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
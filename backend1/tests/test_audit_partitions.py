@@ -0,0 +1,57 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import func, select, text
+
+from app.models.audit_log import AuditLog
+from app.services.audit_archive_service import (
+    DEFAULT_PARTITION,
+    add_months,
+    archive_default,
+    ensure_partitions,
+    list_partitions,
+    month_start,
+    partition_name,
+    read_archive,
+)
+
+
+def in_default(db, actor_id) -> int:
+    return db.execute(text(
+        f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE actor_user_id = :a"
+    ), {"a": actor_id}).scalar()
+
+
+def test_a_month_with_rows_in_the_default_partition_still_gets_its_partition(db, make_user):
+    user = make_user()
+    ensure_partitions(db, 1)
+    # past the last partition: the row lands in the default partition
+    month = add_months(list_partitions(db)[-1], 1)
+    db.add(AuditLog(actor_user_id=user.id, action="TEST", created_at=datetime(month.year, month.month, 10, tzinfo=timezone.utc)))
+    db.flush()
+    assert in_default(db, user.id) == 1
+
+    current = month_start(datetime.now(timezone.utc))
+    ahead = (month.year - current.year) * 12 + month.month - current.month
+    assert partition_name(month) in ensure_partitions(db, ahead)
+    assert in_default(db, user.id) == 0
+    assert db.execute(select(func.count()).select_from(AuditLog).where(AuditLog.actor_user_id == user.id)).scalar() == 1
+    # the db fixture rolls the partitions back
+
+
+def test_expired_rows_of_the_default_partition_are_archived(db, make_user, tmp_path):
+    user = make_user()
+    month = date(2001, 1, 1)
+    for day in (3, 20):
+        db.add(AuditLog(actor_user_id=user.id, action="TEST", qty=day, created_at=datetime(2001, 1, day, tzinfo=timezone.utc)))
+    db.commit()
+    assert in_default(db, user.id) == 2
+
+    assert archive_default(db, month, str(tmp_path)) == 2
+    assert in_default(db, user.id) == 0
+
+    # a late row for the same month is appended to the archive, not written over it
+    db.add(AuditLog(actor_user_id=user.id, action="TEST", qty=31, created_at=datetime(2001, 1, 31, tzinfo=timezone.utc)))
+    db.commit()
+    assert archive_default(db, month, str(tmp_path)) == 1
+    archived = list(read_archive(str(tmp_path), actor_user_id=user.id))
+    assert [rec["qty"] for rec in archived] == [3, 20, 31]
@@ -0,0 +1,61 @@
+import uuid
+
+import pytest
+
+from app.services.idempotency_service import (
+    Idempotency,
+    IdempotencyConflict,
+    IdempotencyMismatch,
+    Replay,
+    fingerprint,
+)
+
+ROUTE = "POST /products/1/take"
+
+
+def request(key: str, body: bytes, route: str = ROUTE) -> Idempotency:
+    return Idempotency(key, route, fingerprint(route, body))
+
+
+@pytest.fixture
+def stored(db, make_user):
+    """A user and a key whose first request (qty 1) has been answered."""
+    user = make_user()
+    key = f"test-{uuid.uuid4()}"
+    first = request(key, b'{"qty": 1}')
+    first.check(db, user.id)
+    first.remember(db, user.id, {"ok": True})
+    db.commit()
+    return user, key
+
+
+def test_fingerprint_ignores_json_layout():
+    assert fingerprint(ROUTE, b'{"qty": 1, "days": 2}') == fingerprint(ROUTE, b'{"days":2,"qty":1}')
+    assert fingerprint(ROUTE, b'{"qty": 1}') != fingerprint(ROUTE, b'{"qty": 2}')
+    assert fingerprint(ROUTE, b"") != fingerprint("DELETE /products/1", b"")
+
+
+def test_same_request_replays(db, stored):
+    user, key = stored
+    with pytest.raises(Replay) as exc:
+        request(key, b'{ "qty" : 1 }').check(db, user.id)
+    assert exc.value.body == {"ok": True}
+
+
+def test_same_key_with_another_body_is_refused(db, stored):
+    user, key = stored
+    with pytest.raises(IdempotencyMismatch):
+        request(key, b'{"qty": 5}').check(db, user.id)
+
+
+def test_same_key_on_another_route_conflicts(db, stored):
+    user, key = stored
+    with pytest.raises(IdempotencyConflict):
+        request(key, b'{"qty": 1}', route="POST /products/1/rent").check(db, user.id)
+
+
+def test_losing_a_race_with_another_body_is_refused(db, stored):
+    """remember() after check() passed: the stored row decides."""
+    user, key = stored
+    with pytest.raises(IdempotencyMismatch):
+        request(key, b'{"qty": 5}').remember(db, user.id, {"ok": True})
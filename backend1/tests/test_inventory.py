@@ -0,0 +1,81 @@
+import random
+import threading
+from collections import Counter
+
+from app.db.session import SessionLocal
+from app.services import inventory_service
+
+# The stock invariants under concurrent single-statement inventory actions:
+# nothing oversold, no counter below zero, and
+#     quantity = available + rented + taken out
+# where the last two are exactly what the successful actions add up to.
+
+EXPECTED_ERRORS = {"NOT_ENOUGH_STOCK", "NOTHING_TAKEN", "NOT_ENOUGH_RENTED", "NO_ACTIVE_RENTAL"}
+
+
+def _run(workers: int, ops_per_worker: int, fn) -> Counter:
+    results = Counter()
+    lock = threading.Lock()
+    start = threading.Barrier(workers)
+
+    def worker(i: int):
+        rng = random.Random(i)
+        db = SessionLocal()
+        try:
+            start.wait()
+            for _ in range(ops_per_worker):
+                outcome = fn(db, i, rng)
+                with lock:
+                    results[outcome] += 1
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(120)
+    return results
+
+
+def _attempt(db, action):
+    try:
+        action()
+        db.commit()
+        return "ok"
+    except ValueError as e:
+        db.rollback()
+        return str(e)
+
+
+def test_parallel_takes_never_oversell(db, make_product, stock):
+    pid = make_product(available=50)
+
+    results = _run(20, 10, lambda s, i, rng: _attempt(s, lambda: inventory_service.take(s, pid, 1)))
+
+    assert results == Counter({"ok": 50, "NOT_ENOUGH_STOCK": 150})
+    assert stock(pid) == (50, 0, 0)
+
+
+def test_mixed_actions_keep_the_invariant(db, make_product, make_user, stock):
+    pid = make_product(available=20)
+    users = [str(make_user().id) for _ in range(16)]
+    done = Counter()
+    lock = threading.Lock()
+
+    def step(s, i, rng):
+        action = rng.choice(inventory_service.ACTIONS)
+        outcome = _attempt(s, lambda: inventory_service.run_action(s, action, pid, users[i], 1, 2))
+        if outcome == "ok":
+            with lock:
+                done[action] += 1
+        return outcome
+
+    results = _run(16, 20, step)
+
+    assert set(results) <= {"ok"} | EXPECTED_ERRORS, results
+    quantity, available, rented = stock(pid)
+    taken = done["take"] - done["return-taken"]
+    assert rented == done["rent"] - done["return-rented"]
+    assert available >= 0 and rented >= 0 and taken >= 0
+    assert quantity == available + rented + taken == 20
@@ -0,0 +1,50 @@
+import threading
+from datetime import timedelta
+
+from sqlalchemy import func, select, update
+
+from app.db.session import SessionLocal
+from app.models.audit_log import AuditLog
+from app.models.rental import Rental
+from app.services import inventory_service
+from app.services.overdue_service import mark_overdue
+
+
+def test_parallel_scanners_mark_and_audit_each_rental_once(db, make_product, make_user):
+    user = make_user()
+    rental_ids = []
+    for _ in range(30):
+        _, rental = inventory_service.rent(db, make_product(available=1), str(user.id), 1, 1)
+        rental_ids.append(rental.id)
+    # the session does not autoflush: the last rental is still pending
+    db.flush()
+    db.execute(
+        update(Rental).where(Rental.id.in_(rental_ids)).values(end_date=func.now() - timedelta(days=1))
+    )
+    db.commit()
+
+    marked = []
+
+    def scan():
+        s = SessionLocal()
+        try:
+            marked.append(mark_overdue(s, batch_size=4))
+        finally:
+            s.close()
+
+    scanners = [threading.Thread(target=scan) for _ in range(4)]
+    for t in scanners:
+        t.start()
+    for t in scanners:
+        t.join(60)
+
+    # other overdue rentals in the database may be marked too
+    assert sum(marked) >= len(rental_ids)
+    statuses = db.execute(select(Rental.status).where(Rental.id.in_(rental_ids))).scalars().all()
+    assert statuses == ["OVERDUE"] * len(rental_ids)
+    audited = db.execute(
+        select(AuditLog.meta["rentalId"].astext, func.count())
+        .where(AuditLog.action == "RENTAL_OVERDUE", AuditLog.actor_user_id == user.id)
+        .group_by(AuditLog.meta["rentalId"].astext)
+    ).all()
+    assert dict(audited) == {str(rid): 1 for rid in rental_ids}
@@ -0,0 +1,107 @@
+import threading
+from uuid import UUID
+
+import pytest
+
+from app.core.config import settings
+from app.core.query_budget import query_budget
+from app.db.session import SessionLocal
+from app.services import inventory_service
+from app.services.event_hub import event_hub, product_event
+from app.services.product_cache import get_products, invalidate_products, product_cache
+
+
+@pytest.fixture
+def notify(monkeypatch):
+    """Workers that hear about each other's writes (the cache is served)."""
+    monkeypatch.setitem(settings, "REALTIME_NOTIFY", True)
+    product_cache.clear()
+    yield
+    product_cache.clear()
+
+
+def available(db, pid: str) -> int:
+    return get_products(db, [UUID(pid)])[UUID(pid)]["availableQuantity"]
+
+
+def test_hits_cost_no_query_and_an_event_drops_its_id(db, notify, make_product):
+    pid, other = make_product(available=5), make_product(available=5)
+    get_products(db, [UUID(pid), UUID(other)])
+    with query_budget(0, mode="raise"):
+        assert available(db, pid) == 5
+
+    inventory_service.take(db, pid, 2)
+    db.commit()
+    # what another worker's write looks like here: the event, not after_write
+    event_hub.dispatch(product_event({"id": pid}))
+    assert available(db, pid) == 3
+    # the other product stays cached
+    with query_budget(0, mode="raise"):
+        assert available(db, other) == 5
+
+
+def test_without_notify_entries_are_not_served(db, monkeypatch, make_product):
+    """Other workers' writes cannot reach the cache: every read loads."""
+    monkeypatch.setitem(settings, "REALTIME_NOTIFY", False)
+    pid = make_product(available=5)
+    assert available(db, pid) == 5
+    writer = SessionLocal()
+    try:
+        inventory_service.take(writer, pid, 2)
+        writer.commit()
+    finally:
+        writer.close()
+    assert available(db, pid) == 3
+
+
+def test_reads_never_see_older_stock_than_invalidated(db, notify, make_product):
+    """Each write invalidates its id after committing, as after_write and the
+    events do; loads racing an invalidation must not put the old row back."""
+    ids = [make_product(available=60) for _ in range(3)]
+    # lowest availability committed and invalidated so far per product
+    committed = {pid: 60 for pid in ids}
+    lock = threading.Lock()
+    stale = []
+    writing = threading.Event()
+    writing.set()
+
+    def writer(pid):
+        s = SessionLocal()
+        try:
+            for _ in range(50):
+                product = inventory_service.take(s, pid, 1)
+                left = product.available_quantity
+                s.commit()
+                invalidate_products([pid])
+                with lock:
+                    committed[pid] = min(committed[pid], left)
+        finally:
+            s.close()
+
+    def reader():
+        s = SessionLocal()
+        try:
+            while writing.is_set():
+                with lock:
+                    floor = dict(committed)
+                found = get_products(s, [UUID(pid) for pid in ids])
+                s.rollback()
+                for pid in ids:
+                    if found[UUID(pid)]["availableQuantity"] > floor[pid]:
+                        stale.append((pid, found[UUID(pid)]["availableQuantity"], floor[pid]))
+        finally:
+            s.close()
+
+    readers = [threading.Thread(target=reader) for _ in range(4)]
+    writers = [threading.Thread(target=writer, args=(pid,)) for pid in ids]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join(120)
+    writing.clear()
+    for t in readers:
+        t.join(120)
+
+    assert stale == []
+    assert {pid: available(db, pid) for pid in ids} == {pid: 10 for pid in ids}
+    assert product_cache.hits > 0
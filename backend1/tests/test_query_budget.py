@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+from fastapi import Response
+from sqlalchemy import text
+
+from app.api.audit_logs import list_audit_logs
+from app.api.products import list_products
+from app.api.rentals import list_rentals, my_rentals
+from app.core.query_budget import QueryBudgetExceeded, query_budget
+from app.services import inventory_service
+from app.services.audit_service import log_action
+from app.services.product_cache import page_cache, product_cache
+
+
+def run(db, n: int):
+    for _ in range(n):
+        db.execute(text("SELECT 1"))
+
+
+def test_context_manager_counts_and_raises(db):
+    with query_budget(2, mode="raise") as budget:
+        run(db, 2)
+    assert budget.count == 2
+
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        with query_budget(2, label="three", mode="raise"):
+            run(db, 3)
+    assert "three: 3 statements, budget 2" in str(exc.value)
+    assert "test_query_budget.py" not in str(exc.value)  # only app frames are listed
+
+
+def test_budgets_nest(db):
+    with query_budget(3, mode="raise") as outer:
+        run(db, 1)
+        with query_budget(1, mode="raise") as inner:
+            run(db, 1)
+        run(db, 1)
+    assert (outer.count, inner.count) == (3, 1)
+
+
+def test_off_mode_does_not_track(db):
+    with query_budget(0, mode="off") as budget:
+        run(db, 2)
+    assert budget.count == 0
+
+
+def test_the_block_error_wins_over_the_budget(db):
+    with pytest.raises(KeyError):
+        with query_budget(0, mode="raise"):
+            run(db, 1)
+            raise KeyError("x")
+
+
+def test_log_mode_logs_instead_of_raising(db, caplog):
+    with query_budget(0, label="logged", mode="log"):
+        run(db, 1)
+    assert "Query budget exceeded: logged: 1 statements, budget 0" in caplog.text
+
+
+def test_decorator_gives_every_call_a_fresh_budget(db):
+    @query_budget(2, mode="raise")
+    def twice():
+        run(db, 2)
+
+    twice()
+    twice()
+
+    @query_budget(1, mode="raise")
+    def too_many():
+        run(db, 2)
+
+    with pytest.raises(QueryBudgetExceeded) as exc:
+        too_many()
+    assert "too_many" in str(exc.value)
+
+
+def test_decorator_on_coroutines(db):
+    @query_budget(1, mode="raise")
+    async def handler(n):
+        run(db, n)
+        return n
+
+    assert asyncio.run(handler(1)) == 1
+    with pytest.raises(QueryBudgetExceeded):
+        asyncio.run(handler(2))
+
+
+# The handlers below carry @query_budget; QUERY_BUDGET_MODE=raise (conftest)
+# makes them fail on a violation. The outer budgets pin the exact counts, with
+# enough rows that a per-row query would show.
+
+def list_page(db, user):
+    return list_products(
+        Response(), category=None, gender=None, type=None, inStock=True, cursor=None,
+        limit=100, if_none_match=None, user=user, db=db,
+    )
+
+
+def test_listing_budget(db, make_product, make_user):
+    user = make_user()
+    for _ in range(5):
+        make_product(available=3)
+    db.refresh(user)
+    page_cache.clear()
+    with query_budget(2, mode="raise") as budget:
+        assert len(list_page(db, user)) >= 5
+    assert budget.count == 2
+    # the same page again comes from the page cache: only the version is read
+    with query_budget(1, mode="raise"):
+        list_page(db, user)
+
+
+def test_rentals_budgets(db, make_product, make_user):
+    user, admin = make_user(), make_user("admin")
+    for _ in range(5):
+        inventory_service.rent(db, make_product(available=2), str(user.id), 1, 2)
+        db.commit()
+    # the commits expired them: reload outside the budgets
+    db.refresh(user)
+    db.refresh(admin)
+    product_cache.clear()
+    with query_budget(2, mode="raise"):
+        mine = my_rentals(user=user, db=db)
+    assert len(mine) == 5 and all(r["productName"] for r in mine)
+
+    product_cache.clear()
+    with query_budget(2, mode="raise"):
+        rentals = list_rentals(status=None, userId=str(user.id), productId=None, admin=admin, db=db)
+    assert len(rentals) == 5
+
+
+def test_audit_listing_budget(db, make_user):
+    admin = make_user("admin")
+    for i in range(5):
+        log_action(db=db, actor_user_id=str(admin.id), action="TAKE", qty=i)
+    db.commit()
+    db.refresh(admin)
+    with query_budget(1, mode="raise"):
+        logs = list_audit_logs(
+            Response(), actorUserId=admin.id, productId=None, action=None, since=None, until=None,
+            rentalId=None, reservationId=None, productName=None, meta=None, cursor=None, limit=200,
+            admin=admin, db=db,
+        )
+    assert len(logs) == 5 and {log["actorUserName"] for log in logs} == {admin.username}
@@ -0,0 +1,89 @@
+import threading
+import time
+from datetime import timedelta
+from uuid import UUID
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from app.api.products import delete_product
+from app.db.session import SessionLocal
+from app.models.product import Product
+from app.services import inventory_service, reservation_service
+from app.services.idempotency_service import Idempotency
+
+
+def test_take_waiting_on_a_booking_sees_its_days(db, make_product, make_user, stock):
+    pid = make_product(available=10)
+    user = make_user()
+    today = reservation_service.today()
+
+    # the booking holds the product row lock until it commits
+    reservation_service.reserve(db, pid, str(user.id), 10, today, today)
+
+    outcome = {}
+
+    def take():
+        other = SessionLocal()
+        try:
+            inventory_service.take(other, pid, 5)
+            other.commit()
+            outcome["result"] = "taken"
+        except ValueError as e:
+            other.rollback()
+            outcome["result"] = str(e)
+        finally:
+            other.close()
+
+    worker = threading.Thread(target=take)
+    worker.start()
+    time.sleep(0.5)  # the take is now waiting for the row lock
+    db.commit()
+    worker.join(10)
+
+    assert outcome["result"] == "NOT_ENOUGH_STOCK"
+    assert stock(pid) == (10, 10, 0)
+
+
+def test_reserve_rejects_more_than_is_free(db, make_product, make_user):
+    pid = make_product(available=4)
+    user = make_user()
+    day = reservation_service.today()
+
+    reservation_service.reserve(db, pid, str(user.id), 3, day, day)
+    db.commit()
+    with pytest.raises(ValueError, match="NOT_ENOUGH_STOCK"):
+        reservation_service.reserve(db, pid, str(user.id), 2, day, day)
+    db.rollback()
+    assert reservation_service.availability(db, [UUID(pid)], day, day) == {UUID(pid): 1}
+
+
+def test_take_keeps_clear_of_later_bookings(db, make_product, make_user, stock):
+    pid = make_product(available=10)
+    user = make_user()
+    later = reservation_service.today() + timedelta(days=3)
+    reservation_service.reserve(db, pid, str(user.id), 8, later, later + timedelta(days=1))
+    db.commit()
+
+    # taken units have no return date: the booking three days out still counts
+    with pytest.raises(ValueError, match="NOT_ENOUGH_STOCK"):
+        inventory_service.take(db, pid, 5)
+    db.rollback()
+    inventory_service.take(db, pid, 2)
+    db.commit()
+    assert stock(pid) == (10, 8, 0)
+
+
+def test_a_booked_product_cannot_be_deleted(db, make_product, make_user):
+    pid = make_product(available=5)
+    admin = make_user("admin")
+    later = reservation_service.today() + timedelta(days=2)
+    reservation_service.reserve(db, pid, str(admin.id), 1, later, later)
+    db.commit()
+
+    with pytest.raises(HTTPException) as exc:
+        delete_product(pid, admin=admin, db=db, idem=Idempotency(None, "DELETE /products"))
+    assert exc.value.status_code == 409
+    db.rollback()
+    assert db.execute(select(Product.id).where(Product.id == UUID(pid))).first() is not None
@@ -0,0 +1,97 @@
+import pytest
+from sqlalchemy import create_engine
+from starlette.requests import Request
+
+from app.core.security import create_access_token
+from app.db import routing
+from app.db.session import engine, get_db
+
+# The "replica" here is a second engine on the test database; the broken one
+# points at a port nothing listens on.
+
+
+@pytest.fixture
+def replicas(monkeypatch):
+    def use(*engines):
+        monkeypatch.setattr(routing, "replica_engines", list(engines))
+        monkeypatch.setattr(routing, "replica_router", routing.ReplicaRouter(list(engines), "round_robin", 30))
+        routing.recent_writers.clear()
+
+    yield use
+    routing.recent_writers.clear()
+
+
+@pytest.fixture
+def replica():
+    e = create_engine(engine.url)
+    yield e
+    e.dispose()
+
+
+@pytest.fixture
+def broken_replica():
+    e = create_engine("postgresql://nobody@127.0.0.1:1/none", connect_args={"connect_timeout": 2})
+    yield e
+    e.dispose()
+
+
+def request_for(user) -> Request:
+    token = create_access_token(str(user.id), user.role)
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+def bind_of(dependency):
+    """The engine the session from a get_db-style dependency is bound to."""
+    db = next(dependency)
+    try:
+        return db.get_bind()
+    finally:
+        dependency.close()
+
+
+def test_round_robin_skips_replicas_marked_down():
+    a, b, c = object(), object(), object()
+    router = routing.ReplicaRouter([a, b, c], "round_robin", 30)
+    assert [router.pick() for _ in range(3)] == [a, b, c]
+    router.mark_down(b)
+    assert {router.pick() for _ in range(4)} == {a, c}
+    router.mark_down(a)
+    router.mark_down(c)
+    assert router.pick() is None
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(replicas, replica, make_user):
+    replicas(replica)
+    user = make_user()
+    assert bind_of(routing.get_read_db(request_for(user))) is replica
+    assert bind_of(get_db()) is engine
+
+
+def test_reads_fall_back_to_the_primary_when_no_replica_connects(replicas, broken_replica, make_user):
+    replicas(broken_replica)
+    user = make_user()
+    assert bind_of(routing.get_read_db(request_for(user))) is engine
+    # marked down: the next request does not try it again
+    assert routing.replica_router.pick() is None
+
+
+def test_broken_replica_is_skipped_for_a_healthy_one(replicas, broken_replica, replica, make_user):
+    replicas(broken_replica, replica)
+    user = make_user()
+    for _ in range(3):
+        assert bind_of(routing.get_read_db(request_for(user))) is replica
+
+
+def test_own_writes_pin_reads_to_the_primary(replicas, replica, make_user, monkeypatch):
+    monkeypatch.setitem(routing.settings, "READ_YOUR_WRITES_SECONDS", 5)
+    monkeypatch.setattr(routing.recent_writers, "ttl", 5)
+    replicas(replica)
+    writer, other = make_user(), make_user()
+    routing.note_write(writer.id)
+    assert bind_of(routing.get_read_db(request_for(writer))) is engine
+    assert bind_of(routing.get_read_db(request_for(other))) is replica
+
+
+def test_no_replicas_means_the_primary(replicas, make_user):
+    replicas()
+    assert bind_of(routing.get_read_db(request_for(make_user()))) is engine
@@ -0,0 +1,51 @@
+from uuid import UUID
+
+from sqlalchemy import func, select
+
+from app.api import products
+from app.models.product_stripe import ProductStripe
+from app.schemas.product import ProductUpdate
+from app.services import inventory_service, stripe_service
+from app.services.idempotency_service import Idempotency
+
+
+def _striped(db, product_id) -> int:
+    return db.execute(
+        select(func.coalesce(func.sum(ProductStripe.available_quantity), 0))
+        .where(ProductStripe.product_id == UUID(product_id))
+    ).scalar_one()
+
+
+def test_update_lays_stripes_out_over_the_new_quantities(db, make_product, make_user, stock):
+    pid = make_product(available=100)
+    stripe_service.set_stripes(db, pid, 4)
+    db.commit()
+    assert _striped(db, pid) == 80
+
+    out = products.update_product(
+        pid,
+        ProductUpdate(quantity=50, availableQuantity=50, rentedQuantity=0),
+        admin=make_user("admin"),
+        db=db,
+        idem=Idempotency(None, "PUT /products"),
+    )
+
+    assert out["availableQuantity"] == 50
+    assert stock(pid) == (50, 50, 0)
+    assert stripe_service.stripe_count(db, pid) == 4
+    assert _striped(db, pid) == 40
+
+
+def test_take_and_return_on_a_striped_product(db, make_product, stock):
+    pid = make_product(available=9)
+    stripe_service.set_stripes(db, pid, 2)
+    db.commit()
+
+    # more than any single stripe holds: served after collecting the stripes
+    inventory_service.take(db, pid, 8)
+    db.commit()
+    assert stock(pid) == (9, 1, 0)
+
+    inventory_service.return_taken(db, pid, 8)
+    db.commit()
+    assert stock(pid) == (9, 9, 0)
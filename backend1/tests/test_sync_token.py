@@ -0,0 +1,88 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import update
+
+from app.api.products import product_changes
+from app.db.session import SessionLocal
+from app.models.product import Product
+from app.services.catalog_service import decode_sync_token, encode_sync_token
+
+
+def token_for(text: str) -> str:
+    return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+
+def snapshot_token(at: str, snapshot: str = "100:100:") -> str:
+    return token_for(json.dumps({"at": at, "snapshot": snapshot}))
+
+
+def changed_ids(db, user, token):
+    out = product_changes(token, user=user, db=db)
+    db.rollback()
+    return {p["id"] for p in out["changes"]}, out["next"]
+
+
+def test_tokens_round_trip():
+    ts = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    assert decode_sync_token(encode_sync_token(ts, "10:12:10,11")) == (ts, "10:12:10,11")
+
+
+def test_a_token_time_without_offset_is_utc():
+    at, _ = decode_sync_token(snapshot_token("2026-03-01T12:30:00"))
+    assert at == datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("token", [
+    "not-a-token", token_for("yesterday"), "////", "",
+    snapshot_token("2026-03-01T12:30:00+00:00", "1:2:x); DROP TABLE products"),
+    token_for(json.dumps({"at": "2026-03-01T12:30:00+00:00"})),
+])
+def test_malformed_tokens_are_rejected(db, make_user, token):
+    with pytest.raises(HTTPException) as exc:
+        product_changes(token, user=make_user(), db=db)
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.parametrize("token", [
+    # plain timestamp tokens from before snapshots
+    token_for((datetime.now(timezone.utc) - timedelta(minutes=5)).isoformat()),
+    snapshot_token("2000-01-01T00:00:00+00:00"),
+])
+def test_old_tokens_expire(db, make_user, token):
+    with pytest.raises(HTTPException) as exc:
+        product_changes(token, user=make_user(), db=db)
+    assert exc.value.status_code == 410
+
+
+def test_changes_follow_the_token(db, make_product, make_user):
+    user = make_user()
+    _, token = changed_ids(db, user, None)
+    pid = make_product()
+    changed, token = changed_ids(db, user, token)
+    assert pid in changed
+    changed, _ = changed_ids(db, user, token)
+    assert pid not in changed
+
+
+def test_a_write_in_flight_at_token_time_is_not_lost(db, make_product, make_user):
+    """The writer's transaction starts before the token is handed out and
+    commits after: a wall-clock token would place its change in the past."""
+    user = make_user()
+    pid = make_product()
+    _, token = changed_ids(db, user, None)
+
+    writer = SessionLocal()
+    try:
+        writer.execute(update(Product).where(Product.id == pid).values(quantity=Product.quantity))
+        changed, token = changed_ids(db, user, token)
+        assert pid not in changed
+        writer.commit()
+    finally:
+        writer.close()
+
+    changed, _ = changed_ids(db, user, token)
+    assert pid in changed
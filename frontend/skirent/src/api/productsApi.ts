@@ -15,9 +15,16 @@ export type CreateProductPayload = Omit<Product, "id">;
 export type UpdateProductPayload = Partial<Omit<Product, "id">>;
 
 // ✅ GET /products - שליפת כל המוצרים
+// השרת מחזיר עמודים; הסמן לעמוד הבא מגיע ב-header X-Next-Cursor
 export async function getProducts(): Promise<Product[]> {
-  const res = await api.get<Product[]>("/products");
-  return res.data;
+  const products: Product[] = [];
+  let cursor: string | undefined;
+  do {
+    const res = await api.get<Product[]>("/products", { params: { cursor, limit: 500 } });
+    products.push(...res.data);
+    cursor = res.headers["x-next-cursor"];
+  } while (cursor);
+  return products;
 }
 
 // ✅ POST /products (Admin) - יצירת מוצר חדש